@@ -1,12 +1,56 @@
 import os
-from flask import Flask, request, jsonify # type: ignore
+from flask import Flask, Response, request, jsonify, g, has_request_context, send_file, stream_with_context # type: ignore
+from flask.json.provider import DefaultJSONProvider # type: ignore
 import psycopg2 # type: ignore
-from psycopg2.extras import RealDictCursor # type: ignore
+from psycopg2 import pool as pg_pool # type: ignore
+from psycopg2.extras import RealDictCursor, execute_values # type: ignore
 import requests
+import click # type: ignore
+from collections import Counter, OrderedDict, deque, namedtuple
+import cProfile
+import csv
 from datetime import datetime, date
+import hashlib
+import hmac
 import json
+import logging
+import marshal
+import pstats
+import queue
+import random
+import re
+import select
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+
+try:
+    import brotli # type: ignore
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack # type: ignore
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson # type: ignore
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa # type: ignore
+    import pyarrow.parquet as pq # type: ignore
+except ImportError:
+    pa = None
+
 
 app = Flask(__name__)
+logging.basicConfig(level=logging.INFO)
 
 # Database konfiguracija iz environment varijabli
 DB_CONFIG = {
@@ -17,161 +61,3263 @@ DB_CONFIG = {
     'port': int(os.getenv('DB_PORT', 5432))
 }
 
+# Pool konekcija - konekcije su dugotrajne, pa se šema kreira i naredbe pripremaju samo jednom po konekciji
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+
+# Opciona replika za čitanje (libpq DSN, npr. "host=replika dbname=... user=... password=...")
+DB_READ_DSN = os.getenv('DB_READ_DSN')
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 1))
+REPLICA_RETRY_INTERVAL = float(os.getenv('REPLICA_RETRY_INTERVAL', 5))
+
+# Keš aktivnih bicikala u memoriji procesa (LISTEN/NOTIFY) za brzo odbijanje duplih zaduženja
+ACTIVE_BIKE_CACHE = os.getenv('ACTIVE_BIKE_CACHE', 'true').lower() == 'true'
+ACTIVE_BIKE_RETRY_INTERVAL = float(os.getenv('ACTIVE_BIKE_RETRY_INTERVAL', 5))
+
+# Keš prava na zaduženje (jmbg -> stanje iz centrale), ažuran samo dok je otvoren tok promena centrale
+ELIGIBILITY_CACHE = os.getenv('ELIGIBILITY_CACHE', 'true').lower() == 'true'
+ELIGIBILITY_CACHE_SIZE = int(os.getenv('ELIGIBILITY_CACHE_SIZE', 100000))
+# Tok bez ijednog bajta (ni heartbeat-a) duže od CHANGE_FEED_READ_TIMEOUT sekundi smatra se prekinutim
+CHANGE_FEED_READ_TIMEOUT = float(os.getenv('CHANGE_FEED_READ_TIMEOUT', 60))
+CHANGE_FEED_RETRY_INTERVAL = float(os.getenv('CHANGE_FEED_RETRY_INTERVAL', 5))
+
+# Dnevna statistika - agregati se osvežavaju inkrementalno (samo grupe promenjene posle watermark-a)
+STATISTIKA_REFRESH_INTERVAL = float(os.getenv('STATISTIKA_REFRESH_INTERVAL', 60))
+# Zaduženje se commit-uje tek posle poziva centrale, pa se redovi mlađi od STATISTIKA_MARGIN sekundi
+# obrađuju u sledećem krugu (da watermark ne preskoči transakciju koja se kasnije commit-uje)
+STATISTIKA_MARGIN = float(os.getenv('STATISTIKA_MARGIN', 60))
+
+# Broj redova u jednom delu NDJSON liste zaduženja (serverski kursor)
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 500))
+
+# Kolonski izvoz (Parquet / Arrow IPC) - redovi se čitaju serverskim kursorom u serijama od EXPORT_BATCH_SIZE
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 50000))
+EXPORT_FORMATS = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+# Masovni uvoz zaduženja (COPY) - najviše UVOZ_MAX_GRESAKA grešaka po redovima u odgovoru
+UVOZ_MAX_GRESAKA = int(os.getenv('UVOZ_MAX_GRESAKA', 100))
+UVOZ_CENTRAL_TIMEOUT = float(os.getenv('UVOZ_CENTRAL_TIMEOUT', 60))
+
+# Spajanje istovremenih istih poziva čitanja ka centrali (single-flight) - kasniji pozivalac ne šalje novi zahtev,
+# već čeka i deli rezultat poziva koji je već u toku
+SINGLE_FLIGHT = os.getenv('SINGLE_FLIGHT', 'true').lower() == 'true'
+SINGLE_FLIGHT_ENDPOINTS = {'/korisnici/proveri-zaduzenje'}
+
+# Protokol za provere, zaduženja i razduženja u centrali: 'json' (javni JSON API) ili 'msgpack' (interni RPC
+# POST /rpc). RPC pozive iz svih niti šalje RPC_CONNECTIONS niti preko trajnih konekcija, serijama do RPC_MAX_BATCH.
+INTERNAL_RPC = os.getenv('INTERNAL_RPC', 'json')
+RPC_CONNECTIONS = int(os.getenv('RPC_CONNECTIONS', 4))
+RPC_MAX_BATCH = int(os.getenv('RPC_MAX_BATCH', 64))
+RPC_TIMEOUT = float(os.getenv('RPC_TIMEOUT', 10))
+RPC_OPERACIJE = {
+    '/korisnici/proveri-zaduzenje': 0,
+    '/korisnici/zaduzi-bicikl': 1,
+    '/korisnici/razduzi-bicikl': 2,
+}
+RPC_OK, RPC_ODBIJENO, RPC_GRESKA = 0, 1, 2
+if INTERNAL_RPC == 'msgpack' and msgpack is None:
+    logging.warning("INTERNAL_RPC=msgpack, ali msgpack nije instaliran - koristi se JSON API")
+    INTERNAL_RPC = 'json'
+
+# Zakupi kvote zaduženja od centrale - dok grad drži važeći zakup za korisnika, limit proverava lokalno (zaduženje
+# ne čeka centralu), a zaduženja i razduženja javlja centrali naknadno preko outbox tabele dogadjaji_centrala.
+# Zakupi se obnavljaju serijom za korisnike aktivne u gradu (aktivno zaduženje ili promena u LEASE_ACTIVE_WINDOW s).
+LEASES = os.getenv('LEASES', 'true').lower() == 'true'
+LEASE_RENEW_INTERVAL = float(os.getenv('LEASE_RENEW_INTERVAL', 10))
+LEASE_ACTIVE_WINDOW = float(os.getenv('LEASE_ACTIVE_WINDOW', 900))
+# Zakup se lokalno smatra isteklim LEASE_SKEW sekundi pre roka koji je dala centrala
+LEASE_SKEW = float(os.getenv('LEASE_SKEW', 2))
+LEASE_CENTRAL_TIMEOUT = float(os.getenv('LEASE_CENTRAL_TIMEOUT', 5))
+OUTBOX_FLUSH_INTERVAL = float(os.getenv('OUTBOX_FLUSH_INTERVAL', 1))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 500))
+# Dok outbox ima događaj stariji od OUTBOX_MAX_AGE sekundi, zakupi se ne koriste (mora biti manje od LEASE_GRACE
+# centrale, da bi centrala zaduženja iz zakupa dobila pre nego što prestane da ih računa kao rezervisana;
+# centrala šalje LEASE_GRACE uz zakupe, i grad ih ne koristi ako uslov nije ispunjen - LeaseManager.proveri_grace)
+OUTBOX_MAX_AGE = float(os.getenv('OUTBOX_MAX_AGE', 20))
+# Brzina pražnjenja outbox-a u metrikama se računa za poslednjih OUTBOX_RATE_WINDOW sekundi
+OUTBOX_RATE_WINDOW = float(os.getenv('OUTBOX_RATE_WINDOW', 60))
+
+# Degradirani režim - kada centrala ne prihvata veze, razduženja se primaju lokalno, a zaduženja samo za korisnike
+# čije je stanje u kešu prava na zaduženje sveže (tok promena prekinut pre najviše DEGRADED_ELIGIBILITY_MAX_AGE s)
+# i dok korisnik po tom stanju i zaduženjima na čekanju ima manje od DEGRADED_RENTAL_LIMIT bicikala.
+# Sve ide u outbox dogadjaji_centrala i šalje se centrali kada proradi. Pod tada ostaje spreman i bez centrale.
+DEGRADED_MODE = os.getenv('DEGRADED_MODE', 'false').lower() == 'true'
+DEGRADED_ELIGIBILITY_MAX_AGE = float(os.getenv('DEGRADED_ELIGIBILITY_MAX_AGE', 300))
+DEGRADED_RENTAL_LIMIT = int(os.getenv('DEGRADED_RENTAL_LIMIT', 1))
+
+# Administratorske rute (/admin/...) traže zaglavlje X-Admin-Token; bez ADMIN_TOKEN su isključene
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+# Profilisanje živog poda (/admin/profil/...): cProfile uzorka zahteva jedne rute, wall-clock uzorkovanje stekova svih
+# niti i tracemalloc snimci memorije. Podrazumevano isključeno, a i uključeno traži ADMIN_TOKEN; dok ništa nije
+# pokrenuto, trošak po zahtevu je jedna provera atributa.
+PROFILING = os.getenv('PROFILING', 'false').lower() == 'true'
+# Najduže trajanje jednog uzorkovanja stekova (sekundi) i podrazumevani razmak između uzoraka
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 60))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.01))
+# Merenje upita: trajanje svake naredbe i prsten (SLOW_QUERY_BUFFER) nedavnih upita sporijih od SLOW_QUERY_MS, bez
+# vrednosti parametara. Za upite sporije od SLOW_QUERY_EXPLAIN_MS (negativno = isključeno) pozadinska nit uzima plan,
+# najviše jednom u SLOW_QUERY_EXPLAIN_INTERVAL sekundi po naredbi. Rezultati su na /admin/spori-upiti.
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'true').lower() == 'true'
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 50))
+SLOW_QUERY_BUFFER = int(os.getenv('SLOW_QUERY_BUFFER', 100))
+# Najveći broj različitih naredbi za koje se vodi statistika
+SLOW_QUERY_STATEMENTS = int(os.getenv('SLOW_QUERY_STATEMENTS', 500))
+SLOW_QUERY_EXPLAIN_MS = float(os.getenv('SLOW_QUERY_EXPLAIN_MS', 200))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 300))
+SLOW_QUERY_EXPLAIN_TIMEOUT = float(os.getenv('SLOW_QUERY_EXPLAIN_TIMEOUT', 5))
+
+# Zapis JMBG-a u bazi: 'varchar' (VARCHAR(13)) ili 'bigint' (8 bajtova - manji indeksi i brže poređenje).
+# Vodeće nule se pri čitanju vraćaju sa lpad, a postojeće kolone se pri pokretanju konvertuju u izabrani tip.
+JMBG_STORAGE = os.getenv('JMBG_STORAGE', 'varchar')
+JMBG_TIP = 'BIGINT' if JMBG_STORAGE == 'bigint' else 'VARCHAR(13)'
+# Provera kontrolne cifre JMBG-a pri registraciji novih korisnika
+JMBG_KONTROLNA_CIFRA = os.getenv('JMBG_KONTROLNA_CIFRA', 'true').lower() == 'true'
+
+# Readiness provera - rezultat se kešira READY_CACHE_TTL sekundi, pa probe ne opterećuju bazu
+READY_CACHE_TTL = float(os.getenv('READY_CACHE_TTL', 5))
+READY_CHECK_TIMEOUT = float(os.getenv('READY_CHECK_TIMEOUT', 1))
+# Zagrevanje pri pokretanju - /ready vraća 503 dok se ne otvori DB_POOL_MIN konekcija sa pripremljenim naredbama,
+# ne uspostave trajne HTTP konekcije ka povezanim servisima i (uz WARMUP_PRELOAD_CACHES) ne učitaju keševi
+# (najviše WARMUP_CACHE_TIMEOUT sekundi). Trajanje svake faze se vidi u /ready.
+WARMUP = os.getenv('WARMUP', 'true').lower() == 'true'
+WARMUP_PRELOAD_CACHES = os.getenv('WARMUP_PRELOAD_CACHES', 'true').lower() == 'true'
+WARMUP_CACHE_TIMEOUT = float(os.getenv('WARMUP_CACHE_TIMEOUT', 10))
+WARMUP_RETRY_INTERVAL = float(os.getenv('WARMUP_RETRY_INTERVAL', 2))
+# Najveći broj trajnih HTTP konekcija po servisu (zajednička requests.Session za pozive drugih servisa)
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+# Rok zahteva (sekundi): statement_timeout upita i čekanje na pool i druge servise računaju se iz preostalog vremena,
+# a pozivi drugih servisa nose preostalo vreme (ms) u zaglavlju X-Request-Deadline, koje pozvani servis poštuje
+# (važi kraći od dva roka). Zahtev kome je rok istekao dobija 504 umesto da se obrađuje do kraja; 0 = bez rokova.
+REQUEST_DEADLINE = float(os.getenv('REQUEST_DEADLINE', 15))
+DEADLINE_HEADER = 'X-Request-Deadline'
+# Broj redova oznake izmena po listi u verzije_tabela (ETag listi) - istovremeni upisi uvećavaju različite redove
+VERZIJE_DELOVA = 16
+
+# Rezervacija bicikla dok zaduženje čeka centralu (status 'rezervisan' u bicikli); rezervacija starija od
+# RENTAL_RESERVATION_TTL sekundi (proces je pao pre završetka zaduženja) se ne poštuje
+RENTAL_RESERVATION_TTL = float(os.getenv('RENTAL_RESERVATION_TTL', 60))
+# Dugotrajne rute bez roka (izvoz i uvoz zaduženja, uzorkovanje stekova)
+DEADLINE_EXEMPT = {'izvoz_zaduzenja', 'uvoz_zaduzenja', 'uzorkovanje_stekova'}
+# Da li nedostupna centralna biciklana čini pod nespremnim
+READY_REQUIRE_CENTRAL = os.getenv('READY_REQUIRE_CENTRAL', 'true').lower() == 'true'
+# Dozvoljeno kašnjenje replike (sekundi) po read-only ruti; negativna vrednost = uvek primarna baza
+READ_MAX_LAG = {
+    'zaduzenja': float(os.getenv('READ_MAX_LAG_ZADUZENJA', 10)),
+    'statistika': float(os.getenv('READ_MAX_LAG_STATISTIKA', 60)),
+}
+
 # URL Centralne biciklane iz environment varijable
 CENTRAL_URL = os.getenv('CENTRAL_URL', "http://central_app:5000")
 GRAD_NAZIV = "Subotica"
 
-def get_db_connection():
-    """Kreiranje konekcije sa bazom podataka"""
+# Kompresija JSON odgovora (br ako je brotli instaliran, inače gzip) većih od COMPRESS_MIN_SIZE bajtova;
+# strimovani odgovori se kompresuju deo po deo. COMPRESS_MIN_SIZE=0 isključuje kompresiju.
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+
+# JSON enkoder za odgovore: 'standard' (Flask) ili 'orjson' (brži, nativno serijalizuje date/datetime)
+JSON_ENCODER = os.getenv('JSON_ENCODER', 'standard')
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider zasnovan na orjson biblioteci"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+if JSON_ENCODER == 'orjson':
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        logging.warning("JSON_ENCODER=orjson, ali orjson nije instaliran - koristi se standardni enkoder")
+        JSON_ENCODER = 'standard'
+
+# Tip reda za vruću putanju razduženja - tuple umesto dict-a (RealDictCursor samo za listanje)
+AktivnoZaduzenje = namedtuple('AktivnoZaduzenje', ['id', 'jmbg', 'ime', 'prezime', 'oznaka_bicikla'])
+Zakup = namedtuple('Zakup', ['korisnik_id', 'ime', 'prezime', 'limit_zaduzenja', 'u_drugim_gradovima'])
+
+# Šema kolonskog izvoza zaduženja (redosled kolona odgovara upitu u izvezi_zaduzenja)
+ZADUZENJA_SCHEMA = pa.schema([
+    ('id', pa.int32()),
+    ('korisnik_id', pa.int32()),
+    ('jmbg', pa.string()),
+    ('ime', pa.string()),
+    ('prezime', pa.string()),
+    ('oznaka_bicikla', pa.string()),
+    ('tip_bicikla', pa.string()),
+    ('datum_zaduzivanja', pa.date32()),
+    ('datum_razduzivanja', pa.date32()),
+    ('status', pa.string()),
+    ('created_at', pa.timestamp('us')),
+    ('updated_at', pa.timestamp('us')),
+]) if pa is not None else None
+
+# Upiti na vrućim putanjama
+SQL_AKTIVAN_BICIKL = """
+    SELECT id FROM zaduzenja 
+    WHERE oznaka_bicikla = %s AND status = 'aktivan'
+"""
+SQL_AKTIVNO_ZADUZENJE = """
+    SELECT id, lpad(jmbg::text, 13, '0'), ime, prezime, oznaka_bicikla 
+    FROM zaduzenja 
+    WHERE oznaka_bicikla = %s AND status = 'aktivan'
+"""
+SQL_NOVO_ZADUZENJE = """
+    INSERT INTO zaduzenja (korisnik_id, jmbg, ime, prezime, oznaka_bicikla, tip_bicikla, datum_zaduzivanja, status)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, 'aktivan')
+    RETURNING id
+"""
+SQL_RAZDUZENJE = """
+    UPDATE zaduzenja 
+    SET status = 'razduzen', datum_razduzivanja = %s, updated_at = CURRENT_TIMESTAMP
+    WHERE id = %s
+"""
+# Inventar bicikala - status se menja u istoj transakciji kao i zaduženje/razduženje
+# (bicikl koji još nije u inventaru se dodaje pri prvom zaduženju)
+SQL_BICIKL_ZADUZEN = """
+    INSERT INTO bicikli (oznaka_bicikla, tip_bicikla, status, updated_at)
+    VALUES (%s, %s, 'zaduzen', CURRENT_TIMESTAMP)
+    ON CONFLICT (oznaka_bicikla) DO UPDATE SET status = 'zaduzen', updated_at = CURRENT_TIMESTAMP
+"""
+# Oznaka izmena liste za ETag (zbir delova iz verzije_tabela)
+SQL_VERZIJA_LISTE = """
+    SELECT sum(verzija) AS verzija FROM verzije_tabela WHERE lista = %s
+"""
+# Rezervacija uspeva ako bicikl nije rezervisan (ili je rezervacija zastarela); vraća red samo kada uspe
+SQL_REZERVISI_BICIKL = """
+    INSERT INTO bicikli (oznaka_bicikla, tip_bicikla, status, updated_at)
+    VALUES (%s, %s, 'rezervisan', CURRENT_TIMESTAMP)
+    ON CONFLICT (oznaka_bicikla) DO UPDATE SET status = 'rezervisan', updated_at = CURRENT_TIMESTAMP
+    WHERE bicikli.status <> 'rezervisan' OR bicikli.updated_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+    RETURNING oznaka_bicikla
+"""
+SQL_OTKAZI_REZERVACIJU = """
+    UPDATE bicikli SET status = 'dostupan', updated_at = CURRENT_TIMESTAMP
+    WHERE oznaka_bicikla = %s AND status = 'rezervisan'
+"""
+SQL_BICIKL_DOSTUPAN = """
+    UPDATE bicikli SET status = 'dostupan', updated_at = CURRENT_TIMESTAMP
+    WHERE oznaka_bicikla = %s
+"""
+# Važeći zakup korisnika - red se zaključava, pa se zaduženja istog korisnika i obnova zakupa serijalizuju
+# (aktivna zaduženja se zato broje posebnom naredbom, posle zaključavanja)
+SQL_ZAKUP = f"""
+    SELECT korisnik_id, ime, prezime, limit_zaduzenja, u_drugim_gradovima
+    FROM zakupi
+    WHERE jmbg = %s AND istice > LOCALTIMESTAMP
+      AND NOT EXISTS (
+          SELECT 1 FROM dogadjaji_centrala
+          WHERE created_at < LOCALTIMESTAMP - make_interval(secs => {OUTBOX_MAX_AGE})
+      )
+    FOR UPDATE
+"""
+SQL_AKTIVNA_ZADUZENJA_KORISNIKA = """
+    SELECT count(*) FROM zaduzenja WHERE jmbg = %s AND status = 'aktivan'
+"""
+SQL_DOGADJAJ_CENTRALA = """
+    INSERT INTO dogadjaji_centrala (vrsta, jmbg, oznaka_bicikla, datum_zaduzivanja)
+    VALUES (%s, %s, %s, %s)
+"""
+# Zaduženja korisnika o kojima centrala još nije obaveštena
+SQL_ZADUZENJA_NA_CEKANJU_KORISNIKA = """
+    SELECT count(*) FROM dogadjaji_centrala WHERE jmbg = %s AND vrsta = 'zaduzenje'
+"""
+# Zaduženje bicikla o kom centrala još nije obaveštena
+SQL_ZADUZENJE_NA_CEKANJU = """
+    SELECT id FROM dogadjaji_centrala
+    WHERE oznaka_bicikla = %s AND vrsta = 'zaduzenje'
+    LIMIT 1
+"""
+# Korisnici za koje se traži zakup: aktivna zaduženja u gradu ili promena u poslednjih %s sekundi
+SQL_AKTIVNI_KORISNICI = """
+    SELECT DISTINCT lpad(jmbg::text, 13, '0') FROM zaduzenja
+    WHERE status = 'aktivan' OR updated_at > LOCALTIMESTAMP - make_interval(secs => %s)
+"""
+# Ponovno računanje grupa (dan, tip) koje imaju redove promenjene posle watermark-a, a najkasnije u %(do)s
+SQL_OSVEZI_STATISTIKU = """
+    WITH promene AS (
+        SELECT DISTINCT datum_zaduzivanja, tip_bicikla
+        FROM zaduzenja
+        WHERE updated_at > (SELECT obradjeno_do FROM statistika_watermark WHERE naziv = 'zaduzenja')
+          AND updated_at <= %(do)s
+    )
+    INSERT INTO statistika_zaduzenja (dan, tip_bicikla, broj_zaduzenja, broj_razduzenja, ukupno_dana, osvezeno)
+    SELECT z.datum_zaduzivanja, z.tip_bicikla, COUNT(*), COUNT(z.datum_razduzivanja),
+           COALESCE(SUM(z.datum_razduzivanja - z.datum_zaduzivanja), 0), CURRENT_TIMESTAMP
+    FROM zaduzenja z
+    JOIN promene p ON p.datum_zaduzivanja = z.datum_zaduzivanja AND p.tip_bicikla = z.tip_bicikla
+    GROUP BY z.datum_zaduzivanja, z.tip_bicikla
+    ON CONFLICT (dan, tip_bicikla) DO UPDATE SET
+        broj_zaduzenja = EXCLUDED.broj_zaduzenja,
+        broj_razduzenja = EXCLUDED.broj_razduzenja,
+        ukupno_dana = EXCLUDED.ukupno_dana,
+        osvezeno = EXCLUDED.osvezeno
+"""
+
+# Masovni uvoz: kolone ulaznog fajla (sve se u prelaznu tabelu učitavaju kao tekst i proveravaju u SQL-u)
+UVOZ_KOLONE = ['korisnik_id', 'jmbg', 'ime', 'prezime', 'oznaka_bicikla', 'tip_bicikla',
+               'datum_zaduzivanja', 'datum_razduzivanja', 'status', 'created_at']
+UVOZ_OBAVEZNE_KOLONE = ['korisnik_id', 'jmbg', 'ime', 'prezime', 'oznaka_bicikla', 'tip_bicikla', 'datum_zaduzivanja']
+SQL_UVOZ_GRESKE = """
+    SELECT broj_reda, greska FROM (
+        SELECT broj_reda, CASE
+            WHEN korisnik_id IS NULL OR jmbg IS NULL OR ime IS NULL OR prezime IS NULL
+                 OR oznaka_bicikla IS NULL OR tip_bicikla IS NULL OR datum_zaduzivanja IS NULL
+                THEN 'nedostaje obavezan podatak'
+            WHEN korisnik_id !~ '^[0-9]{1,9}$' THEN 'korisnik_id mora biti ceo broj'
+            WHEN jmbg !~ '^[0-9]{13}$' THEN 'JMBG mora imati tačno 13 cifara'
+            WHEN NOT je_datum(datum_zaduzivanja) THEN 'neispravan datum_zaduzivanja (YYYY-MM-DD)'
+            WHEN datum_razduzivanja IS NOT NULL AND NOT je_datum(datum_razduzivanja)
+                THEN 'neispravan datum_razduzivanja (YYYY-MM-DD)'
+            WHEN datum_razduzivanja::date < datum_zaduzivanja::date
+                THEN 'datum_razduzivanja je pre datuma zaduživanja'
+            WHEN status NOT IN ('aktivan', 'razduzen') THEN 'status mora biti aktivan ili razduzen'
+            WHEN status = 'razduzen' AND datum_razduzivanja IS NULL
+                THEN 'razduženo zaduženje mora imati datum_razduzivanja'
+            WHEN status = 'aktivan' AND datum_razduzivanja IS NOT NULL
+                THEN 'aktivno zaduženje ne može imati datum_razduzivanja'
+        END AS greska
+        FROM uvoz_zaduzenja
+        UNION ALL
+        -- Jedan aktivan bicikl: duplikati unutar uvoza i sukobi sa postojećim aktivnim zaduženjima
+        SELECT broj_reda, 'bicikl ' || oznaka_bicikla || ' je već aktivno zadužen'
+        FROM (
+            SELECT u.broj_reda, u.oznaka_bicikla,
+                   ROW_NUMBER() OVER (PARTITION BY u.oznaka_bicikla ORDER BY u.broj_reda) AS redosled,
+                   EXISTS (SELECT 1 FROM zaduzenja z
+                           WHERE z.oznaka_bicikla = u.oznaka_bicikla AND z.status = 'aktivan') AS postoji
+            FROM uvoz_zaduzenja u
+            WHERE u.status = 'aktivan'
+        ) aktivni
+        WHERE redosled > 1 OR postoji
+    ) provera
+    WHERE greska IS NOT NULL
+    ORDER BY broj_reda
+    LIMIT %s
+"""
+SQL_UVOZ_UPIS = f"""
+    INSERT INTO zaduzenja (korisnik_id, jmbg, ime, prezime, oznaka_bicikla, tip_bicikla,
+                           datum_zaduzivanja, datum_razduzivanja, status, created_at)
+    SELECT korisnik_id::integer, jmbg::{JMBG_TIP}, ime, prezime, oznaka_bicikla, tip_bicikla,
+           datum_zaduzivanja::date, datum_razduzivanja::date, status,
+           COALESCE(created_at::timestamp, CURRENT_TIMESTAMP)
+    FROM uvoz_zaduzenja
+    ORDER BY broj_reda
+"""
+# Ponovno računanje grupa (dan, tip) iz uvoza u transakciji uvoza. Uvezeni redovi dobijaju updated_at sa početka
+# transakcije, pa bi ih watermark, koji se tokom dugog uvoza pomera dalje, inače preskočio.
+SQL_UVOZ_STATISTIKA = """
+    WITH promene AS (
+        SELECT DISTINCT datum_zaduzivanja::date AS datum_zaduzivanja, tip_bicikla
+        FROM uvoz_zaduzenja
+    )
+    INSERT INTO statistika_zaduzenja (dan, tip_bicikla, broj_zaduzenja, broj_razduzenja, ukupno_dana, osvezeno)
+    SELECT z.datum_zaduzivanja, z.tip_bicikla, COUNT(*), COUNT(z.datum_razduzivanja),
+           COALESCE(SUM(z.datum_razduzivanja - z.datum_zaduzivanja), 0), CURRENT_TIMESTAMP
+    FROM zaduzenja z
+    JOIN promene p ON p.datum_zaduzivanja = z.datum_zaduzivanja AND p.tip_bicikla = z.tip_bicikla
+    GROUP BY z.datum_zaduzivanja, z.tip_bicikla
+    ON CONFLICT (dan, tip_bicikla) DO UPDATE SET
+        broj_zaduzenja = EXCLUDED.broj_zaduzenja,
+        broj_razduzenja = EXCLUDED.broj_razduzenja,
+        ukupno_dana = EXCLUDED.ukupno_dana,
+        osvezeno = EXCLUDED.osvezeno
+"""
+# Inventar: bicikli iz uvoza se dodaju, a aktivno zaduženi prelaze u status 'zaduzen'
+SQL_UVOZ_BICIKLI = """
+    INSERT INTO bicikli (oznaka_bicikla, tip_bicikla, status)
+    SELECT DISTINCT ON (oznaka_bicikla) oznaka_bicikla, tip_bicikla,
+           CASE WHEN status = 'aktivan' THEN 'zaduzen' ELSE 'dostupan' END
+    FROM uvoz_zaduzenja
+    ORDER BY oznaka_bicikla, status = 'aktivan' DESC, broj_reda DESC
+    ON CONFLICT (oznaka_bicikla) DO UPDATE SET
+        status = CASE WHEN EXCLUDED.status = 'zaduzen' THEN 'zaduzen' ELSE bicikli.status END,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# Naredbe koje se pripremaju na serveru (ime -> upit)
+PREPARED_STATEMENTS = {
+    'aktivan_bicikl': SQL_AKTIVAN_BICIKL,
+    'aktivno_zaduzenje': SQL_AKTIVNO_ZADUZENJE,
+    'novo_zaduzenje': SQL_NOVO_ZADUZENJE,
+    'razduzenje': SQL_RAZDUZENJE,
+    'bicikl_zaduzen': SQL_BICIKL_ZADUZEN,
+    'verzija_liste': SQL_VERZIJA_LISTE,
+    'rezervisi_bicikl': SQL_REZERVISI_BICIKL,
+    'otkazi_rezervaciju': SQL_OTKAZI_REZERVACIJU,
+    'bicikl_dostupan': SQL_BICIKL_DOSTUPAN,
+    'zakup': SQL_ZAKUP,
+    'aktivna_zaduzenja_korisnika': SQL_AKTIVNA_ZADUZENJA_KORISNIKA,
+    'dogadjaj_centrala': SQL_DOGADJAJ_CENTRALA,
+    'zaduzenje_na_cekanju': SQL_ZADUZENJE_NA_CEKANJU,
+    'zaduzenja_na_cekanju_korisnika': SQL_ZADUZENJA_NA_CEKANJU_KORISNIKA,
+}
+
+def proveri_jmbg(jmbg, kontrolna_cifra=False):
+    """
+    Provera JMBG-a: tačno 13 ASCII cifara i, opciono, ispravna kontrolna cifra.
+    Vraća poruku o grešci ili None ako je JMBG ispravan.
+    """
+    if not isinstance(jmbg, str) or len(jmbg) != 13 or not jmbg.isascii() or not jmbg.isdigit():
+        return "JMBG mora imati tačno 13 cifara"
+    if kontrolna_cifra:
+        # Kontrolna cifra po modulu 11 (težine 7..2, dva puta), računato nad ASCII kodovima;
+        # 54 * 48 poništava ord('0') jer je zbir težina 54
+        d = jmbg.encode()
+        m = 11 - (7 * (d[0] + d[6]) + 6 * (d[1] + d[7]) + 5 * (d[2] + d[8]) + 4 * (d[3] + d[9])
+                  + 3 * (d[4] + d[10]) + 2 * (d[5] + d[11]) - 54 * 48) % 11
+        if (0 if m > 9 else m) != d[12] - 48:
+            return "JMBG nema ispravnu kontrolnu cifru"
+    return None
+
+def uskladi_tip_jmbg(cursor, tabela):
+    """Konverzija kolone jmbg u tip zadat sa JMBG_STORAGE (jednokratno - prepisuje tabelu i indekse)"""
+    cursor.execute("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND column_name = 'jmbg'
+    """, (tabela,))
+    tip = cursor.fetchone()[0]
+    if tip == ('bigint' if JMBG_STORAGE == 'bigint' else 'character varying'):
+        return
+    logging.warning(f"Konverzija {tabela}.jmbg iz {tip} u {JMBG_TIP}")
+    izraz = "jmbg::bigint" if JMBG_STORAGE == 'bigint' else "lpad(jmbg::text, 13, '0')"
+    cursor.execute(f"ALTER TABLE {tabela} ALTER COLUMN jmbg TYPE {JMBG_TIP} USING {izraz}")
+
+def init_db_schema(conn):
+    """Kreiranje tabela ako ne postoje"""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS zaduzenja (
+        id SERIAL PRIMARY KEY,
+        korisnik_id INTEGER NOT NULL,
+        jmbg {JMBG_TIP} NOT NULL,
+        ime VARCHAR(50) NOT NULL,
+        prezime VARCHAR(50) NOT NULL,
+        oznaka_bicikla VARCHAR(20) NOT NULL,
+        tip_bicikla VARCHAR(30) NOT NULL,
+        datum_zaduzivanja DATE NOT NULL,
+        datum_razduzivanja DATE,
+        status VARCHAR(20) NOT NULL DEFAULT 'aktivan',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    uskladi_tip_jmbg(cursor, 'zaduzenja')
+
+    # Vreme poslednje promene reda (za inkrementalno osvežavanje statistike)
+    cursor.execute("ALTER TABLE zaduzenja ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_zaduzenja_updated_at ON zaduzenja(updated_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_zaduzenja_datum_tip ON zaduzenja(datum_zaduzivanja, tip_bicikla)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_zaduzenja_jmbg ON zaduzenja(jmbg)")
+
+    # Zakupi kvote od centrale (jedan red po korisniku) i outbox događaja koje centrala još nije potvrdila
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS zakupi (
+        jmbg {JMBG_TIP} PRIMARY KEY,
+        korisnik_id INTEGER NOT NULL,
+        ime VARCHAR(50) NOT NULL,
+        prezime VARCHAR(50) NOT NULL,
+        limit_zaduzenja INTEGER NOT NULL,
+        u_drugim_gradovima INTEGER NOT NULL DEFAULT 0,
+        istice TIMESTAMP NOT NULL
+    )
+    """)
+    uskladi_tip_jmbg(cursor, 'zakupi')
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS dogadjaji_centrala (
+        id BIGSERIAL PRIMARY KEY,
+        vrsta VARCHAR(20) NOT NULL,
+        jmbg {JMBG_TIP} NOT NULL,
+        oznaka_bicikla VARCHAR(50) NOT NULL,
+        datum_zaduzivanja DATE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    uskladi_tip_jmbg(cursor, 'dogadjaji_centrala')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_dogadjaji_centrala_oznaka ON dogadjaji_centrala(oznaka_bicikla)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_dogadjaji_centrala_created_at ON dogadjaji_centrala(created_at)")
+
+    # Dnevni agregati po tipu bicikla (dan = datum zaduživanja; trajanje se računa za razdužena zaduženja)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS statistika_zaduzenja (
+        dan DATE NOT NULL,
+        tip_bicikla VARCHAR(50) NOT NULL,
+        broj_zaduzenja INTEGER NOT NULL DEFAULT 0,
+        broj_razduzenja INTEGER NOT NULL DEFAULT 0,
+        ukupno_dana BIGINT NOT NULL DEFAULT 0,
+        osvezeno TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (dan, tip_bicikla)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS statistika_watermark (
+        naziv VARCHAR(50) PRIMARY KEY,
+        obradjeno_do TIMESTAMP NOT NULL
+    )
+    """)
+    cursor.execute("""
+    INSERT INTO statistika_watermark (naziv, obradjeno_do) VALUES ('zaduzenja', '-infinity')
+    ON CONFLICT (naziv) DO NOTHING
+    """)
+
+    # Inventar bicikala; pri prvom kreiranju se popunjava biciklima poznatim iz zaduženja
+    cursor.execute("SELECT to_regclass('bicikli') IS NULL")
+    nova_tabela = cursor.fetchone()[0]
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS bicikli (
+        oznaka_bicikla VARCHAR(50) PRIMARY KEY,
+        tip_bicikla VARCHAR(50) NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'dostupan',
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bicikli_status_oznaka ON bicikli(status, oznaka_bicikla)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bicikli_status_tip ON bicikli(status, tip_bicikla, oznaka_bicikla)")
+    if nova_tabela:
+        cursor.execute("""
+        INSERT INTO bicikli (oznaka_bicikla, tip_bicikla, status)
+        SELECT DISTINCT ON (oznaka_bicikla) oznaka_bicikla, tip_bicikla,
+               CASE WHEN bool_or(status = 'aktivan') OVER (PARTITION BY oznaka_bicikla)
+                    THEN 'zaduzen' ELSE 'dostupan' END
+        FROM zaduzenja
+        ORDER BY oznaka_bicikla, created_at DESC
+        """)
+
+    # Jedinstveni aktivni bicikl - izvor istine za duplikate (keš aktivnih bicikala je samo brza provera)
+    cursor.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_active_bike
+    ON zaduzenja(oznaka_bicikla)
+    WHERE status = 'aktivan'
+    """)
+
+    # Obaveštenja o promeni aktivnih bicikala za keš u procesima (kanal aktivni_bicikli). Bicikl se uklanja samo
+    # kada red aktivnog zaduženja prestane da bude aktivan - istorijski red (npr. iz uvoza) ne sme da ukloni
+    # bicikl koji je upravo zadužen. Masovni upis (biciklana.masovni_upis u transakciji) umesto obaveštenja po
+    # redu šalje jedno obaveštenje za ponovno učitavanje keša.
+    cursor.execute("""
+    CREATE OR REPLACE FUNCTION obavesti_aktivni_bicikli() RETURNS trigger AS $$
+    BEGIN
+        IF current_setting('biciklana.masovni_upis', true) = 'on' THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP <> 'INSERT' AND OLD.status = 'aktivan' AND (TG_OP = 'DELETE' OR NEW.status <> 'aktivan'
+                OR OLD.oznaka_bicikla IS DISTINCT FROM NEW.oznaka_bicikla) THEN
+            PERFORM pg_notify('aktivni_bicikli',
+                json_build_object('oznaka_bicikla', OLD.oznaka_bicikla, 'aktivan', false)::text);
+        END IF;
+        IF TG_OP <> 'DELETE' AND NEW.status = 'aktivan' AND (TG_OP = 'INSERT' OR OLD.status IS DISTINCT FROM NEW.status
+                OR OLD.oznaka_bicikla IS DISTINCT FROM NEW.oznaka_bicikla) THEN
+            PERFORM pg_notify('aktivni_bicikli',
+                json_build_object('oznaka_bicikla', NEW.oznaka_bicikla, 'aktivan', true)::text);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    cursor.execute("""
+    CREATE OR REPLACE TRIGGER trg_aktivni_bicikli
+    AFTER INSERT OR UPDATE OR DELETE ON zaduzenja
+    FOR EACH ROW EXECUTE FUNCTION obavesti_aktivni_bicikli()
+    """)
+
+
+    # Oznake izmena listi za ETag (zbir delova, bez prebrojavanja tabela): trigger na nivou naredbe uvećava jedan
+    # od redova liste, a izmena je vidljiva tek sa commit-om, pa zbir nikad ne prestiže sadržaj liste.
+    # Trigger nikad ne čeka na red koji drži druga transakcija (SKIP LOCKED): transakcija koja čeka na oznaku
+    # dok drži redove tabele mogla bi da uđe u zastoj sa transakcijom koja drži oznaku, a čeka te redove.
+    # Kada su svi delovi zauzeti, uvećava se red procesa baze (deo >= VERZIJE_DELOVA, pid je jedinstven).
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS verzije_tabela (
+        lista TEXT NOT NULL,
+        deo INTEGER NOT NULL,
+        verzija BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (lista, deo)
+    )
+    """)
+    cursor.execute("""
+    CREATE OR REPLACE FUNCTION povecaj_verziju_liste() RETURNS trigger AS $$
+    DECLARE
+        delova int := TG_ARGV[1]::int;
+    BEGIN
+        UPDATE verzije_tabela SET verzija = verzija + 1
+        WHERE lista = TG_ARGV[0] AND deo = (
+            SELECT deo FROM verzije_tabela
+            WHERE lista = TG_ARGV[0] AND deo < delova
+            ORDER BY (deo - pg_backend_pid() % delova + delova) % delova
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        );
+        IF NOT FOUND THEN
+            INSERT INTO verzije_tabela (lista, deo, verzija) VALUES (TG_ARGV[0], delova + pg_backend_pid(), 1)
+            ON CONFLICT (lista, deo) DO UPDATE SET verzija = verzije_tabela.verzija + 1;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    cursor.execute("""
+    INSERT INTO verzije_tabela (lista, deo)
+    SELECT 'zaduzenja', deo FROM generate_series(0, %s) AS deo
+    ON CONFLICT DO NOTHING
+    """, (VERZIJE_DELOVA - 1,))
+    cursor.execute(f"""
+    CREATE OR REPLACE TRIGGER trg_verzija_zaduzenja
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON zaduzenja
+    FOR EACH STATEMENT EXECUTE FUNCTION povecaj_verziju_liste('zaduzenja', '{VERZIJE_DELOVA}')
+    """)
+
+    # Provera datuma za masovni uvoz (PostgreSQL 15 nema pg_input_is_valid)
+    cursor.execute("""
+    CREATE OR REPLACE FUNCTION je_datum(vrednost text) RETURNS boolean AS $$
+    BEGIN
+        RETURN vrednost ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}$' AND vrednost::date IS NOT NULL;
+    EXCEPTION WHEN others THEN
+        RETURN false;
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE
+    """)
+    conn.commit()
+    cursor.close()
+
+def redigovan_upit(query):
+    """
+    Tekst upita sa vrednostima već ugrađenim u SQL (execute_values) bez tih vrednosti: literali postaju ?,
+    a niz torki u VALUES jedna torka i ...
+    """
+    tekst = query.decode(errors='replace') if isinstance(query, bytes) else query
+    tekst = re.sub(r"'(?:[^']|'')*'", '?', tekst)
+    tekst = re.sub(r'\b\d+(?:\.\d+)?\b', '?', tekst)
+    return re.sub(r'(\([^()]*\))(?:\s*,\s*\([^()]*\))+', r'\1, ...', tekst)
+
+def redigovan_plan(plan):
+    """Plan bez vrednosti parametara - konstante u uslovima (npr. jmbg = '...'::text) postaju ?"""
+    return [re.sub(r"'(?:[^']|'')*'", '?', red) for red in plan]
+
+def redigovani_parametri(params):
+    """Tipovi parametara umesto vrednosti (JMBG i lični podaci ne ulaze u log sporih upita)"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {kljuc: type(vrednost).__name__ for kljuc, vrednost in params.items()}
+    return [type(vrednost).__name__ for vrednost in params]
+
+def tekst_naredbe(kljuc):
+    """Tekst naredbe za prikaz - za EXECUTE pripremljene naredbe njen SQL iz PREPARED_STATEMENTS"""
+    pripremljena = re.match(r'EXECUTE (\w+) \(', kljuc)
+    if pripremljena and pripremljena.group(1) in PREPARED_STATEMENTS:
+        kljuc = PREPARED_STATEMENTS[pripremljena.group(1)]
+    return ' '.join(kljuc.split())[:2000]
+
+# Naredbe koje EXPLAIN prihvata (DDL, SET, PREPARE... se samo mere)
+OBJASNJIVE_NAREDBE = re.compile(r'\s*(SELECT|INSERT|UPDATE|DELETE|WITH|VALUES|EXECUTE)\b', re.IGNORECASE)
+
+class SlowQueryLog:
+    """
+    Trajanje svih naredbi (po tekstu naredbe) i prsten najsporijih nedavnih upita.
+    Plan sporog upita uzima pozadinska nit preko posebne konekcije: EXPLAIN (ANALYZE, BUFFERS) u read-only transakciji
+    koja se poništava, a za naredbe koje se u njoj ne mogu izvršiti (upisi, FOR UPDATE) samo EXPLAIN bez izvršavanja.
+    """
+
+    def __init__(self):
+        self.naredbe = {}
+        self.spori = deque(maxlen=SLOW_QUERY_BUFFER)
+        self.red = queue.Queue(maxsize=16)
+        self.nepraceno = 0
+        self.started = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='slow-query-explain', daemon=True).start()
+
+    def zabelezi(self, query, params, trajanje):
+        ms = trajanje * 1000
+        kljuc = redigovan_upit(query) if isinstance(query, bytes) else query
+        with self.lock:
+            naredba = self.naredbe.get(kljuc)
+            if naredba is None:
+                if len(self.naredbe) < SLOW_QUERY_STATEMENTS:
+                    naredba = self.naredbe[kljuc] = {
+                        'pozivi': 0, 'ukupno_ms': 0.0, 'max_ms': 0.0, 'sporih': 0, 'plan_od': None, 'plan': None
+                    }
+                else:
+                    self.nepraceno += 1
+            if naredba is not None:
+                naredba['pozivi'] += 1
+                naredba['ukupno_ms'] += ms
+                naredba['max_ms'] = max(naredba['max_ms'], ms)
+            if ms < SLOW_QUERY_MS:
+                return
+            self.spori.append({
+                'kljuc': kljuc,
+                'parametri': redigovani_parametri(params),
+                'trajanje_ms': round(ms, 2),
+                'vreme': datetime.now().isoformat(timespec='seconds'),
+                'ruta': request.endpoint if has_request_context() else None
+            })
+            if naredba is None:
+                return
+            naredba['sporih'] += 1
+            now = time.monotonic()
+            if SLOW_QUERY_EXPLAIN_MS < 0 or ms < SLOW_QUERY_EXPLAIN_MS or not OBJASNJIVE_NAREDBE.match(kljuc) or (
+                    naredba['plan_od'] is not None and now - naredba['plan_od'] < SLOW_QUERY_EXPLAIN_INTERVAL):
+                return
+            naredba['plan_od'] = now
+        try:
+            self.red.put_nowait((kljuc, query, params, ms))
+        except queue.Full:
+            pass
+
+    def objasni(self, conn, query, params):
+        """Plan upita i da li je dobijen sa ANALYZE"""
+        pripremljena = isinstance(query, str) and re.match(r'EXECUTE (\w+) \(', query)
+        if pripremljena and pripremljena.group(1) in PREPARED_STATEMENTS:
+            # Pripremljena naredba postoji samo na konekciji koja ju je izvršila, pa se objašnjava njen SQL
+            query = PREPARED_STATEMENTS[pripremljena.group(1)]
+        cursor = conn.cursor()
+        try:
+            for opcije in ('(ANALYZE, BUFFERS) ', ''):
+                try:
+                    cursor.execute("SET TRANSACTION READ ONLY")
+                    cursor.execute("SET LOCAL statement_timeout = %s", (int(SLOW_QUERY_EXPLAIN_TIMEOUT * 1000),))
+                    prefiks = f"EXPLAIN {opcije}"
+                    cursor.execute(prefiks.encode() + query if isinstance(query, bytes) else prefiks + query, params)
+                    return redigovan_plan([red[0] for red in cursor.fetchall()]), bool(opcije)
+                except psycopg2.Error as e:
+                    # 25006 - naredba nije dozvoljena u read-only transakciji, pa se uzima plan bez izvršavanja
+                    if not opcije or e.pgcode != '25006':
+                        raise
+                finally:
+                    conn.rollback()
+        finally:
+            cursor.close()
+
+    def run(self):
+        conn = None
+        while True:
+            kljuc, query, params, ms = self.red.get()
+            plan, analyze, greska = None, False, None
+            try:
+                if conn is None or conn.closed:
+                    conn = psycopg2.connect(**DB_CONFIG)
+                plan, analyze = self.objasni(conn, query, params)
+            except Exception as e:
+                greska = str(e).strip()
+                logging.warning(f"EXPLAIN sporog upita nije uspeo: {greska}")
+            with self.lock:
+                naredba = self.naredbe.get(kljuc)
+                if naredba is not None:
+                    naredba['plan'] = {
+                        'vreme': datetime.now().isoformat(timespec='seconds'),
+                        'trajanje_ms': round(ms, 2),
+                        'analyze': analyze,
+                        'seq_scan': sorted(set(re.findall(r'Seq Scan on (\w+)', '\n'.join(plan or [])))),
+                        'plan': plan,
+                        'greska': greska
+                    }
+
+    def izvestaj(self, top):
+        with self.lock:
+            spori = sorted(self.spori, key=lambda upit: upit['trajanje_ms'], reverse=True)[:top]
+            naredbe = sorted(self.naredbe.items(), key=lambda stavka: stavka[1]['ukupno_ms'], reverse=True)[:top]
+            naredbe = [(kljuc, dict(naredba)) for kljuc, naredba in naredbe]
+            nepraceno = self.nepraceno
+        return {
+            "prag_ms": SLOW_QUERY_MS,
+            "prag_explain_ms": SLOW_QUERY_EXPLAIN_MS,
+            "nepraceno": nepraceno,
+            "spori": [
+                {k: v for k, v in dict(upit, upit=tekst_naredbe(upit['kljuc'])).items() if k != 'kljuc'}
+                for upit in spori
+            ],
+            "naredbe": [{
+                "upit": tekst_naredbe(kljuc),
+                "pozivi": naredba['pozivi'],
+                "ukupno_ms": round(naredba['ukupno_ms'], 2),
+                "prosek_ms": round(naredba['ukupno_ms'] / naredba['pozivi'], 3) if naredba['pozivi'] else 0.0,
+                "max_ms": round(naredba['max_ms'], 2),
+                "sporih": naredba['sporih'],
+                "plan": naredba['plan']
+            } for kljuc, naredba in naredbe]
+        }
+
+    def reset(self):
+        with self.lock:
+            self.naredbe.clear()
+            self.spori.clear()
+            self.nepraceno = 0
+
+slow_queries = SlowQueryLog()
+
+class TimedCursorMixin:
+    """Merenje trajanja execute() za SlowQueryLog"""
+
+    def execute(self, query, vars=None):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            slow_queries.zabelezi(query, vars, time.perf_counter() - t0)
+
+class TimedCursor(TimedCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+class TimedRealDictCursor(TimedCursorMixin, RealDictCursor):
+    pass
+
+TIMED_CURSORS = {None: TimedCursor, RealDictCursor: TimedRealDictCursor}
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """Konekcija koja pamti naredbe koje su na njoj već pripremljene (PREPARE)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        # statement_timeout sesije u ms (0 = bez ograničenja), postavljen iz roka zahteva
+        self.statement_timeout = 0
+
+    def cursor(self, *args, **kwargs):
+        """Kursor sa merenjem trajanja upita (SLOW_QUERY_LOG)"""
+        if SLOW_QUERY_LOG:
+            factory = kwargs.get('cursor_factory')
+            kwargs['cursor_factory'] = TIMED_CURSORS.get(factory, factory)
+        return super().cursor(*args, **kwargs)
+
+class DbPool:
+    """Pool konekcija sa lenjom inicijalizacijom; kada je iscrpljen, čeka se na slobodnu konekciju"""
+
+    def __init__(self, dsn=None, config=None, on_init=None):
+        self.dsn = dsn
+        self.config = config or {}
+        self.on_init = on_init
+        self.pool = None
+        self.lock = threading.Lock()
+        # ThreadedConnectionPool baca izuzetak kada je iscrpljen, pa se na slobodnu konekciju čeka ovde
+        self.slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+    def get_pool(self):
+        if self.pool is None:
+            with self.lock:
+                if self.pool is None:
+                    new_pool = pg_pool.ThreadedConnectionPool(
+                        DB_POOL_MIN, DB_POOL_MAX, self.dsn, connection_factory=PreparedConnection, **self.config
+                    )
+                    if self.on_init:
+                        conn = new_pool.getconn()
+                        try:
+                            self.on_init(conn)
+                        finally:
+                            new_pool.putconn(conn)
+                    self.pool = new_pool
+        return self.pool
+
+    def getconn(self, timeout=None):
+        if not self.slots.acquire(timeout=DB_POOL_TIMEOUT if timeout is None else timeout):
+            raise pg_pool.PoolError("nema slobodne konekcije u pool-u")
+        try:
+            conn = self.get_pool().getconn()
+        except Exception:
+            self.slots.release()
+            raise
+        conn.source_pool = self
+        return conn
+
+    def putconn(self, conn):
+        close = False
+        if conn.statement_timeout and not conn.closed:
+            # Rok zahteva ne sme da ostane na konekciji koju posle preuzima pozadinska nit ili ruta bez roka
+            try:
+                conn.rollback()
+                postavi_statement_timeout(conn, 0)
+            except psycopg2.Error:
+                close = True
+        self.pool.putconn(conn, close=close)
+        self.slots.release()
+
+# Primarna baza (šema se kreira pri prvom preuzimanju konekcije) i opciona replika za read-only rute
+db_pool = DbPool(config=DB_CONFIG, on_init=init_db_schema)
+read_pool = DbPool(dsn=DB_READ_DSN) if DB_READ_DSN else None
+
+# Keširano stanje replike: kašnjenje se meri najviše jednom u REPLICA_LAG_CHECK_INTERVAL sekundi,
+# a nedostupna replika se preskače REPLICA_RETRY_INTERVAL sekundi
+replica_state = {'lag': None, 'checked_at': 0.0, 'down_until': 0.0}
+replica_lock = threading.Lock()
+
+def replica_lag():
+    """Kašnjenje replike u sekundama (None ako replika nije dostupna)"""
+    now = time.monotonic()
+    if now < replica_state['down_until']:
+        return None
+    if now - replica_state['checked_at'] < REPLICA_LAG_CHECK_INTERVAL:
+        return replica_state['lag']
+    with replica_lock:
+        if now - replica_state['checked_at'] < REPLICA_LAG_CHECK_INTERVAL:
+            return replica_state['lag']
+        try:
+            conn = read_pool.getconn()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT CASE
+                        WHEN NOT pg_is_in_recovery() THEN 0
+                        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                    END
+                """)
+                lag = cursor.fetchone()[0]
+                conn.rollback()
+                cursor.close()
+            finally:
+                read_pool.putconn(conn)
+            replica_state['lag'] = float(lag) if lag is not None else None
+        except Exception as e:
+            logging.warning(f"Replika nije dostupna, čitanje ide na primarnu bazu: {e}")
+            replica_state['lag'] = None
+            replica_state['down_until'] = now + REPLICA_RETRY_INTERVAL
+        replica_state['checked_at'] = now
+    return replica_state['lag']
+
+# Zahtevi odbijeni jer im je rok istekao pre prijema i zahtevi čiji je rok istekao tokom obrade
+rokovi = {'istekli_pri_prijemu': 0, 'prekoraceni': 0}
+
+def preostalo_vreme():
+    """Preostalo vreme (sekundi) do roka tekućeg zahteva; None van zahteva i za rute bez roka"""
+    if not has_request_context() or 'rok' not in g:
+        return None
+    return g.rok - time.monotonic()
+
+def postavi_statement_timeout(conn, sekundi):
+    """
+    statement_timeout sesije (0 = bez ograničenja). SET se izvršava van transakcije, pa važi i posle commit-a
+    ili rollback-a handlera; konekcija pamti postavljenu vrednost.
+    """
+    ms = max(1, int(sekundi * 1000)) if sekundi > 0 else 0
+    if ms == conn.statement_timeout:
+        return
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SET statement_timeout = %s", (ms,))
+        cursor.close()
+    finally:
+        conn.autocommit = False
+    conn.statement_timeout = ms
+
+def get_db_connection(max_lag=None, bez_roka=False):
+    """
+    Preuzimanje konekcije iz pool-a.
+    Sa max_lag (sekundi) read-only handler dobija konekciju ka replici ako ona kasni najviše max_lag,
+    a u suprotnom (ili ako replika nije dostupna) konekciju ka primarnoj bazi.
+    U zahtevu sa rokom se na konekciju čeka najviše do roka, a statement_timeout je preostalo vreme;
+    bez_roka je za kratke završne upise koji moraju proći i posle isteka roka (npr. poništavanje zaduženja).
+    """
+    preostalo = None if bez_roka else preostalo_vreme()
+    if preostalo is not None and preostalo <= 0:
+        print("Rok zahteva je istekao pre preuzimanja konekcije sa bazom")
+        return None
+    cekanje = None if preostalo is None else min(DB_POOL_TIMEOUT, preostalo)
+    conn = None
+    if max_lag is not None and max_lag >= 0 and read_pool is not None:
+        lag = replica_lag()
+        if lag is not None and lag <= max_lag:
+            try:
+                conn = read_pool.getconn(cekanje)
+            except Exception as e:
+                logging.warning(f"Replika nije dostupna, čitanje ide na primarnu bazu: {e}")
+                replica_state['down_until'] = time.monotonic() + REPLICA_RETRY_INTERVAL
+    if conn is None:
+        try:
+            conn = db_pool.getconn(cekanje)
+        except Exception as e:
+            print(f"Greška pri konekciji sa bazom: {e}")
+            return None
+    if preostalo is not None:
+        try:
+            preostalo = preostalo_vreme()
+            if preostalo <= 0:
+                raise TimeoutError("rok zahteva je istekao dok se čekalo na konekciju")
+            postavi_statement_timeout(conn, preostalo)
+        except (TimeoutError, psycopg2.Error) as e:
+            print(f"Greška pri konekciji sa bazom: {e}")
+            conn.source_pool.putconn(conn)
+            return None
+    if has_request_context():
+        g.setdefault('db_connections', []).append(conn)
+    return conn
+
+def release_db_connection(conn):
+    """Vraćanje konekcije u pool iz kog je preuzeta (nezavršena transakcija se poništava)"""
+    if has_request_context() and conn in g.get('db_connections', []):
+        g.db_connections.remove(conn)
+    conn.source_pool.putconn(conn)
+
+@app.teardown_request
+def release_request_connections(exc):
+    """Vraća u pool konekcije koje handler nije vratio (npr. zbog izuzetka)"""
+    for conn in g.pop('db_connections', []):
+        conn.source_pool.putconn(conn)
+
+def pripremi_naredbu(cursor, name):
+    """PREPARE naredbe iz PREPARED_STATEMENTS na konekciji kursora, ako na njoj već nije pripremljena"""
+    conn = cursor.connection
+    if name not in conn.prepared:
+        counter = iter(range(1, PREPARED_STATEMENTS[name].count('%s') + 1))
+        query = re.sub(r'%s', lambda _: f"${next(counter)}", PREPARED_STATEMENTS[name])
+        cursor.execute(f"PREPARE {name} AS {query}")
+        conn.prepared.add(name)
+
+def execute_prepared(cursor, name, params):
+    """Izvršava naredbu iz PREPARED_STATEMENTS - PREPARE jednom po konekciji, zatim samo EXECUTE"""
+    pripremi_naredbu(cursor, name)
+    cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+def fetch_one(cursor, query, params, row_type=None):
+    """Izvršava upit i vraća jedan red kao tuple (ili namedtuple zadatog tipa)"""
+    cursor.execute(query, params)
+    row = cursor.fetchone()
+    if row is None or row_type is None:
+        return row
+    return row_type._make(row)
+
+def fetch_prepared(cursor, name, params, row_type=None):
+    """Kao fetch_one, ali za pripremljenu naredbu"""
+    execute_prepared(cursor, name, params)
+    row = cursor.fetchone()
+    if row is None or row_type is None:
+        return row
+    return row_type._make(row)
+
+class SingleFlight:
+    """
+    Spajanje istovremenih istih poziva: prvi pozivalac izvršava poziv, a ostali sa istim ključem čekaju
+    da se on završi i dobijaju isti rezultat (ili isti izuzetak). Završen poziv se ne kešira.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def do(self, naziv, kljuc, funkcija, timeout=None):
+        with self.lock:
+            stats = self.stats.setdefault(naziv, {'pozivi': 0, 'spojeni': 0})
+            stats['pozivi'] += 1
+            call = self.calls.get(kljuc)
+            vodeci = call is None
+            if vodeci:
+                call = self.calls[kljuc] = {'done': threading.Event(), 'result': None, 'error': None}
+            else:
+                stats['spojeni'] += 1
+        if vodeci:
+            try:
+                call['result'] = funkcija()
+            except Exception as e:
+                call['error'] = e
+            finally:
+                with self.lock:
+                    del self.calls[kljuc]
+                call['done'].set()
+        elif not call['done'].wait(timeout):
+            raise requests.exceptions.Timeout("Rok zahteva je istekao pre završetka spojenog poziva")
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+    def metrike(self):
+        with self.lock:
+            return {
+                naziv: dict(stats, udeo_spojenih=round(stats['spojeni'] / stats['pozivi'], 4) if stats['pozivi'] else 0.0)
+                for naziv, stats in self.stats.items()
+            }
+
+single_flight = SingleFlight()
+
+class RpcKlijent:
+    """
+    Klijent internog RPC-a centrale (POST /rpc, msgpack). Pozivi iz svih niti čekaju u zajedničkom redu, a RPC_CONNECTIONS
+    niti ih šalje preko trajnih HTTP konekcija: bez opterećenja poziv odlazi odmah, a pod opterećenjem jedan zahtev
+    nosi sve pozive nagomilane dok je prethodni bio u toku (do RPC_MAX_BATCH).
+    Pozivi kojima je rok istekao dok su čekali u redu se ne šalju, a svaki poslat poziv nosi svoje preostalo vreme (ms),
+    pa centrala ne izvršava poziv čiji je pozivalac već odustao (zahtev nosi najkasniji rok poziva iz serije).
+    """
+
+    def __init__(self):
+        self.red = deque()
+        self.uslov = threading.Condition()
+        self.started = False
+        self.lock = threading.Lock()
+        self.stats = {'pozivi': 0, 'zahtevi': 0, 'istekli': 0}
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        for i in range(RPC_CONNECTIONS):
+            threading.Thread(target=self.run, name=f'rpc-{i}', daemon=True).start()
+
+    def pozovi(self, poziv, preostalo=None):
+        """Šalje poziv i čeka njegov odgovor (najviše preostalo vreme zahteva); greška slanja serije se podiže i kod pozivaoca"""
+        if not self.started:
+            self.start()
+        rok = time.monotonic() + preostalo if preostalo is not None else None
+        stavka = {'poziv': poziv, 'rok': rok, 'done': threading.Event(), 'rezultat': None, 'greska': None}
+        with self.uslov:
+            self.red.append(stavka)
+            self.uslov.notify()
+        if not stavka['done'].wait(RPC_TIMEOUT * 2 if preostalo is None else min(RPC_TIMEOUT * 2, preostalo)):
+            raise requests.exceptions.Timeout("RPC poziv centrale nije završen na vreme")
+        if stavka['greska'] is not None:
+            raise stavka['greska']
+        return stavka['rezultat']
+
+    def metrike(self):
+        with self.lock:
+            return dict(self.stats, poziva_po_zahtevu=round(self.stats['pozivi'] / self.stats['zahtevi'], 2)
+                        if self.stats['zahtevi'] else 0.0)
+
+    def run(self):
+        session = requests.Session()
+        while True:
+            with self.uslov:
+                while not self.red:
+                    self.uslov.wait()
+                serija = [self.red.popleft() for _ in range(min(len(self.red), RPC_MAX_BATCH))]
+            now = time.monotonic()
+            istekli = [s for s in serija if s['rok'] is not None and s['rok'] <= now]
+            if istekli:
+                serija = [s for s in serija if s not in istekli]
+                with self.lock:
+                    self.stats['istekli'] += len(istekli)
+                for stavka in istekli:
+                    stavka['greska'] = requests.exceptions.Timeout("Rok zahteva je istekao pre slanja RPC poziva")
+                    stavka['done'].set()
+                if not serija:
+                    continue
+            headers = {'Content-Type': 'application/msgpack'}
+            timeout = RPC_TIMEOUT
+            if all(s['rok'] is not None for s in serija):
+                preostalo = max(s['rok'] for s in serija) - now
+                headers[DEADLINE_HEADER] = f"{preostalo * 1000:.0f}"
+                timeout = min(RPC_TIMEOUT, preostalo)
+            try:
+                response = session.post(f"{CENTRAL_URL}/rpc", data=msgpack.packb([
+                    list(s['poziv']) + [None if s['rok'] is None else max(0, round((s['rok'] - now) * 1000))]
+                    for s in serija
+                ]), headers=headers, timeout=timeout)
+                response.raise_for_status()
+                for stavka, rezultat in zip(serija, msgpack.unpackb(response.content)):
+                    stavka['rezultat'] = rezultat
+            except Exception as e:
+                for stavka in serija:
+                    stavka['greska'] = e
+            with self.lock:
+                self.stats['pozivi'] += len(serija)
+                self.stats['zahtevi'] += 1
+            for stavka in serija:
+                stavka['done'].set()
+
+rpc_klijent = RpcKlijent() if INTERNAL_RPC == 'msgpack' else None
+
+def rpc_odgovor(endpoint, rezultat):
+    """Odgovor RPC-a u obliku odgovora JSON API-ja centrale (rute grada ih obrađuju isto)"""
+    if rezultat[0] == RPC_GRESKA:
+        return {"success": False, "message": rezultat[1]}
+    if rezultat[0] == RPC_ODBIJENO:
+        if endpoint == '/korisnici/proveri-zaduzenje':
+            return {"success": False, "message": "Korisnik nije registrovan"}
+        if endpoint == '/korisnici/zaduzi-bicikl':
+            return {"success": False, "message": "Korisnik nije pronađen ili je dostigao maksimalan broj zaduženja"}
+        return {"success": False, "message": "Korisnik nije pronađen ili nema aktivnih zaduženja"}
+    if endpoint == '/korisnici/proveri-zaduzenje':
+        return {
+            "success": True,
+            "can_rent": rezultat[1] < 2,
+            "current_rentals": rezultat[1],
+            "user_id": rezultat[2],
+            "ime": rezultat[3],
+            "prezime": rezultat[4]
+        }
+    return {"success": True, "user_id": rezultat[2], "active_rentals": rezultat[1]}
+
+# Dostupnost centrale za degradirani režim: nedostupna je od prvog poziva koji nije uspostavio vezu do prvog odgovora
+# (istek čekanja na odgovor ne znači nedostupnost - centrala je zahtev možda već obradila)
+centrala_stanje = {'nedostupna_od': None}
+degradirano = {'zaduzenja': 0, 'razduzenja': 0, 'odbijena_zaduzenja': 0}
+degradirano_lock = threading.Lock()
+
+def zabelezi_degradirano(dogadjaj):
+    """Brojanje zaduženja/razduženja primljenih (ili odbijenih) u degradiranom režimu - brojači se menjaju iz više niti"""
+    with degradirano_lock:
+        degradirano[dogadjaj] += 1
+
+def oznaci_centralu(dostupna):
+    if dostupna:
+        centrala_stanje['nedostupna_od'] = None
+    elif centrala_stanje['nedostupna_od'] is None:
+        centrala_stanje['nedostupna_od'] = datetime.now().isoformat(timespec='seconds')
+
+def centrala_nedostupna():
+    return centrala_stanje['nedostupna_od'] is not None
+
+# Zajednička HTTP sesija za pozive centrale - trajne konekcije, pa se adresa centrale ne razrešava pri svakom pozivu
+centrala_http = requests.Session()
+centrala_http.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE))
+centrala_http.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE))
+
+def call_centralna_api(endpoint, data=None, method='POST'):
+    """Helper funkcija za pozivanje API-ja centralne biciklane (istovremeni isti pozivi čitanja se spajaju)"""
+    if SINGLE_FLIGHT and (method == 'GET' or endpoint in SINGLE_FLIGHT_ENDPOINTS):
+        kljuc = (method, endpoint, json.dumps(data, sort_keys=True))
+        try:
+            return single_flight.do(endpoint, kljuc, lambda: posalji_centrali(endpoint, data, method),
+                                    preostalo_vreme())
+        except requests.exceptions.Timeout as e:
+            print(f"Greška pri pozivu centralne API: {e}")
+            return None
+    return posalji_centrali(endpoint, data, method)
+
+def posalji_centrali(endpoint, data=None, method='POST'):
+    """
+    Jedan poziv API-ja centralne biciklane (provere i (raz)zaduženja preko internog RPC-a, ako je uključen).
+    Vraća JSON odgovor centrale ili None ako poziv nije uspeo; da li je centrala dostupna pamti oznaci_centralu.
+    """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        # Centrala dobija preostalo vreme zahteva i prekida obradu kada ono istekne
+        preostalo = preostalo_vreme()
+        if preostalo is not None and preostalo <= 0:
+            raise requests.exceptions.Timeout("Rok zahteva je istekao pre poziva centrale")
+        
+        if rpc_klijent is not None and endpoint in RPC_OPERACIJE:
+            rezultat = rpc_klijent.pozovi([
+                RPC_OPERACIJE[endpoint],
+                data['jmbg'],
+                data.get('grad'),
+                data.get('oznaka_bicikla'),
+                data.get('datum_zaduzivanja')
+            ], preostalo)
+            oznaci_centralu(True)
+            return rpc_odgovor(endpoint, rezultat)
+        
+        url = f"{CENTRAL_URL}{endpoint}"
+        # Centrala dobija tačno vreme koje se čeka na njen odgovor, da ne bi primenila poziv posle odustajanja
+        timeout = 10 if preostalo is None else min(10, preostalo)
+        headers = {DEADLINE_HEADER: f"{timeout * 1000:.0f}"}
+        
+        if method == 'POST':
+            response = centrala_http.post(url, json=data, headers=headers, timeout=timeout)
+        elif method == 'GET':
+            response = centrala_http.get(url, headers=headers, timeout=timeout)
+        else:
+            return None
+        
+        oznaci_centralu(True)
+        return response.json() if response.status_code in [200, 201, 400, 404, 409] else None
+        
+    except requests.exceptions.RequestException as e:
+        print(f"Greška pri pozivu centralne API: {e}")
+        if isinstance(e, requests.exceptions.ConnectionError):
+            oznaci_centralu(False)
+        return None
+
+class ActiveBikeSet:
+    """
+    Skup oznaka aktivnih bicikala u memoriji procesa.
+    Učitava se pri pokretanju i ažurira preko LISTEN aktivni_bicikli; dok veza sa bazom ne radi, keš je isključen.
+    """
+
+    def __init__(self):
+        self.bikes = set()
+        self.ready = False
+        self.started = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='active-bikes', daemon=True).start()
+
+    def contains(self, oznaka_bicikla):
+        """True samo ako je keš ažuran i bicikl je u njemu aktivan"""
+        return self.ready and oznaka_bicikla in self.bikes
+
+    def ucitaj(self, cursor):
+        """Učitavanje svih aktivnih bicikala (pri povezivanju i posle masovnog upisa)"""
+        cursor.execute("SELECT oznaka_bicikla FROM zaduzenja WHERE status = 'aktivan'")
+        self.bikes = {row[0] for row in cursor.fetchall()}
+        logging.info(f"Keš aktivnih bicikala učitan ({len(self.bikes)} bicikala)")
+
+    def run(self):
+        while True:
+            conn = None
+            try:
+                db_pool.get_pool()  # šema i trigger moraju postojati pre LISTEN-a
+                conn = psycopg2.connect(**DB_CONFIG)
+                conn.autocommit = True
+                cursor = conn.cursor()
+                # LISTEN pre učitavanja, da se ne izgube promene nastale tokom učitavanja
+                cursor.execute("LISTEN aktivni_bicikli")
+                self.ucitaj(cursor)
+                self.ready = True
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        # Provera da je veza živa
+                        cursor.execute("SELECT 1")
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        payload = json.loads(conn.notifies.pop(0).payload)
+                        if payload.get('ponovo_ucitaj'):
+                            # Masovni upis je commit-ovan - obaveštenja koja slede se primenjuju na novi skup
+                            self.ucitaj(cursor)
+                        elif payload['aktivan']:
+                            self.bikes.add(payload['oznaka_bicikla'])
+                        else:
+                            self.bikes.discard(payload['oznaka_bicikla'])
+            except Exception as e:
+                logging.warning(f"Keš aktivnih bicikala nije dostupan: {e}")
+            finally:
+                self.ready = False
+                if conn is not None:
+                    conn.close()
+            time.sleep(ACTIVE_BIKE_RETRY_INTERVAL)
+
+active_bikes = ActiveBikeSet()
+
+class EligibilityCache:
+    """
+    Keš odgovora /korisnici/proveri-zaduzenje po JMBG-u.
+    Ažurira se iz toka promena centrale (/korisnici/promene); dok tok nije otvoren, keš je isključen i prazan
+    (u degradiranom režimu stanje iz trenutka prekida ostaje dostupno preko poslednje()).
+    """
+
+    def __init__(self):
+        self.users = OrderedDict()
+        self.ready = False
+        self.prekinut = None
+        self.started = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='eligibility-cache', daemon=True).start()
+
+    def get(self, jmbg):
+        """Keširan odgovor provere ili None (keš nije ažuran ili korisnik nije u njemu)"""
+        if not self.ready:
+            return None
+        with self.lock:
+            return self.users.get(jmbg)
+
+    def put(self, jmbg, stanje, overwrite=True):
+        """Upis stanja; overwrite=False ne menja stanje koje je u međuvremenu stiglo iz toka promena"""
+        with self.lock:
+            if not self.ready or (not overwrite and jmbg in self.users):
+                return
+            self.users[jmbg] = stanje
+            self.users.move_to_end(jmbg)
+            while len(self.users) > ELIGIBILITY_CACHE_SIZE:
+                self.users.popitem(last=False)
+
+    def poslednje(self, jmbg, max_age):
+        """Stanje korisnika i kada tok nije otvoren, ako je od prekida toka prošlo najviše max_age sekundi"""
+        with self.lock:
+            if not self.ready and (self.prekinut is None or time.monotonic() - self.prekinut > max_age):
+                return None
+            return self.users.get(jmbg)
+
+    def reset(self, ready):
+        with self.lock:
+            if ready or not DEGRADED_MODE:
+                self.users.clear()
+            if not ready and self.ready:
+                self.prekinut = time.monotonic()
+            self.ready = ready
+
+    def run(self):
+        while True:
+            try:
+                with requests.get(f"{CENTRAL_URL}/korisnici/promene", stream=True,
+                                  timeout=(READY_CHECK_TIMEOUT, CHANGE_FEED_READ_TIMEOUT)) as response:
+                    response.raise_for_status()
+                    event = None
+                    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                        if line.startswith('event:'):
+                            event = line[6:].strip()
+                        elif line.startswith('data:'):
+                            data = json.loads(line[5:])
+                            if event == 'reset':
+                                self.reset(True)
+                                logging.info("Tok promena centrale je otvoren, keš prava na zaduženje je aktivan")
+                            elif event == 'brojac':
+                                self.put(data['jmbg'], {
+                                    "success": True,
+                                    "can_rent": data['broj_aktivnih_bicikala'] < 2,
+                                    "current_rentals": data['broj_aktivnih_bicikala'],
+                                    "user_id": data['user_id'],
+                                    "ime": data['ime'],
+                                    "prezime": data['prezime']
+                                })
+                        elif not line:
+                            event = None
+            except Exception as e:
+                logging.warning(f"Tok promena centrale nije dostupan: {e}")
+            self.reset(False)
+            time.sleep(CHANGE_FEED_RETRY_INTERVAL)
+
+eligibility = EligibilityCache()
+
+def osvezi_statistiku(conn):
+    """
+    Inkrementalno osvežavanje statistika_zaduzenja: ponovo se računaju samo grupe (dan, tip) sa redovima
+    promenjenim posle watermark-a. Vraća broj osveženih grupa (None ako osvežavanje već radi drugi proces).
+    """
+    cursor = conn.cursor()
+    # Samo jedan proces (pod) osvežava u jednom trenutku
+    cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext('statistika_zaduzenja'))")
+    if not cursor.fetchone()[0]:
+        conn.rollback()
+        cursor.close()
+        return None
+    cursor.execute("SELECT LOCALTIMESTAMP - make_interval(secs => %s)", (STATISTIKA_MARGIN,))
+    do = cursor.fetchone()[0]
+    cursor.execute(SQL_OSVEZI_STATISTIKU, {'do': do})
+    broj = cursor.rowcount
+    cursor.execute("""
+        UPDATE statistika_watermark SET obradjeno_do = GREATEST(obradjeno_do, %s)
+        WHERE naziv = 'zaduzenja'
+    """, (do,))
+    conn.commit()
+    cursor.close()
+    return broj
+
+class StatsRefresher:
+    """Pozadinsko osvežavanje statistike na svakih STATISTIKA_REFRESH_INTERVAL sekundi"""
+
+    def __init__(self):
+        self.started = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='stats-refresher', daemon=True).start()
+
+    def run(self):
+        while True:
+            conn = None
+            try:
+                conn = db_pool.getconn()
+                broj = osvezi_statistiku(conn)
+                if broj:
+                    logging.info(f"Statistika zaduženja osvežena ({broj} grupa)")
+            except Exception as e:
+                logging.warning(f"Greška pri osvežavanju statistike: {e}")
+            finally:
+                if conn is not None:
+                    db_pool.putconn(conn)
+            time.sleep(STATISTIKA_REFRESH_INTERVAL)
+
+stats_refresher = StatsRefresher()
+
+class CentralOutbox:
+    """
+    Slanje događaja iz dogadjaji_centrala centrali (POST /zakupi/dogadjaji) u serijama, po redosledu id-a.
+    Događaj se briše tek kada ga centrala potvrdi; ponovo poslat događaj centrala prepoznaje po (grad, id).
+    """
+
+    def __init__(self):
+        self.started = False
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stats = {'poslato': 0, 'greske': 0, 'poslednja_greska': None}
+        self.slanja = deque()
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='central-outbox', daemon=True).start()
+
+    def probudi(self):
+        """Slanje odmah, bez čekanja na OUTBOX_FLUSH_INTERVAL (posle novog događaja)"""
+        self.wake.set()
+
+    def posalji(self, conn):
+        """Šalje jednu seriju događaja; vraća broj poslatih (0 i kada seriju već šalje drugi proces)"""
         cursor = conn.cursor()
+        cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext('dogadjaji_centrala'))")
+        if not cursor.fetchone()[0]:
+            conn.rollback()
+            cursor.close()
+            return 0
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS zaduzenja (
-            id SERIAL PRIMARY KEY,
-            korisnik_id INTEGER NOT NULL,
-            jmbg VARCHAR(13) NOT NULL,
-            ime VARCHAR(50) NOT NULL,
-            prezime VARCHAR(50) NOT NULL,
-            oznaka_bicikla VARCHAR(20) NOT NULL,
-            tip_bicikla VARCHAR(30) NOT NULL,
-            datum_zaduzivanja DATE NOT NULL,
-            datum_razduzivanja DATE,
-            status VARCHAR(20) NOT NULL DEFAULT 'aktivan',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
+            SELECT id, vrsta, lpad(jmbg::text, 13, '0'), oznaka_bicikla, datum_zaduzivanja::text
+            FROM dogadjaji_centrala
+            ORDER BY id
+            LIMIT %s
+        """, (OUTBOX_BATCH_SIZE,))
+        dogadjaji = [
+            dict(zip(('id', 'vrsta', 'jmbg', 'oznaka_bicikla', 'datum_zaduzivanja'), row))
+            for row in cursor.fetchall()
+        ]
+        if dogadjaji:
+            response = requests.post(f"{CENTRAL_URL}/zakupi/dogadjaji", json={
+                'grad': GRAD_NAZIV,
+                'dogadjaji': dogadjaji
+            }, timeout=LEASE_CENTRAL_TIMEOUT)
+            response.raise_for_status()
+            cursor.execute("DELETE FROM dogadjaji_centrala WHERE id = ANY(%s)", ([d['id'] for d in dogadjaji],))
         conn.commit()
         cursor.close()
-        return conn
-    except Exception as e:
-        print(f"Greška pri konekciji sa bazom: {e}")
+        if dogadjaji:
+            oznaci_centralu(True)
+            with self.lock:
+                self.stats['poslato'] += len(dogadjaji)
+                self.slanja.append((time.monotonic(), len(dogadjaji)))
+        return len(dogadjaji)
+
+    def metrike(self, cursor):
+        """Dubina reda, starost najstarijeg događaja i brzina pražnjenja (događaja/s u OUTBOX_RATE_WINDOW)"""
+        cursor.execute("""
+            SELECT count(*), COALESCE(EXTRACT(EPOCH FROM LOCALTIMESTAMP - min(created_at)), 0)
+            FROM dogadjaji_centrala
+        """)
+        u_redu, najstariji = cursor.fetchone()
+        granica = time.monotonic() - OUTBOX_RATE_WINDOW
+        with self.lock:
+            while self.slanja and self.slanja[0][0] < granica:
+                self.slanja.popleft()
+            poslato = sum(broj for _, broj in self.slanja)
+            return dict(self.stats, u_redu=u_redu, najstariji_s=round(float(najstariji), 1),
+                        poslato_po_s=round(poslato / OUTBOX_RATE_WINDOW, 2))
+
+    def run(self):
+        while True:
+            self.wake.wait(OUTBOX_FLUSH_INTERVAL)
+            self.wake.clear()
+            conn = None
+            try:
+                conn = db_pool.getconn()
+                while self.posalji(conn) == OUTBOX_BATCH_SIZE:
+                    pass
+            except Exception as e:
+                if isinstance(e, requests.exceptions.ConnectionError):
+                    oznaci_centralu(False)
+                with self.lock:
+                    self.stats['greske'] += 1
+                    self.stats['poslednja_greska'] = str(e)
+                logging.warning(f"Slanje događaja centrali nije uspelo: {e}")
+                time.sleep(OUTBOX_FLUSH_INTERVAL)
+            finally:
+                if conn is not None:
+                    db_pool.putconn(conn)
+
+central_outbox = CentralOutbox()
+
+class LeaseManager:
+    """
+    Obnova zakupa kvote na svakih LEASE_RENEW_INTERVAL sekundi, jednom serijom za sve aktivne korisnike grada.
+    Poziv centrale ide bez otvorene transakcije i zaključanih zakupa, pa ga zaduženja po zakupu ne čekaju: do primene
+    odgovora važe stari limiti, a centrala smanjen ili ukinut zakup računa kao rezervisan do isteka stare dodele.
+    Obnavlja jedan proces (sesijsko advisory zaključavanje), pa je odgovor primenjen pre sledeće obnove; ako obnova
+    ne uspe, zakupi se brišu i zaduženja idu preko centrale.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.lock = threading.Lock()
+        self.stats = {'zakupa': 0, 'obnovljeno': None, 'greske': 0, 'poslednja_greska': None}
+        self.upozoreno = False
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='lease-manager', daemon=True).start()
+
+    def proveri_grace(self, grace):
+        """
+        Zaduženja iz zakupa centrala računa kao rezervisana još LEASE_GRACE sekundi posle isteka zakupa; outbox
+        koji kasni toliko ili više znači da bi se limit mogao prekoračiti, pa se zakupi tada ne koriste.
+        """
+        if grace is None or OUTBOX_MAX_AGE < grace:
+            return True
+        if not self.upozoreno:
+            self.upozoreno = True
+            logging.warning(f"OUTBOX_MAX_AGE ({OUTBOX_MAX_AGE}s) nije manji od LEASE_GRACE centrale ({grace}s) - "
+                            f"zakupi se ne koriste, zaduženja idu preko centrale")
+        return False
+
+    def metrike(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def obnovi(self, conn):
+        """Jedna obnova; vraća broj zakupa (None ako obnovu upravo radi drugi proces)"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext('zakupi'))")
+        if not cursor.fetchone()[0]:
+            conn.rollback()
+            cursor.close()
+            return None
+        try:
+            return self.obnovi_zakupe(conn, cursor)
+        finally:
+            if not conn.closed:
+                conn.rollback()
+                cursor.execute("SELECT pg_advisory_unlock(hashtext('zakupi'))")
+                conn.commit()
+            cursor.close()
+
+    def obnovi_zakupe(self, conn, cursor):
+        """Čitanje aktivnih korisnika, poziv centrale van transakcije i primena odgovora kratkom transakcijom"""
+        cursor.execute(SQL_AKTIVNI_KORISNICI, (LEASE_ACTIVE_WINDOW,))
+        korisnici = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+        pocetak = time.monotonic()
+        try:
+            response = requests.post(f"{CENTRAL_URL}/zakupi", json={
+                'grad': GRAD_NAZIV,
+                'jmbg': korisnici
+            }, timeout=LEASE_CENTRAL_TIMEOUT)
+            response.raise_for_status()
+            body = response.json()
+        except Exception:
+            # Centrala je možda već smanjila limite - zakupi se brišu pre otpuštanja zaključavanja obnove
+            cursor.execute("DELETE FROM zakupi")
+            conn.commit()
+            raise
+        # Rok se računa od slanja zahteva (centrala ga računa od svog odgovora), uz rezervu LEASE_SKEW
+        trajanje = body['trajanje'] - (time.monotonic() - pocetak) - LEASE_SKEW
+        zakupi = body['zakupi'] if trajanje > 0 and self.proveri_grace(body.get('grace')) else []
+        if zakupi:
+            execute_values(cursor, """
+                INSERT INTO zakupi (jmbg, korisnik_id, ime, prezime, limit_zaduzenja, u_drugim_gradovima, istice)
+                VALUES %s
+                ON CONFLICT (jmbg) DO UPDATE SET
+                    korisnik_id = EXCLUDED.korisnik_id, ime = EXCLUDED.ime, prezime = EXCLUDED.prezime,
+                    limit_zaduzenja = EXCLUDED.limit_zaduzenja, u_drugim_gradovima = EXCLUDED.u_drugim_gradovima,
+                    istice = EXCLUDED.istice
+            """, [
+                (z['jmbg'], z['user_id'], z['ime'], z['prezime'], z['limit'], z['u_drugim_gradovima'], trajanje)
+                for z in zakupi
+            ], template="(%s, %s, %s, %s, %s, %s, LOCALTIMESTAMP + make_interval(secs => %s))", page_size=1000)
+        cursor.execute(f"DELETE FROM zakupi WHERE NOT (jmbg = ANY(%s::{JMBG_TIP}[]))", ([z['jmbg'] for z in zakupi],))
+        conn.commit()
+        return len(zakupi)
+
+    def run(self):
+        while True:
+            conn = None
+            try:
+                conn = db_pool.getconn()
+                broj = self.obnovi(conn)
+                if broj is not None:
+                    with self.lock:
+                        self.stats['zakupa'] = broj
+                        self.stats['obnovljeno'] = datetime.now().isoformat(timespec='seconds')
+            except Exception as e:
+                with self.lock:
+                    self.stats['greske'] += 1
+                    self.stats['poslednja_greska'] = str(e)
+                logging.warning(f"Obnova zakupa nije uspela, zaduženja idu preko centrale: {e}")
+            finally:
+                if conn is not None:
+                    db_pool.putconn(conn)
+            time.sleep(LEASE_RENEW_INTERVAL)
+
+lease_manager = LeaseManager()
+
+def povezi_centralu():
+    """Otvara trajnu konekciju ka centrali (adresa se razrešava samo tada); vraća 'ok' ili opis greške"""
+    if rpc_klijent is not None:
+        rpc_klijent.start()
+    try:
+        centrala_http.get(f"{CENTRAL_URL}/live", timeout=READY_CHECK_TIMEOUT).raise_for_status()
+        return 'ok'
+    except requests.exceptions.RequestException as e:
+        return f"greška: {e}"
+
+def trajanje_procesa():
+    """Sekundi od pokretanja procesa (iz /proc, samo Linux; inače None)"""
+    try:
+        with open('/proc/self/stat') as f:
+            pocetak = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - pocetak / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def otvori_baze():
+    """Pool primarne baze (sa kreiranjem šeme) i replike otvaraju DB_POOL_MIN konekcija"""
+    db_pool.get_pool()
+    if read_pool is not None:
+        read_pool.get_pool()
+
+def pripremi_pool():
+    """Na DB_POOL_MIN konekcija primarne baze (ostaju otvorene u pool-u) priprema sve naredbe; vraća njihov broj"""
+    konekcije = []
+    try:
+        for _ in range(DB_POOL_MIN):
+            konekcije.append(db_pool.getconn())
+        for conn in konekcije:
+            cursor = conn.cursor()
+            for name in PREPARED_STATEMENTS:
+                pripremi_naredbu(cursor, name)
+            conn.commit()
+            cursor.close()
+    finally:
+        for conn in konekcije:
+            db_pool.putconn(conn)
+    return len(konekcije)
+
+def sacekaj_keseve(kesevi):
+    """Čeka da keševi (naziv -> funkcija spremnosti) budu učitani, najviše WARMUP_CACHE_TIMEOUT sekundi"""
+    rok = time.monotonic() + WARMUP_CACHE_TIMEOUT
+    while not all(spreman() for spreman in kesevi.values()) and time.monotonic() < rok:
+        time.sleep(0.05)
+    return {naziv: 'ok' if spreman() else 'nije učitan' for naziv, spreman in kesevi.items()}
+
+class StartupWarmup:
+    """
+    Zagrevanje pre spremnosti: faze se izvršavaju redom i mere, a neuspela faza (npr. baza nije dostupna) ponavlja se
+    posle WARMUP_RETRY_INTERVAL sekundi. Nedostupni povezani servisi i neučitani keševi ne blokiraju spremnost -
+    njihovo stanje se samo beleži u izveštaju.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.zavrseno = False
+        self.lock = threading.Lock()
+        self.faze = {}
+        self.stanje = {}
+        self.greska = None
+        self.ukupno = None
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='warmup', daemon=True).start()
+
+    def faza(self, naziv, funkcija):
+        t0 = time.perf_counter()
+        rezultat = funkcija()
+        self.faze[naziv] = round((time.perf_counter() - t0) * 1000, 1)
+        return rezultat
+
+    def izvestaj(self):
+        return {
+            "zavrseno": self.zavrseno,
+            "faze_ms": self.faze,
+            "ukupno_ms": self.ukupno,
+            "stanje": self.stanje,
+            "greska": self.greska
+        }
+
+    def run(self):
+        if TRAJANJE_UVOZA is not None:
+            self.faze['uvoz'] = round(TRAJANJE_UVOZA * 1000, 1)
+        while True:
+            try:
+                self.faza('baza_i_sema', otvori_baze)
+                self.stanje['konekcije'] = self.faza('pripremljene_naredbe', pripremi_pool)
+                self.stanje['centrala'] = self.faza('centrala', povezi_centralu)
+                start_background_workers()
+                if WARMUP_PRELOAD_CACHES:
+                    kesevi = {}
+                    if ACTIVE_BIKE_CACHE:
+                        kesevi['aktivni_bicikli'] = lambda: active_bikes.ready
+                    if ELIGIBILITY_CACHE:
+                        kesevi['pravo_na_zaduzenje'] = lambda: eligibility.ready
+                    self.stanje['kesevi'] = self.faza('kesevi', lambda: sacekaj_keseve(kesevi))
+                break
+            except Exception as e:
+                self.greska = str(e)
+                logging.warning(f"Zagrevanje nije uspelo, ponavlja se: {e}")
+                time.sleep(WARMUP_RETRY_INTERVAL)
+        self.greska = None
+        trajanje = trajanje_procesa()
+        self.ukupno = round(trajanje * 1000, 1) if trajanje is not None else round(sum(self.faze.values()), 1)
+        self.zavrseno = True
+        logging.info(f"Zagrevanje završeno, pokretanje je trajalo {self.ukupno} ms (faze: {self.faze})")
+
+warmup = StartupWarmup()
+
+@app.before_request
+def start_background_workers():
+    """Pokretanje pozadinskih niti (i zagrevanja) pri prvom zahtevu"""
+    if WARMUP and not warmup.started:
+        warmup.start()
+    if ACTIVE_BIKE_CACHE and not active_bikes.started:
+        active_bikes.start()
+    if ELIGIBILITY_CACHE and not eligibility.started:
+        eligibility.start()
+    if STATISTIKA_REFRESH_INTERVAL > 0 and not stats_refresher.started:
+        stats_refresher.start()
+    if LEASES and not lease_manager.started:
+        lease_manager.start()
+    # Outbox radi i bez zakupa i degradiranog režima - njime idu i poništavanja zaduženja bez odgovora centrale
+    if not central_outbox.started:
+        central_outbox.start()
+    if SLOW_QUERY_LOG and SLOW_QUERY_EXPLAIN_MS >= 0 and not slow_queries.started:
+        slow_queries.start()
+
+@app.before_request
+def postavi_rok():
+    """Rok zahteva - REQUEST_DEADLINE ili kraće preostalo vreme pozivaoca iz X-Request-Deadline; istekao rok = 504"""
+    if REQUEST_DEADLINE <= 0 or request.endpoint in DEADLINE_EXEMPT:
+        return None
+    budzet = REQUEST_DEADLINE
+    try:
+        budzet = min(budzet, float(request.headers.get(DEADLINE_HEADER, 'inf')) / 1000)
+    except ValueError:
+        pass
+    g.rok = time.monotonic() + budzet
+    if budzet > 0:
+        return None
+    rokovi['istekli_pri_prijemu'] += 1
+    return jsonify({
+        "success": False,
+        "message": "Rok zahteva je istekao"
+    }), 504
+
+@app.after_request
+def prekoracen_rok(response):
+    """Greška zahteva kome je rok istekao tokom obrade (statement_timeout, istek poziva drugog servisa) postaje 504"""
+    preostalo = preostalo_vreme()
+    if response.status_code < 500 or response.status_code == 504 or preostalo is None or preostalo > 0:
+        return response
+    rokovi['prekoraceni'] += 1
+    response.set_data(app.json.dumps({"success": False, "message": "Rok zahteva je istekao"}))
+    response.mimetype = 'application/json'
+    response.status_code = 504
+    return response
+
+def izracunaj_etag(*validator):
+    """Slab ETag iz validatora sadržaja (broj redova, poslednja izmena...) i JSON enkodera, od kog zavisi format datuma"""
+    return hashlib.sha1(repr((validator, JSON_ENCODER)).encode()).hexdigest()[:24]
+
+def nije_izmenjeno(etag):
+    """304 odgovor ako klijent već ima verziju sa ovim ETag-om (If-None-Match), inače None"""
+    if not request.if_none_match.contains_weak(etag):
         return None
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def sa_etag(response, etag):
+    """Dodaje ETag odgovoru; no-cache znači da klijent sme da čuva odgovor, ali ga uvek proverava sa If-None-Match"""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def izaberi_kodiranje():
+    """Kodiranje za odgovor prema Accept-Encoding zaglavlju ('br', 'gzip' ili None)"""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def kompresor(kodiranje):
+    """Vraća (compress, flush, finish) za strimovanu kompresiju u zadatom kodiranju"""
+    if kodiranje == 'br':
+        c = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+        return c.process, c.flush, c.finish
+    c = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+def kompresuj_tok(delovi, kodiranje):
+    """Kompresija strimovanog odgovora - svaki deo se odmah šalje (sync flush), pa tok ne čeka na kraj"""
+    compress, flush, finish = kompresor(kodiranje)
+    for deo in delovi:
+        if deo:
+            yield compress(deo) + flush()
+    yield finish()
+
+@app.after_request
+def compress_response(response):
+    """Kompresija JSON odgovora većih od COMPRESS_MIN_SIZE (i svih strimovanih), prema Accept-Encoding"""
+    if (COMPRESS_MIN_SIZE <= 0 or response.status_code != 200 or response.mimetype != 'application/json'
+            or response.direct_passthrough or 'Content-Encoding' in response.headers):
+        return response
+    if not response.is_streamed and response.content_length is not None and response.content_length < COMPRESS_MIN_SIZE:
+        return response
+    response.vary.add('Accept-Encoding')
+    kodiranje = izaberi_kodiranje()
+    if kodiranje is None:
+        return response
+    if response.is_streamed:
+        response.response = kompresuj_tok(response.iter_encoded(), kodiranje)
+        response.headers.pop('Content-Length', None)
+    else:
+        compress, _, finish = kompresor(kodiranje)
+        response.set_data(compress(response.get_data()) + finish())
+    response.headers['Content-Encoding'] = kodiranje
+    return response
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    return jsonify({"status": "OK", "service": f"Bike shop {GRAD_NAZIV}"}), 200
+
+ready_state = {'checked_at': None, 'ready': False, 'checks': {}}
+ready_lock = threading.Lock()
+
+def check_database():
+    """Provera da li pool može da izda konekciju i da baza odgovara"""
+    try:
+        conn = db_pool.getconn(timeout=READY_CHECK_TIMEOUT)
+    except Exception as e:
+        return f"greška: {e}"
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+        conn.rollback()
+        return "ok"
+    except Exception as e:
+        return f"greška: {e}"
+    finally:
+        db_pool.putconn(conn)
+
+def check_central():
+    """Provera da li je centralna biciklana dostupna"""
+    try:
+        response = centrala_http.get(f"{CENTRAL_URL}/live", timeout=READY_CHECK_TIMEOUT)
+        return "ok" if response.status_code == 200 else f"greška: status {response.status_code}"
+    except requests.exceptions.RequestException as e:
+        return f"greška: {e}"
+
+def check_readiness():
+    """Vraća (ready, checks); provere se izvršavaju najviše jednom u READY_CACHE_TTL sekundi"""
+    if WARMUP and not warmup.zavrseno:
+        return False, {'zagrevanje': f"greška: {warmup.greska}" if warmup.greska else 'u toku'}
+    now = time.monotonic()
+    with ready_lock:
+        if ready_state['checked_at'] is None or now - ready_state['checked_at'] >= READY_CACHE_TTL:
+            checks = {'baza': check_database()}
+            checks['centrala'] = check_central()
+            ready_state['checks'] = checks
+            # U degradiranom režimu pod radi i bez centrale, pa ostaje spreman
+            ready_state['ready'] = checks['baza'] == 'ok' and (
+                checks['centrala'] == 'ok' or not READY_REQUIRE_CENTRAL or DEGRADED_MODE
+            )
+            ready_state['checked_at'] = now
+        return ready_state['ready'], ready_state['checks']
+
+@app.route('/metrike', methods=['GET'])
+def get_metrike():
+    """
+    Metrike poziva ka centrali: spajanje istovremenih poziva po ruti, serije internog RPC-a, obnova zakupa,
+    red događaja za centralu (dubina i brzina pražnjenja), zaduženja/razduženja primljena u degradiranom režimu
+    i zahtevi kojima je istekao rok
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({
+                "success": False,
+                "message": "Greška pri konekciji sa bazom podataka"
+            }), 500
+        cursor = conn.cursor()
+        outbox = central_outbox.metrike(cursor)
+        cursor.close()
+        release_db_connection(conn)
+        with degradirano_lock:
+            degradirano_stanje = dict(degradirano)
+        
+        return jsonify({
+            "success": True,
+            "single_flight": single_flight.metrike(),
+            "rpc": rpc_klijent.metrike() if rpc_klijent is not None else None,
+            "zakupi": lease_manager.metrike(),
+            "outbox": outbox,
+            "degradirani_rezim": dict(degradirano_stanje, ukljucen=DEGRADED_MODE, **centrala_stanje),
+            "rokovi": rokovi
+        }), 200
+        
+    except Exception as e:
+        print(f"Greška pri dohvatanju metrika: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+@app.route('/live', methods=['GET'])
+def liveness_check():
+    """Liveness proba - proces radi i obrađuje zahteve"""
+    return jsonify({"status": "OK", "service": f"Bike shop {GRAD_NAZIV}"}), 200
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness proba - zagrevanje je završeno i zavisnosti su dostupne (rezultat provere je keširan)"""
+    ready, checks = check_readiness()
+    return jsonify({
+        "status": "OK" if ready else "NOT READY",
+        "service": f"Bike shop {GRAD_NAZIV}",
+        "checks": checks,
+        "pokretanje": warmup.izvestaj()
+    }), 200 if ready else 503
+
+@app.route('/registracija', methods=['POST'])
+def registruj_korisnika():
+    """
+    Registracija novog korisnika preko centralne biciklane
+    Expected JSON: {
+        "jmbg": "1234567890123",
+        "ime": "Marko",
+        "prezime": "Petrovic", 
+        "adresa": "Bulevar Oslobođenja 1, Novi Sad"
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        # Validacija podataka
+        required_fields = ['jmbg', 'ime', 'prezime', 'adresa']
+        for field in required_fields:
+            if field not in data or not data[field]:
+                return jsonify({
+                    "success": False,
+                    "message": f"Nedostaje obavezan podatak: {field}"
+                }), 400
+        
+        # Neispravan JMBG se odbija bez poziva centrale
+        greska = proveri_jmbg(data['jmbg'], JMBG_KONTROLNA_CIFRA)
+        if greska:
+            return jsonify({
+                "success": False,
+                "message": greska
+            }), 400
+        
+        # Poziv centralne biciklane za registraciju
+        response = call_centralna_api('/korisnici/registracija', data)
+        
+        if not response:
+            return jsonify({
+                "success": False,
+                "message": "Greška pri komunikaciji sa centralnom biciklanom"
+            }), 500
+        
+        if response.get('success'):
+            return jsonify({
+                "success": True,
+                "message": f"Korisnik uspešno registrovan u {GRAD_NAZIV}",
+                "user_id": response.get('user_id')
+            }), 201
+        else:
+            return jsonify(response), 409
+            
+    except Exception as e:
+        print(f"Greška pri registraciji: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+
+
+def zaduzi_preko_zakupa(data):
+    """
+    Zaduženje u okviru zakupa kvote, bez poziva centrale: zaduženje i događaj za centralu upisuju se u istoj
+    transakciji. Vraća odgovor ili None kada korisnik nema važeći zakup ili ga je iskoristio (ide se preko centrale).
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    try:
+        zakup = fetch_prepared(cursor, 'zakup', (data['jmbg'],), Zakup)
+        if not zakup:
+            conn.rollback()
+            return None
+        aktivnih = fetch_prepared(cursor, 'aktivna_zaduzenja_korisnika', (data['jmbg'],))[0]
+        if aktivnih >= zakup.limit_zaduzenja:
+            conn.rollback()
+            return None
+        try:
+            rental_id = fetch_prepared(cursor, 'novo_zaduzenje', (
+                zakup.korisnik_id,
+                data['jmbg'],
+                zakup.ime,
+                zakup.prezime,
+                data['oznaka_bicikla'],
+                data['tip_bicikla'],
+                data['datum_zaduzivanja']
+            ))[0]
+        except psycopg2.errors.UniqueViolation:
+            conn.rollback()
+            return jsonify({
+                "success": False,
+                "message": f"Bicikl {data['oznaka_bicikla']} je već zadužen"
+            }), 400
+        execute_prepared(cursor, 'bicikl_zaduzen', (data['oznaka_bicikla'], data['tip_bicikla']))
+        execute_prepared(cursor, 'dogadjaj_centrala', (
+            'zaduzenje', data['jmbg'], data['oznaka_bicikla'], data['datum_zaduzivanja']
+        ))
+        conn.commit()
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+    central_outbox.probudi()
+    return jsonify({
+        "success": True,
+        "message": f"Bicikl {data['oznaka_bicikla']} uspešno zadužen u {GRAD_NAZIV}",
+        "rental_id": rental_id,
+        "active_rentals": aktivnih + 1 + zakup.u_drugim_gradovima
+    }), 201
+
+def zaduzi_degradirano(data):
+    """
+    Zaduženje dok centrala ne prihvata veze (degradirani režim): samo za korisnika sa svežim stanjem u kešu prava
+    na zaduženje, i dok uz zaduženja koja centrala još nije primila ima manje od DEGRADED_RENTAL_LIMIT bicikala
+    """
+    stanje = eligibility.poslednje(data['jmbg'], DEGRADED_ELIGIBILITY_MAX_AGE)
+    if not stanje:
+        zabelezi_degradirano('odbijena_zaduzenja')
+        return jsonify({
+            "success": False,
+            "message": "Centralna biciklana nije dostupna, a stanje korisnika nije poznato"
+        }), 503
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({
+            "success": False,
+            "message": "Greška pri konekciji sa bazom podataka"
+        }), 500
+    cursor = conn.cursor()
+    try:
+        # Zaduženja istog korisnika se serijalizuju, pa zaduženja na čekanju ne mogu istovremeno proći limit
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"degradirano:{data['jmbg']}",))
+        aktivnih = stanje['current_rentals'] + fetch_prepared(
+            cursor, 'zaduzenja_na_cekanju_korisnika', (data['jmbg'],)
+        )[0]
+        if aktivnih >= DEGRADED_RENTAL_LIMIT:
+            conn.rollback()
+            zabelezi_degradirano('odbijena_zaduzenja')
+            return jsonify({
+                "success": False,
+                "message": f"Centralna biciklana nije dostupna - do njenog povratka korisnik može imati "
+                           f"najviše {DEGRADED_RENTAL_LIMIT} zaduženja"
+            }), 503
+        try:
+            rental_id = fetch_prepared(cursor, 'novo_zaduzenje', (
+                stanje['user_id'],
+                data['jmbg'],
+                stanje['ime'],
+                stanje['prezime'],
+                data['oznaka_bicikla'],
+                data['tip_bicikla'],
+                data['datum_zaduzivanja']
+            ))[0]
+        except psycopg2.errors.UniqueViolation:
+            conn.rollback()
+            return jsonify({
+                "success": False,
+                "message": f"Bicikl {data['oznaka_bicikla']} je već zadužen"
+            }), 400
+        execute_prepared(cursor, 'bicikl_zaduzen', (data['oznaka_bicikla'], data['tip_bicikla']))
+        execute_prepared(cursor, 'dogadjaj_centrala', (
+            'zaduzenje', data['jmbg'], data['oznaka_bicikla'], data['datum_zaduzivanja']
+        ))
+        conn.commit()
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+    zabelezi_degradirano('zaduzenja')
+    central_outbox.probudi()
+    return jsonify({
+        "success": True,
+        "message": f"Bicikl {data['oznaka_bicikla']} uspešno zadužen u {GRAD_NAZIV} (centrala će biti obaveštena)",
+        "rental_id": rental_id,
+        "active_rentals": aktivnih + 1,
+        "degradirani_rezim": True
+    }), 201
+
+def otkazi_rezervaciju(data, ponisti=False):
+    """
+    Otkazivanje rezervacije bicikla iz zaduzi_bicikl; sa ponisti se u istoj transakciji upisuje i poništavanje
+    zaduženja za centralu. Bez konekcije rezervacija ističe posle RENTAL_RESERVATION_TTL sekundi.
+    """
+    conn = get_db_connection(bez_roka=True)
+    if not conn:
+        logging.error(f"Rezervacija bicikla {data['oznaka_bicikla']} nije otkazana"
+                      f"{' (ni zaduženje u centrali poništeno)' if ponisti else ''} - nema konekcije sa bazom")
+        return
+    cursor = conn.cursor()
+    try:
+        execute_prepared(cursor, 'otkazi_rezervaciju', (data['oznaka_bicikla'],))
+        if ponisti:
+            execute_prepared(cursor, 'dogadjaj_centrala', (
+                'ponistavanje', data['jmbg'], data['oznaka_bicikla'], data['datum_zaduzivanja']
+            ))
+        conn.commit()
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+    if ponisti:
+        central_outbox.probudi()
+
+@app.route('/zaduzenje', methods=['POST'])
+def zaduzi_bicikl():
+    """
+    Zaduženje bicikla
+    Expected JSON: {
+        "jmbg": "1234567890123",
+        "oznaka_bicikla": "NS001",
+        "tip_bicikla": "Gradski",
+        "datum_zaduzivanja": "2025-09-16"
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        # Validacija podataka
+        required_fields = ['jmbg', 'oznaka_bicikla', 'tip_bicikla', 'datum_zaduzivanja']
+        for field in required_fields:
+            if field not in data or not data[field]:
+                return jsonify({
+                    "success": False,
+                    "message": f"Nedostaje obavezan podatak: {field}"
+                }), 400
+        
+        # Validacija datuma
+        try:
+            datetime.strptime(data['datum_zaduzivanja'], '%Y-%m-%d')
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "message": "Neisprava format datuma. Koristiti YYYY-MM-DD"
+            }), 400
+        
+        greska = proveri_jmbg(data['jmbg'])
+        if greska:
+            return jsonify({
+                "success": False,
+                "message": greska
+            }), 400
+        
+        # Brza provera iz keša aktivnih bicikala, bez baze i centrale
+        if active_bikes.contains(data['oznaka_bicikla']):
+            return jsonify({
+                "success": False,
+                "message": f"Bicikl {data['oznaka_bicikla']} je već zadužen"
+            }), 400
+        
+        # Korisnik sa važećim zakupom kvote zadužuje bez centrale
+        if LEASES:
+            odgovor = zaduzi_preko_zakupa(data)
+            if odgovor:
+                return odgovor
+        
+        # Provera da li korisnik može da zaduži bicikl - iz keša kada ga on dozvoljava (limit se ionako
+        # atomski proverava u zaduzi-bicikl), a inače pozivom centrale
+        check_response = eligibility.get(data['jmbg'])
+        if not check_response or not check_response['can_rent']:
+            check_response = call_centralna_api('/korisnici/proveri-zaduzenje', {'jmbg': data['jmbg']})
+        
+        if DEGRADED_MODE and check_response is None and centrala_nedostupna():
+            return zaduzi_degradirano(data)
+        
+        if not check_response:
+            return jsonify({
+                "success": False,
+                "message": "Greška pri komunikaciji sa centralnom biciklanom"
+            }), 500
+        
+        if not check_response.get('success'):
+            return jsonify(check_response), 404
+        
+        eligibility.put(data['jmbg'], check_response, overwrite=False)
+        
+        if not check_response.get('can_rent'):
+            return jsonify({
+                "success": False,
+                "message": "Korisnik je dostigao maksimalan broj zaduženja (2 bicikla)"
+            }), 400
+        
+        # Provera da li je bicikl već zadužen u ovom gradu
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({
+                "success": False,
+                "message": "Greška pri konekciji sa bazom podataka"
+            }), 500
+        
+        cursor = conn.cursor()
+        
+        # Kratka rezervacija bicikla (status 'rezervisan' u bicikli) pre poziva centrale: konekcija se vraća u pool
+        # dok se čeka centrala (do 10 s), a drugo zaduženje istog bicikla se odmah odbija
+        try:
+            existing_rental = fetch_prepared(cursor, 'aktivan_bicikl', (data['oznaka_bicikla'],))
+            rezervisan = not existing_rental and fetch_prepared(cursor, 'rezervisi_bicikl', (
+                data['oznaka_bicikla'], data['tip_bicikla'], RENTAL_RESERVATION_TTL
+            ))
+            conn.commit()
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+        
+        if not rezervisan:
+            return jsonify({
+                "success": False,
+                "message": f"Bicikl {data['oznaka_bicikla']} je već zadužen"
+            }), 400
+        
+        # Registrovanje zaduženja u centralnoj biciklani
+        rent_response = call_centralna_api('/korisnici/zaduzi-bicikl', {
+            'jmbg': data['jmbg'],
+            'grad': GRAD_NAZIV,
+            'oznaka_bicikla': data['oznaka_bicikla'],
+            'datum_zaduzivanja': data['datum_zaduzivanja']
+        })
+        
+        if rent_response is not None and rent_response.get('success') is False:
+            # Centrala je odbila zaduženje (npr. keš je propustio zaduženje iz drugog grada)
+            otkazi_rezervaciju(data)
+            return jsonify({
+                "success": False,
+                "message": "Korisnik je dostigao maksimalan broj zaduženja (2 bicikla)"
+            }), 400
+        
+        if DEGRADED_MODE and rent_response is None and centrala_nedostupna():
+            # Centrala zahtev nije primila - zaduženje se ponavlja u degradiranom režimu
+            otkazi_rezervaciju(data)
+            return zaduzi_degradirano(data)
+        
+        if not rent_response or not rent_response.get('success'):
+            # Bez odgovora (npr. istekao rok čitanja) centrala je zaduženje možda ipak upisala, pa se uz otkazivanje
+            # rezervacije šalje poništavanje (centrala ga primenjuje samo ako zaduženje postoji u njenom indeksu)
+            otkazi_rezervaciju(data, ponisti=rent_response is None)
+            return jsonify({
+                "success": False,
+                "message": "Greška pri registraciji zaduženja u centralnoj biciklani"
+            }), 500
+        
+        # Lokalno čuvanje zaduženja posle centrale (i posle isteka roka - centrala je zaduženje već upisala)
+        conn = get_db_connection(bez_roka=True)
+        if not conn:
+            logging.error(f"Zaduženje bicikla {data['oznaka_bicikla']} je upisano u centrali, ali ne i lokalno")
+            return jsonify({
+                "success": False,
+                "message": "Greška pri konekciji sa bazom podataka"
+            }), 500
+        
+        cursor = conn.cursor()
+        try:
+            rental_id = fetch_prepared(cursor, 'novo_zaduzenje', (
+                check_response['user_id'],
+                data['jmbg'],
+                check_response['ime'],
+                check_response['prezime'],
+                data['oznaka_bicikla'],
+                data['tip_bicikla'],
+                data['datum_zaduzivanja']
+            ))[0]
+            execute_prepared(cursor, 'bicikl_zaduzen', (data['oznaka_bicikla'], data['tip_bicikla']))
+            conn.commit()
+        except psycopg2.errors.UniqueViolation:
+            # Bicikl je u međuvremenu zadužen mimo rezervacije (po zakupu) - zaduženje u centrali se poništava
+            conn.rollback()
+            execute_prepared(cursor, 'dogadjaj_centrala', (
+                'ponistavanje', data['jmbg'], data['oznaka_bicikla'], data['datum_zaduzivanja']
+            ))
+            conn.commit()
+            central_outbox.probudi()
+            return jsonify({
+                "success": False,
+                "message": f"Bicikl {data['oznaka_bicikla']} je već zadužen"
+            }), 400
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+        
+        return jsonify({
+            "success": True,
+            "message": f"Bicikl {data['oznaka_bicikla']} uspešno zadužen u {GRAD_NAZIV}",
+            "rental_id": rental_id,
+            "active_rentals": rent_response['active_rentals']
+        }), 201
+        
+    except Exception as e:
+        print(f"Greška pri zaduženju bicikla: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+def razduzi_uz_dogadjaj(cursor, rental):
+    """Lokalno razduženje sa događajem za centralu u istoj transakciji; vraća broj aktivnih zaduženja korisnika"""
+    execute_prepared(cursor, 'razduzenje', (date.today(), rental.id))
+    execute_prepared(cursor, 'bicikl_dostupan', (rental.oznaka_bicikla,))
+    execute_prepared(cursor, 'dogadjaj_centrala', ('razduzenje', rental.jmbg, rental.oznaka_bicikla, None))
+    return fetch_prepared(cursor, 'aktivna_zaduzenja_korisnika', (rental.jmbg,))[0]
+
+@app.route('/razduzivanje', methods=['POST'])
+def razduzi_bicikl():
+    """
+    Razduženje bicikla
+    Expected JSON: {
+        "oznaka_bicikla": "NS001"
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if 'oznaka_bicikla' not in data or not data['oznaka_bicikla']:
+            return jsonify({
+                "success": False,
+                "message": "Oznaka bicikla je obavezan parametar"
+            }), 400
+        
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({
+                "success": False,
+                "message": "Greška pri konekciji sa bazom podataka"
+            }), 500
+        
+        cursor = conn.cursor()
+        
+        # Pronalaženje aktivnog zaduženja
+        rental = fetch_prepared(cursor, 'aktivno_zaduzenje', (data['oznaka_bicikla'],), AktivnoZaduzenje)
+        
+        if not rental:
+            cursor.close()
+            release_db_connection(conn)
+            return jsonify({
+                "success": False,
+                "message": f"Aktivno zaduženje za bicikl {data['oznaka_bicikla']} nije pronađeno"
+            }), 404
+        
+        # Uz važeći zakup (ili kada centrala još nije primila ovo zaduženje) razduženje se javlja preko outbox-a
+        zakup = None
+        if LEASES:
+            zakup = fetch_prepared(cursor, 'zakup', (rental.jmbg,), Zakup)
+            if zakup or fetch_prepared(cursor, 'zaduzenje_na_cekanju', (rental.oznaka_bicikla,)):
+                preostalo = razduzi_uz_dogadjaj(cursor, rental)
+                conn.commit()
+                cursor.close()
+                release_db_connection(conn)
+                central_outbox.probudi()
+                return jsonify({
+                    "success": True,
+                    "message": f"Bicikl {data['oznaka_bicikla']} uspešno razdužen u {GRAD_NAZIV}",
+                    "korisnik": f"{rental.ime} {rental.prezime}",
+                    "remaining_rentals": preostalo + (zakup.u_drugim_gradovima if zakup else 0)
+                }), 200
+        
+        # Razduženje u centralnoj biciklani
+        unrent_response = call_centralna_api('/korisnici/razduzi-bicikl', {
+            'jmbg': rental.jmbg,
+            'grad': GRAD_NAZIV,
+            'oznaka_bicikla': rental.oznaka_bicikla
+        })
+        
+        if DEGRADED_MODE and unrent_response is None and centrala_nedostupna():
+            # Centrala ne prihvata veze - razduženje se prima lokalno i javlja kada centrala proradi
+            razduzi_uz_dogadjaj(cursor, rental)
+            conn.commit()
+            cursor.close()
+            release_db_connection(conn)
+            zabelezi_degradirano('razduzenja')
+            central_outbox.probudi()
+            return jsonify({
+                "success": True,
+                "message": f"Bicikl {data['oznaka_bicikla']} uspešno razdužen u {GRAD_NAZIV} (centrala će biti obaveštena)",
+                "korisnik": f"{rental.ime} {rental.prezime}",
+                "remaining_rentals": None,
+                "degradirani_rezim": True
+            }), 200
+        
+        if not unrent_response or not unrent_response.get('success'):
+            cursor.close()
+            release_db_connection(conn)
+            return jsonify({
+                "success": False,
+                "message": "Greška pri razduženju u centralnoj biciklani"
+            }), 500
+        
+        # Lokalno ažuriranje zaduženja
+        execute_prepared(cursor, 'razduzenje', (date.today(), rental.id))
+        execute_prepared(cursor, 'bicikl_dostupan', (rental.oznaka_bicikla,))
+        
+        conn.commit()
+        cursor.close()
+        release_db_connection(conn)
+        
+        return jsonify({
+            "success": True,
+            "message": f"Bicikl {data['oznaka_bicikla']} uspešno razdužen u {GRAD_NAZIV}",
+            "korisnik": f"{rental.ime} {rental.prezime}",
+            "remaining_rentals": unrent_response['active_rentals']
+        }), 200
+        
+    except Exception as e:
+        print(f"Greška pri razduženju bicikla: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+def pripremi_zaduzenja(zaduzenja):
+    """Priprema redova zaduženja za JSON odgovor (datumi u formatu YYYY-MM-DD)"""
+    # orjson nativno serijalizuje date kao YYYY-MM-DD, pa kopiranje redova nije potrebno
+    if JSON_ENCODER == 'orjson':
+        return zaduzenja
+
+    # Konvertovanje date objekata u string
+    result = []
+    for zaduzenje in zaduzenja:
+        z = dict(zaduzenje)
+        if z['datum_zaduzivanja']:
+            z['datum_zaduzivanja'] = z['datum_zaduzivanja'].strftime('%Y-%m-%d')
+        if z['datum_razduzivanja']:
+            z['datum_razduzivanja'] = z['datum_razduzivanja'].strftime('%Y-%m-%d')
+        result.append(z)
+    return result
+
+def strimuj_zaduzenja(conn, query, params):
+    """
+    NDJSON lista zaduženja iz serverskog kursora, u delovima od STREAM_BATCH_SIZE redova (lista se ne učitava
+    cela u memoriju); na kraju vraća konekciju u pool
+    """
+    try:
+        cursor = conn.cursor(name='lista_zaduzenja', cursor_factory=RealDictCursor)
+        cursor.itersize = STREAM_BATCH_SIZE
+        cursor.execute(query, params)
+        while True:
+            zaduzenja = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not zaduzenja:
+                break
+            yield ''.join(app.json.dumps(zaduzenje) + '\n' for zaduzenje in pripremi_zaduzenja(zaduzenja))
+        cursor.close()
+        conn.rollback()
+    finally:
+        release_db_connection(conn)
+
+@app.route('/zaduzenja', methods=['GET'])
+def get_zaduzenja():
+    """
+    Vraća sva zaduženja za ovaj grad
+    Opcioni filteri: ?status=aktivan&jmbg=1234567890123&od=2025-09-01&do=2025-09-30
+    (od/do se odnose na datum zaduživanja)
+    Sa Accept: application/x-ndjson lista se strimuje kao NDJSON (jedno zaduženje po redu), bez omotača.
+    """
+    try:
+        # Filtriranje (opciono)
+        conditions = []
+        params = []
+        for field, condition in [('status', "status = %s"), ('jmbg', "jmbg = %s"),
+                                 ('od', "datum_zaduzivanja >= %s"), ('do', "datum_zaduzivanja <= %s")]:
+            value = request.args.get(field)
+            if not value:
+                continue
+            if field in ('od', 'do'):
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({
+                        "success": False,
+                        "message": "Neisprava format datuma. Koristiti YYYY-MM-DD"
+                    }), 400
+            greska = proveri_jmbg(value) if field == 'jmbg' else None
+            if greska:
+                return jsonify({
+                    "success": False,
+                    "message": greska
+                }), 400
+            conditions.append(condition)
+            params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        conn = get_db_connection(max_lag=READ_MAX_LAG['zaduzenja'])
+        if not conn:
+            return jsonify({
+                "success": False,
+                "message": "Greška pri konekciji sa bazom podataka"
+            }), 500
+        
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        
+        ndjson = (request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+                  == 'application/x-ndjson')
+        
+        # Validator za ETag: oznaka izmena tabele zaduzenja (menja se sa svakom izmenom, i van filtera).
+        # Čita se pre liste, pa lista nikad nije starija od svog ETag-a.
+        execute_prepared(cursor, 'verzija_liste', ('zaduzenja',))
+        etag = izracunaj_etag(where, params, cursor.fetchone()['verzija'], ndjson)
+        response = nije_izmenjeno(etag)
+        if response is not None:
+            cursor.close()
+            release_db_connection(conn)
+            return response
+        
+        query = f"""
+            SELECT id, lpad(jmbg::text, 13, '0') AS jmbg, ime, prezime, oznaka_bicikla, tip_bicikla, 
+                   datum_zaduzivanja, datum_razduzivanja, status, created_at
+            FROM zaduzenja 
+            {where}
+            ORDER BY created_at DESC
+        """
+        if ndjson:
+            # Konekcija ostaje zauzeta do kraja strimovanja, a vraća je strimuj_zaduzenja
+            cursor.close()
+            response = Response(stream_with_context(strimuj_zaduzenja(conn, query, params)),
+                                mimetype='application/x-ndjson')
+            return sa_etag(response, etag), 200
+        
+        cursor.execute(query, params)
+        
+        zaduzenja = cursor.fetchall()
+        cursor.close()
+        release_db_connection(conn)
+        
+        return sa_etag(jsonify({
+            "success": True,
+            "grad": GRAD_NAZIV,
+            "zaduzenja": pripremi_zaduzenja(zaduzenja)
+        }), etag), 200
+        
+    except Exception as e:
+        print(f"Greška pri dohvatanju zaduženja: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+def zapisi_izvoz(cursor, schema, izlaz, format):
+    """
+    Upis redova iz serverskog kursora u Parquet ili Arrow IPC fajl (putanja ili fajl objekat), seriju po seriju.
+    U memoriji je najviše EXPORT_BATCH_SIZE redova; svaka serija je jedna row group (Parquet) odnosno
+    record batch (Arrow). Vraća broj upisanih redova.
+    """
+    if format == 'parquet':
+        writer = pq.ParquetWriter(izlaz, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(izlaz, schema)
+    broj = 0
+    try:
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            broj += len(rows)
+    finally:
+        writer.close()
+    return broj
+
+def izvezi_zaduzenja(izlaz, format='parquet', od=None, do=None, status=None):
+    """Izvoz zaduženja (opciono po datumu zaduživanja i statusu) u izlaz; vraća broj izvezenih redova"""
+    conditions = []
+    params = []
+    for value, condition in [(status, "status = %s"), (od, "datum_zaduzivanja >= %s"), (do, "datum_zaduzivanja <= %s")]:
+        if value:
+            conditions.append(condition)
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = get_db_connection(max_lag=READ_MAX_LAG['zaduzenja'])
+    if not conn:
+        raise RuntimeError("Greška pri konekciji sa bazom podataka")
+    try:
+        # Imenovani (serverski) kursor - redovi se sa servera preuzimaju u serijama, a ne svi odjednom
+        cursor = conn.cursor(name='izvoz_zaduzenja')
+        cursor.itersize = EXPORT_BATCH_SIZE
+        cursor.execute(f"""
+            SELECT id, korisnik_id, lpad(jmbg::text, 13, '0'), ime, prezime, oznaka_bicikla, tip_bicikla,
+                   datum_zaduzivanja, datum_razduzivanja, status, created_at, updated_at
+            FROM zaduzenja
+            {where}
+            ORDER BY id
+        """, params)
+        broj = zapisi_izvoz(cursor, ZADUZENJA_SCHEMA, izlaz, format)
+        cursor.close()
+        conn.rollback()
+    finally:
+        release_db_connection(conn)
+    return broj
+
+@app.route('/zaduzenja/izvoz', methods=['GET'])
+def izvoz_zaduzenja():
+    """
+    Kolonski izvoz istorije zaduženja za analitiku
+    Parametri: ?format=parquet|arrow&status=razduzen&od=2025-01-01&do=2025-12-31
+    Izvoz se piše u privremeni fajl na disku (memorija ne raste sa brojem redova) i šalje kao prilog.
+    """
+    try:
+        if pa is None:
+            return jsonify({
+                "success": False,
+                "message": "Izvoz nije dostupan - pyarrow nije instaliran"
+            }), 501
+        
+        format = request.args.get('format', 'parquet')
+        if format not in EXPORT_FORMATS:
+            return jsonify({
+                "success": False,
+                "message": f"Nepodržan format izvoza. Koristiti: {', '.join(EXPORT_FORMATS)}"
+            }), 400
+        
+        for field in ('od', 'do'):
+            if request.args.get(field):
+                try:
+                    datetime.strptime(request.args[field], '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({
+                        "success": False,
+                        "message": "Neisprava format datuma. Koristiti YYYY-MM-DD"
+                    }), 400
+        
+        izlaz = tempfile.TemporaryFile()
+        try:
+            broj = izvezi_zaduzenja(izlaz, format, request.args.get('od'), request.args.get('do'),
+                                    request.args.get('status'))
+        except Exception:
+            izlaz.close()
+            raise
+        izlaz.seek(0)
+        
+        logging.info(f"Izvoz zaduženja: {broj} redova ({format})")
+        return send_file(izlaz, mimetype=EXPORT_FORMATS[format], as_attachment=True,
+                         download_name=f"zaduzenja_{GRAD_NAZIV.lower().replace(' ', '_')}.{format}")
+        
+    except Exception as e:
+        print(f"Greška pri izvozu zaduženja: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+@app.cli.command('izvoz-zaduzenja')
+@click.argument('izlaz')
+@click.option('--format', type=click.Choice(list(EXPORT_FORMATS)), default='parquet')
+@click.option('--od', type=click.DateTime(formats=['%Y-%m-%d']), help='Datum zaduživanja od (YYYY-MM-DD)')
+@click.option('--do', type=click.DateTime(formats=['%Y-%m-%d']), help='Datum zaduživanja do (YYYY-MM-DD)')
+@click.option('--status', help='aktivan ili razduzen')
+def izvoz_zaduzenja_cli(izlaz, format, od, do, status):
+    """Kolonski izvoz zaduženja u fajl IZLAZ (Parquet ili Arrow IPC)"""
+    if pa is None:
+        raise click.ClickException("Izvoz nije dostupan - pyarrow nije instaliran")
+    broj = izvezi_zaduzenja(izlaz, format, od.date() if od else None, do.date() if do else None, status)
+    click.echo(f"Izvezeno {broj} zaduženja u {izlaz}")
+
+def admin_dozvoljen():
+    """Da li zahtev nosi ispravan administratorski token"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+def profilisanje_zabranjeno():
+    """Odgovor za zahtev profilisanja kada ono nije uključeno (404) ili zahtev nema administratorski token (403)"""
+    if not PROFILING:
+        return jsonify({
+            "success": False,
+            "message": "Profilisanje nije uključeno (PROFILING=true)"
+        }), 404
+    if not admin_dozvoljen():
+        return jsonify({
+            "success": False,
+            "message": "Pristup dozvoljen samo administratoru"
+        }), 403
+    return None
+
+class RouteProfiler:
+    """
+    cProfile uzorka zahteva jedne rute (naziv endpoint-a ili pravilo putanje, npr. '/zaduzenje').
+    Profiliše se deo zahteva (uzorak) dok se ne skupi zadati broj profila, koji se zatim sabiraju u jedan izveštaj.
+    """
+
+    def __init__(self):
+        # ruta je None kada profilisanje nije aktivno, a izabrana ostaje i posle završetka
+        self.ruta = None
+        self.izabrana = None
+        self.uzorak = 1.0
+        self.zahteva = 0
+        self.u_toku = 0
+        self.profili = []
+        self.pokrenuto = None
+        self.lock = threading.Lock()
+
+    def pokreni(self, ruta, uzorak, zahteva):
+        with self.lock:
+            self.ruta, self.uzorak, self.zahteva = ruta, uzorak, zahteva
+            self.izabrana = ruta
+            self.profili = []
+            self.pokrenuto = datetime.now().isoformat(timespec='seconds')
+
+    def zaustavi(self):
+        with self.lock:
+            self.ruta = None
+
+    def pocni(self):
+        """Profil za tekući zahtev ako je to izabrana ruta i zahtev je u uzorku, inače None"""
+        if self.ruta is None:
+            return None
+        if self.ruta != request.endpoint and (request.url_rule is None or self.ruta != request.url_rule.rule):
+            return None
+        if random.random() >= self.uzorak:
+            return None
+        with self.lock:
+            if self.ruta is None or len(self.profili) + self.u_toku >= self.zahteva:
+                return None
+            self.u_toku += 1
+        profil = cProfile.Profile()
+        profil.enable()
+        return profil
 
-def call_centralna_api(endpoint, data=None, method='POST'):
-    """Helper funkcija za pozivanje API-ja centralne biciklane"""
-    try:
-        url = f"{CENTRAL_URL}{endpoint}"
-        
-        if method == 'POST':
-            response = requests.post(url, json=data, timeout=10)
-        elif method == 'GET':
-            response = requests.get(url, timeout=10)
-        else:
+    def zavrsi(self, profil):
+        profil.disable()
+        with self.lock:
+            self.u_toku -= 1
+            self.profili.append(profil)
+            if len(self.profili) >= self.zahteva:
+                self.ruta = None
+
+    def stats(self):
+        """Zbirni pstats.Stats svih skupljenih profila (None ako još nema nijednog)"""
+        with self.lock:
+            profili = list(self.profili)
+        if not profili:
             return None
-            
-        return response.json() if response.status_code in [200, 201, 400, 404, 409] else None
-        
-    except requests.exceptions.RequestException as e:
-        print(f"Greška pri pozivu centralne API: {e}")
-        return None
+        stats = pstats.Stats(profili[0])
+        for profil in profili[1:]:
+            stats.add(profil)
+        return stats
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({"status": "OK", "service": f"Bike shop {GRAD_NAZIV}"}), 200
+    def stanje(self):
+        with self.lock:
+            return {
+                "ruta": self.izabrana,
+                "aktivno": self.ruta is not None,
+                "uzorak": self.uzorak,
+                "zahteva": self.zahteva,
+                "profilisano": len(self.profili),
+                "pokrenuto": self.pokrenuto
+            }
 
-@app.route('/registracija', methods=['POST'])
-def registruj_korisnika():
+route_profiler = RouteProfiler()
+
+@app.before_request
+def profilisi_zahtev():
+    if PROFILING and route_profiler.ruta is not None:
+        g.profil = route_profiler.pocni()
+
+@app.teardown_request
+def zavrsi_profil_zahteva(exc):
+    profil = g.pop('profil', None)
+    if profil is not None:
+        route_profiler.zavrsi(profil)
+
+@app.route('/admin/profil/ruta', methods=['POST'])
+def pokreni_profil_rute():
     """
-    Registracija novog korisnika preko centralne biciklane
+    Pokretanje cProfile-a za uzorak zahteva jedne rute
     Expected JSON: {
-        "jmbg": "1234567890123",
-        "ime": "Marko",
-        "prezime": "Petrovic", 
-        "adresa": "Bulevar Oslobođenja 1, Novi Sad"
+        "ruta": "zaduzi_bicikl",
+        "uzorak": 0.1,
+        "zahteva": 20
     }
     """
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
     try:
-        data = request.get_json()
-        
-        # Validacija podataka
-        required_fields = ['jmbg', 'ime', 'prezime', 'adresa']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({
-                    "success": False,
-                    "message": f"Nedostaje obavezan podatak: {field}"
-                }), 400
-        
-        # Poziv centralne biciklane za registraciju
-        response = call_centralna_api('/korisnici/registracija', data)
-        
-        if not response:
+        data = request.get_json(silent=True) or {}
+        ruta = data.get('ruta')
+        pravila = {rule.endpoint for rule in app.url_map.iter_rules()} | {rule.rule for rule in app.url_map.iter_rules()}
+        if ruta not in pravila:
             return jsonify({
                 "success": False,
-                "message": "Greška pri komunikaciji sa centralnom biciklanom"
-            }), 500
-        
-        if response.get('success'):
+                "message": "Nepoznata ruta (naziv endpoint-a ili putanja pravila, npr. /zaduzenje)"
+            }), 400
+        uzorak = float(data.get('uzorak', 1.0))
+        zahteva = int(data.get('zahteva', 20))
+        if not 0 < uzorak <= 1 or zahteva < 1:
             return jsonify({
-                "success": True,
-                "message": f"Korisnik uspešno registrovan u {GRAD_NAZIV}",
-                "user_id": response.get('user_id')
-            }), 201
-        else:
-            return jsonify(response), 409
-            
-    except Exception as e:
-        print(f"Greška pri registraciji: {e}")
+                "success": False,
+                "message": "uzorak mora biti u (0, 1], a zahteva pozitivan broj"
+            }), 400
+        route_profiler.pokreni(ruta, uzorak, zahteva)
+        return jsonify({"success": True, "profil": route_profiler.stanje()}), 200
+    except (TypeError, ValueError):
         return jsonify({
             "success": False,
-            "message": "Interna greška servera"
-        }), 500
+            "message": "Neispravni parametri profilisanja"
+        }), 400
+
+@app.route('/admin/profil/ruta', methods=['GET'])
+def izvestaj_profila_rute():
+    """
+    Zbirni profil skupljenih zahteva: ?sortiranje=cumulative|tottime|calls&top=30,
+    ili ?format=pstats za binarni pstats fajl (snakeviz, python -m pstats)
+    """
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    stats = route_profiler.stats()
+    if request.args.get('format') == 'pstats':
+        if stats is None:
+            return jsonify({"success": False, "message": "Još nema profilisanih zahteva"}), 404
+        return Response(marshal.dumps(stats.stats), mimetype='application/octet-stream',
+                        headers={'Content-Disposition': 'attachment; filename=profil.pstats'})
+    sortiranje = request.args.get('sortiranje', 'cumulative')
+    if sortiranje not in ('cumulative', 'tottime', 'calls'):
+        return jsonify({"success": False, "message": "sortiranje mora biti cumulative, tottime ili calls"}), 400
+    top = request.args.get('top', 30, type=int)
+    funkcije = []
+    if stats is not None:
+        stats.sort_stats(sortiranje)
+        for funkcija in stats.fcn_list[:top]:
+            _, poziva, ukupno, kumulativno, _ = stats.stats[funkcija]
+            funkcije.append({
+                "funkcija": pstats.func_std_string(funkcija),
+                "poziva": poziva,
+                "sopstveno_ms": round(ukupno * 1000, 3),
+                "kumulativno_ms": round(kumulativno * 1000, 3)
+            })
+    return jsonify({"success": True, "profil": route_profiler.stanje(), "funkcije": funkcije}), 200
 
+@app.route('/admin/profil/ruta', methods=['DELETE'])
+def zaustavi_profil_rute():
+    """Zaustavljanje profilisanja rute (skupljeni profili ostaju dostupni do sledećeg pokretanja)"""
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    route_profiler.zaustavi()
+    return jsonify({"success": True, "profil": route_profiler.stanje()}), 200
 
+# Uzorkovanje stekova ne sme da se preklapa (svako bi uzorkovalo i drugo)
+uzorkovanje_lock = threading.Lock()
 
-@app.route('/zaduzenje', methods=['POST'])
-def zaduzi_bicikl():
+def uzorkuj_stekove(sekundi, interval):
     """
-    Zaduženje bicikla
-    Expected JSON: {
-        "jmbg": "1234567890123",
-        "oznaka_bicikla": "NS001",
-        "tip_bicikla": "Gradski",
-        "datum_zaduzivanja": "2025-09-16"
-    }
+    Wall-clock uzorkovanje stekova svih niti osim tekuće, svakih interval sekundi.
+    Vraća (broj pojavljivanja po steku u collapsed formatu 'nit;funkcija (fajl:linija);...', broj uzoraka).
+    """
+    stekovi = Counter()
+    tekuca = threading.get_ident()
+    uzoraka = 0
+    kraj = time.monotonic() + sekundi
+    while time.monotonic() < kraj:
+        # Brojevi u imenima niti (Thread-12, rpc-3) bi rasuli iste stekove po nitima
+        imena = {nit.ident: re.sub(r'-\d+', '', nit.name) for nit in threading.enumerate()}
+        for ident, okvir in sys._current_frames().items():
+            if ident == tekuca:
+                continue
+            funkcije = []
+            while okvir is not None:
+                code = okvir.f_code
+                funkcije.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                okvir = okvir.f_back
+            funkcije.append(imena.get(ident, 'nit'))
+            stekovi[';'.join(reversed(funkcije))] += 1
+        uzoraka += 1
+        time.sleep(interval)
+    return stekovi, uzoraka
+
+def stablo_stekova(stekovi):
+    """Collapsed stekovi u stablo za d3-flame-graph ({"name", "value", "children"})"""
+    koren = {"name": "sve", "value": 0, "children": {}}
+    for stek, broj in stekovi.items():
+        koren['value'] += broj
+        cvor = koren
+        for funkcija in stek.split(';'):
+            cvor = cvor['children'].setdefault(funkcija, {"name": funkcija, "value": 0, "children": {}})
+            cvor['value'] += broj
+
+    def u_listu(cvor):
+        return dict(cvor, children=[u_listu(dete) for dete in cvor['children'].values()])
+    return u_listu(koren)
+
+@app.route('/admin/profil/uzorkovanje', methods=['GET'])
+def uzorkovanje_stekova():
+    """
+    Wall-clock uzorkovanje stekova svih niti: ?sekundi=5&interval=0.01&format=collapsed|json.
+    collapsed je tekst za flamegraph.pl/speedscope ('stek broj' po redu), a json stablo za d3-flame-graph.
     """
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    sekundi = request.args.get('sekundi', 5, type=float)
+    interval = request.args.get('interval', PROFILE_SAMPLE_INTERVAL, type=float)
+    format = request.args.get('format', 'collapsed')
+    if not 0 < sekundi <= PROFILE_MAX_SECONDS or interval <= 0 or format not in ('collapsed', 'json'):
+        return jsonify({
+            "success": False,
+            "message": f"sekundi mora biti u (0, {PROFILE_MAX_SECONDS}], interval pozitivan, a format collapsed ili json"
+        }), 400
+    if not uzorkovanje_lock.acquire(blocking=False):
+        return jsonify({"success": False, "message": "Uzorkovanje stekova je već u toku"}), 409
     try:
-        data = request.get_json()
-        
-        # Validacija podataka
-        required_fields = ['jmbg', 'oznaka_bicikla', 'tip_bicikla', 'datum_zaduzivanja']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({
-                    "success": False,
-                    "message": f"Nedostaje obavezan podatak: {field}"
-                }), 400
-        
-        # Validacija datuma
-        try:
-            datetime.strptime(data['datum_zaduzivanja'], '%Y-%m-%d')
-        except ValueError:
+        stekovi, uzoraka = uzorkuj_stekove(sekundi, interval)
+    finally:
+        uzorkovanje_lock.release()
+    if format == 'json':
+        return jsonify({"success": True, "uzoraka": uzoraka, "interval": interval, "stekovi": stablo_stekova(stekovi)}), 200
+    telo = ''.join(f"{stek} {broj}\n" for stek, broj in stekovi.most_common())
+    return Response(telo, mimetype='text/plain', headers={'X-Uzoraka': str(uzoraka)})
+
+# Osnovni tracemalloc snimak sa kojim se porede sledeći (rast memorije)
+memorija = {'osnova': None, 'lock': threading.Lock()}
+MEMORIJA_FILTERI = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+def stavke_memorije(statistike, top):
+    stavke = []
+    for stat in statistike[:top]:
+        stavka = {
+            "mesto": [f"{okvir.filename}:{okvir.lineno}" for okvir in stat.traceback],
+            "kb": round(stat.size / 1024, 1),
+            "blokova": stat.count
+        }
+        if isinstance(stat, tracemalloc.StatisticDiff):
+            stavka["kb_razlika"] = round(stat.size_diff / 1024, 1)
+            stavka["blokova_razlika"] = stat.count_diff
+        stavke.append(stavka)
+    return stavke
+
+@app.route('/admin/profil/memorija', methods=['POST'])
+def pokreni_pracenje_memorije():
+    """Uključivanje tracemalloc-a (?okviri=1 - dubina steka po alokaciji) i osnovni snimak za poređenje"""
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    okviri = request.args.get('okviri', 1, type=int)
+    with memorija['lock']:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, okviri))
+        memorija['osnova'] = tracemalloc.take_snapshot().filter_traces(MEMORIJA_FILTERI)
+    trenutno, vrh = tracemalloc.get_traced_memory()
+    return jsonify({
+        "success": True,
+        "okviri": tracemalloc.get_traceback_limit(),
+        "kb_trenutno": round(trenutno / 1024, 1),
+        "kb_vrh": round(vrh / 1024, 1)
+    }), 200
+
+@app.route('/admin/profil/memorija', methods=['GET'])
+def snimak_memorije():
+    """
+    Snimak memorije: najveća mesta alokacije i rast od osnovnog snimka,
+    ?top=20&grupisanje=lineno|filename|traceback, a sa ?nova_osnova=true snimak postaje nova osnova
+    """
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    grupisanje = request.args.get('grupisanje', 'lineno')
+    top = request.args.get('top', 20, type=int)
+    if grupisanje not in ('lineno', 'filename', 'traceback'):
+        return jsonify({"success": False, "message": "grupisanje mora biti lineno, filename ili traceback"}), 400
+    with memorija['lock']:
+        if not tracemalloc.is_tracing():
             return jsonify({
                 "success": False,
-                "message": "Neisprava format datuma. Koristiti YYYY-MM-DD"
-            }), 400
-        
-        # Provera da li korisnik može da zaduži bicikl
-        check_response = call_centralna_api('/korisnici/proveri-zaduzenje', {'jmbg': data['jmbg']})
-        
-        if not check_response:
+                "message": "Praćenje memorije nije uključeno (POST /admin/profil/memorija)"
+            }), 409
+        snimak = tracemalloc.take_snapshot().filter_traces(MEMORIJA_FILTERI)
+        osnova = memorija['osnova']
+        if request.args.get('nova_osnova', 'false').lower() == 'true':
+            memorija['osnova'] = snimak
+    trenutno, vrh = tracemalloc.get_traced_memory()
+    return jsonify({
+        "success": True,
+        "kb_trenutno": round(trenutno / 1024, 1),
+        "kb_vrh": round(vrh / 1024, 1),
+        "kb_pracenje": round(tracemalloc.get_tracemalloc_memory() / 1024, 1),
+        "najvece": stavke_memorije(snimak.statistics(grupisanje), top),
+        "rast": stavke_memorije(snimak.compare_to(osnova, grupisanje), top) if osnova is not None else []
+    }), 200
+
+@app.route('/admin/profil/memorija', methods=['DELETE'])
+def zaustavi_pracenje_memorije():
+    """Isključivanje tracemalloc-a i brisanje osnovnog snimka"""
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    with memorija['lock']:
+        tracemalloc.stop()
+        memorija['osnova'] = None
+    return jsonify({"success": True, "message": "Praćenje memorije je isključeno"}), 200
+
+@app.route('/admin/spori-upiti', methods=['GET'])
+def get_spori_upiti():
+    """
+    Najsporiji nedavni upiti (bez vrednosti parametara) i naredbe sa najvećim ukupnim trajanjem,
+    sa poslednjim uzetim planom (EXPLAIN) i tabelama koje plan čita sekvencijalno (?top=20)
+    """
+    if not admin_dozvoljen():
+        return jsonify({
+            "success": False,
+            "message": "Pristup dozvoljen samo administratoru"
+        }), 403
+    if not SLOW_QUERY_LOG:
+        return jsonify({
+            "success": False,
+            "message": "Merenje upita nije uključeno (SLOW_QUERY_LOG=true)"
+        }), 404
+    top = request.args.get('top', 20, type=int)
+    return jsonify(dict(slow_queries.izvestaj(top), success=True)), 200
+
+@app.route('/admin/spori-upiti', methods=['DELETE'])
+def reset_spori_upiti():
+    """Brisanje skupljenih trajanja, sporih upita i planova"""
+    if not admin_dozvoljen():
+        return jsonify({
+            "success": False,
+            "message": "Pristup dozvoljen samo administratoru"
+        }), 403
+    slow_queries.reset()
+    return jsonify({"success": True, "message": "Statistika upita je obrisana"}), 200
+
+def uvezi_zaduzenja(conn, ulaz, format='csv'):
+    """
+    Masovni uvoz zaduženja preko COPY u prelaznu tabelu, provera svih redova jednim upitom i upis
+    jednim INSERT ... SELECT. ulaz je binarni tok: CSV sa zaglavljem ili NDJSON (jedan JSON objekat po redu).
+    Vraća (broj_uvezenih, greske); ako ima grešaka, ništa se ne upisuje.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        CREATE TEMP TABLE uvoz_zaduzenja (
+            broj_reda BIGINT GENERATED BY DEFAULT AS IDENTITY,
+            {', '.join(f'{kolona} TEXT' for kolona in UVOZ_KOLONE)}
+        ) ON COMMIT DROP
+    """)
+    if format == 'csv':
+        zaglavlje = next(csv.reader([ulaz.readline().decode('utf-8-sig')]), [])
+        kolone = [kolona.strip() for kolona in zaglavlje]
+        nepoznate = [kolona for kolona in kolone if kolona not in UVOZ_KOLONE]
+        nedostaju = [kolona for kolona in UVOZ_OBAVEZNE_KOLONE if kolona not in kolone]
+        if nepoznate or nedostaju:
+            conn.rollback()
+            cursor.close()
+            return 0, [{"red": 0, "greska": f"neispravno zaglavlje (nepoznate: {nepoznate}, nedostaju: {nedostaju})"}]
+        cursor.copy_expert(f"COPY uvoz_zaduzenja ({', '.join(kolone)}) FROM STDIN WITH (FORMAT csv)", ulaz)
+    else:
+        # Svaka linija se učitava kao jedan tekst (QUOTE/DELIMITER su bajtovi koji se ne javljaju u JSON-u),
+        # a polja se izdvajaju u SQL-u
+        cursor.execute("""
+            CREATE TEMP TABLE uvoz_json (broj_reda BIGINT GENERATED BY DEFAULT AS IDENTITY, red TEXT)
+            ON COMMIT DROP
+        """)
+        cursor.copy_expert("COPY uvoz_json (red) FROM STDIN WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')", ulaz)
+        cursor.execute(f"""
+            INSERT INTO uvoz_zaduzenja (broj_reda, {', '.join(UVOZ_KOLONE)})
+            SELECT broj_reda, {', '.join(f"r->>'{kolona}'" for kolona in UVOZ_KOLONE)}
+            FROM (SELECT broj_reda, red::jsonb AS r FROM uvoz_json WHERE red IS NOT NULL) redovi
+        """)
+    # Podrazumevani status: aktivan ako nema datuma razduživanja
+    cursor.execute("""
+        UPDATE uvoz_zaduzenja
+        SET status = CASE WHEN datum_razduzivanja IS NULL THEN 'aktivan' ELSE 'razduzen' END
+        WHERE status IS NULL
+    """)
+    cursor.execute(SQL_UVOZ_GRESKE, (UVOZ_MAX_GRESAKA,))
+    greske = [{"red": broj_reda, "greska": greska} for broj_reda, greska in cursor.fetchall()]
+    if greske:
+        conn.rollback()
+        cursor.close()
+        return 0, greske
+    # Keš aktivnih bicikala se posle commit-a učitava ponovo (jedno obaveštenje umesto po jednog za svaki red)
+    cursor.execute("SELECT set_config('biciklana.masovni_upis', 'on', true)")
+    cursor.execute(SQL_UVOZ_UPIS)
+    broj = cursor.rowcount
+    cursor.execute("SELECT set_config('biciklana.masovni_upis', 'off', true)")
+    cursor.execute("SELECT pg_notify('aktivni_bicikli', %s)", (json.dumps({'ponovo_ucitaj': True}),))
+    cursor.execute(SQL_UVOZ_BICIKLI)
+    # Statistika grupa iz uvoza se računa pre commit-a, pod istim lock-om kao osvezi_statistiku: osvežavanje koje je
+    # u toku se sačeka, a ono koje počne dok uvoz ne završi ne može da upiše agregate bez uvezenih redova
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext('statistika_zaduzenja'))")
+    cursor.execute(SQL_UVOZ_STATISTIKA)
+    conn.commit()
+    cursor.close()
+    return broj, []
+
+def sinhronizuj_centralu():
+    """
+    Slanje svih aktivnih zaduženja ovog grada centrali jednim pozivom - centrala zamenjuje indeks
+    aktivnih zaduženja grada i preračunava brojače (umesto poziva zaduzi-bicikl za svaki red)
+    """
+    conn = get_db_connection()
+    if not conn:
+        return {"success": False, "message": "Greška pri konekciji sa bazom podataka"}
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT lpad(jmbg::text, 13, '0'), oznaka_bicikla, to_char(datum_zaduzivanja, 'YYYY-MM-DD')
+            FROM zaduzenja WHERE status = 'aktivan'
+        """)
+        zaduzenja = [{
+            "jmbg": jmbg,
+            "oznaka_bicikla": oznaka_bicikla,
+            "datum_zaduzivanja": datum_zaduzivanja
+        } for jmbg, oznaka_bicikla, datum_zaduzivanja in cursor.fetchall()]
+        cursor.close()
+    finally:
+        release_db_connection(conn)
+    try:
+        response = requests.post(f"{CENTRAL_URL}/admin/aktivna-zaduzenja",
+                                 json={"grad": GRAD_NAZIV, "zaduzenja": zaduzenja},
+                                 headers={'X-Admin-Token': ADMIN_TOKEN or ''}, timeout=UVOZ_CENTRAL_TIMEOUT)
+        return response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return {"success": False, "message": f"Greška pri pozivu centralne API: {e}"}
+
+@app.route('/admin/zaduzenja/uvoz', methods=['POST'])
+def uvoz_zaduzenja():
+    """
+    Masovni uvoz zaduženja (početno punjenje grada ili obnova posle gubitka baze) preko COPY
+    Telo: CSV sa zaglavljem (?format=csv) ili NDJSON (?format=ndjson ili Content-Type application/x-ndjson)
+    Kolone: korisnik_id, jmbg, ime, prezime, oznaka_bicikla, tip_bicikla, datum_zaduzivanja,
+            datum_razduzivanja, status, created_at (poslednje tri su opcione)
+    ?centrala=true - posle uvoza se brojači u centrali preračunavaju jednim pozivom
+    Uvoz je atomičan: ako neki red ne prođe proveru, ništa se ne upisuje, a greške se vraćaju po rednom broju zapisa.
+    """
+    try:
+        if not admin_dozvoljen():
             return jsonify({
                 "success": False,
-                "message": "Greška pri komunikaciji sa centralnom biciklanom"
-            }), 500
-        
-        if not check_response.get('success'):
-            return jsonify(check_response), 404
+                "message": "Pristup dozvoljen samo administratoru"
+            }), 403
         
-        if not check_response.get('can_rent'):
+        format = request.args.get('format') or ('ndjson' if 'ndjson' in (request.mimetype or '') else 'csv')
+        if format not in ('csv', 'ndjson'):
             return jsonify({
                 "success": False,
-                "message": "Korisnik je dostigao maksimalan broj zaduženja (2 bicikla)"
+                "message": "Nepodržan format uvoza. Koristiti: csv, ndjson"
             }), 400
         
-        # Provera da li je bicikl već zadužen u ovom gradu
         conn = get_db_connection()
         if not conn:
             return jsonify({
@@ -179,84 +3325,145 @@ def zaduzi_bicikl():
                 "message": "Greška pri konekciji sa bazom podataka"
             }), 500
         
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cursor.execute("""
-            SELECT id FROM zaduzenja 
-            WHERE oznaka_bicikla = %s AND status = 'aktivan'
-        """, (data['oznaka_bicikla'],))
-        
-        existing_rental = cursor.fetchone()
+        try:
+            broj, greske = uvezi_zaduzenja(conn, request.stream, format)
+        except psycopg2.DataError as e:
+            conn.rollback()
+            release_db_connection(conn)
+            return jsonify({
+                "success": False,
+                "message": f"Neispravni podaci u uvozu: {str(e).strip().splitlines()[0]}"
+            }), 400
+        release_db_connection(conn)
         
-        if existing_rental:
-            cursor.close()
-            conn.close()
+        if greske:
             return jsonify({
                 "success": False,
-                "message": f"Bicikl {data['oznaka_bicikla']} je već zadužen"
+                "message": "Uvoz odbijen - neispravni redovi",
+                "greske": greske
             }), 400
         
-        # Registrovanje zaduženja u centralnoj biciklani
-        rent_response = call_centralna_api('/korisnici/zaduzi-bicikl', {'jmbg': data['jmbg']})
+        logging.info(f"Masovni uvoz zaduženja: {broj} redova")
+        result = {
+            "success": True,
+            "message": f"Uvezeno {broj} zaduženja u {GRAD_NAZIV}",
+            "uvezeno": broj
+        }
+        if request.args.get('centrala', 'false').lower() == 'true':
+            result['centrala'] = sinhronizuj_centralu()
+        return jsonify(result), 201
         
-        if not rent_response or not rent_response.get('success'):
-            cursor.close()
-            conn.close()
+    except Exception as e:
+        print(f"Greška pri masovnom uvozu zaduženja: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+@app.cli.command('uvoz-zaduzenja')
+@click.argument('ulaz', type=click.File('rb'))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']), default='csv')
+@click.option('--centrala', is_flag=True, help='Posle uvoza preračunati brojače u centrali')
+def uvoz_zaduzenja_cli(ulaz, format, centrala):
+    """Masovni uvoz zaduženja iz fajla ULAZ (CSV sa zaglavljem ili NDJSON)"""
+    conn = get_db_connection()
+    if not conn:
+        raise click.ClickException("Greška pri konekciji sa bazom podataka")
+    try:
+        broj, greske = uvezi_zaduzenja(conn, ulaz, format)
+    finally:
+        release_db_connection(conn)
+    if greske:
+        for greska in greske:
+            click.echo(f"Red {greska['red']}: {greska['greska']}", err=True)
+        raise click.ClickException("Uvoz odbijen - neispravni redovi")
+    click.echo(f"Uvezeno {broj} zaduženja")
+    if centrala:
+        click.echo(f"Centrala: {sinhronizuj_centralu()}")
+
+@app.route('/statistika', methods=['GET'])
+def get_statistika():
+    """
+    Dnevna statistika zaduženja po tipu bicikla (iz agregata, bez čitanja zaduzenja)
+    Opcioni filteri: ?od=2025-09-01&do=2025-09-30&tip=Gradski
+    "osvezeno_do" je watermark - promene novije od njega još nisu u agregatima.
+    """
+    try:
+        conditions = []
+        params = []
+        for field, condition in [('od', "dan >= %s"), ('do', "dan <= %s"), ('tip', "tip_bicikla = %s")]:
+            value = request.args.get(field)
+            if not value:
+                continue
+            if field in ('od', 'do'):
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({
+                        "success": False,
+                        "message": "Neisprava format datuma. Koristiti YYYY-MM-DD"
+                    }), 400
+            conditions.append(condition)
+            params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        conn = get_db_connection(max_lag=READ_MAX_LAG['statistika'])
+        if not conn:
             return jsonify({
                 "success": False,
-                "message": "Greška pri registraciji zaduženja u centralnoj biciklani"
+                "message": "Greška pri konekciji sa bazom podataka"
             }), 500
         
-        # Lokalno čuvanje zaduženja
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(f"""
+            SELECT to_char(dan, 'YYYY-MM-DD') AS dan, tip_bicikla, broj_zaduzenja, broj_razduzenja, ukupno_dana,
+                   ROUND(ukupno_dana::numeric / NULLIF(broj_razduzenja, 0), 2)::float8 AS prosecno_trajanje_dana
+            FROM statistika_zaduzenja
+            {where}
+            ORDER BY dan, tip_bicikla
+        """, params)
+        statistika = cursor.fetchall()
         cursor.execute("""
-            INSERT INTO zaduzenja (korisnik_id, jmbg, ime, prezime, oznaka_bicikla, tip_bicikla, datum_zaduzivanja, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, 'aktivan')
-            RETURNING id
-        """, (
-            rent_response['user_id'],
-            data['jmbg'],
-            check_response['ime'],
-            check_response['prezime'],
-            data['oznaka_bicikla'],
-            data['tip_bicikla'],
-            data['datum_zaduzivanja']
-        ))
-        
-        rental_id = cursor.fetchone()['id']
-        conn.commit()
+            SELECT NULLIF(obradjeno_do, '-infinity') AS obradjeno_do
+            FROM statistika_watermark WHERE naziv = 'zaduzenja'
+        """)
+        watermark = cursor.fetchone()
         cursor.close()
-        conn.close()
+        release_db_connection(conn)
         
+        obradjeno_do = watermark['obradjeno_do'] if watermark else None
         return jsonify({
             "success": True,
-            "message": f"Bicikl {data['oznaka_bicikla']} uspešno zadužen u {GRAD_NAZIV}",
-            "rental_id": rental_id,
-            "active_rentals": rent_response['active_rentals']
-        }), 201
+            "grad": GRAD_NAZIV,
+            "osvezeno_do": obradjeno_do.isoformat() if isinstance(obradjeno_do, datetime) else None,
+            "statistika": statistika
+        }), 200
         
     except Exception as e:
-        print(f"Greška pri zaduženju bicikla: {e}")
+        print(f"Greška pri dohvatanju statistike: {e}")
         return jsonify({
             "success": False,
             "message": "Interna greška servera"
         }), 500
 
-@app.route('/razduzivanje', methods=['POST'])
-def razduzi_bicikl():
+@app.route('/bicikli', methods=['POST'])
+def dodaj_bicikl():
     """
-    Razduženje bicikla
+    Dodavanje bicikla u inventar
     Expected JSON: {
-        "oznaka_bicikla": "NS001"
+        "oznaka_bicikla": "NS001",
+        "tip_bicikla": "Gradski"
     }
     """
     try:
         data = request.get_json()
         
-        if 'oznaka_bicikla' not in data or not data['oznaka_bicikla']:
-            return jsonify({
-                "success": False,
-                "message": "Oznaka bicikla je obavezan parametar"
-            }), 400
+        for field in ['oznaka_bicikla', 'tip_bicikla']:
+            if field not in data or not data[field]:
+                return jsonify({
+                    "success": False,
+                    "message": f"Nedostaje obavezan podatak: {field}"
+                }), 400
         
         conn = get_db_connection()
         if not conn:
@@ -265,65 +3472,62 @@ def razduzi_bicikl():
                 "message": "Greška pri konekciji sa bazom podataka"
             }), 500
         
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Pronalaženje aktivnog zaduženja
+        cursor = conn.cursor()
         cursor.execute("""
-            SELECT id, jmbg, ime, prezime, oznaka_bicikla 
-            FROM zaduzenja 
-            WHERE oznaka_bicikla = %s AND status = 'aktivan'
-        """, (data['oznaka_bicikla'],))
-        
-        rental = cursor.fetchone()
-        
-        if not rental:
-            cursor.close()
-            conn.close()
-            return jsonify({
-                "success": False,
-                "message": f"Aktivno zaduženje za bicikl {data['oznaka_bicikla']} nije pronađeno"
-            }), 404
-        
-        # Razduženje u centralnoj biciklani
-        unrent_response = call_centralna_api('/korisnici/razduzi-bicikl', {'jmbg': rental['jmbg']})
+            INSERT INTO bicikli (oznaka_bicikla, tip_bicikla, status)
+            VALUES (%s, %s, 'dostupan')
+            ON CONFLICT (oznaka_bicikla) DO NOTHING
+            RETURNING oznaka_bicikla
+        """, (data['oznaka_bicikla'], data['tip_bicikla']))
+        created = cursor.fetchone()
+        conn.commit()
+        cursor.close()
+        release_db_connection(conn)
         
-        if not unrent_response or not unrent_response.get('success'):
-            cursor.close()
-            conn.close()
+        if not created:
             return jsonify({
                 "success": False,
-                "message": "Greška pri razduženju u centralnoj biciklani"
-            }), 500
-        
-        # Lokalno ažuriranje zaduženja
-        cursor.execute("""
-            UPDATE zaduzenja 
-            SET status = 'razduzen', datum_razduzivanja = %s
-            WHERE id = %s
-        """, (date.today(), rental['id']))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+                "message": f"Bicikl {data['oznaka_bicikla']} već postoji u inventaru"
+            }), 409
         
         return jsonify({
             "success": True,
-            "message": f"Bicikl {data['oznaka_bicikla']} uspešno razdužen u {GRAD_NAZIV}",
-            "korisnik": f"{rental['ime']} {rental['prezime']}",
-            "remaining_rentals": unrent_response['active_rentals']
-        }), 200
+            "message": f"Bicikl {data['oznaka_bicikla']} dodat u inventar {GRAD_NAZIV}"
+        }), 201
         
     except Exception as e:
-        print(f"Greška pri razduženju bicikla: {e}")
+        print(f"Greška pri dodavanju bicikla: {e}")
         return jsonify({
             "success": False,
             "message": "Interna greška servera"
         }), 500
 
-@app.route('/zaduzenja', methods=['GET'])
-def get_zaduzenja():
-    """Vraća sva zaduženja za ovaj grad"""
+@app.route('/bicikli/dostupni', methods=['GET'])
+def get_dostupni_bicikli():
+    """
+    Vraća dostupne bicikle iz inventara, stranu po stranu (sortirano po oznaci)
+    Opcioni parametri: ?tip=Gradski&posle=NS010&limit=50
+    (posle = vrednost "sledeca_strana" iz prethodnog odgovora)
+    """
     try:
+        try:
+            limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "message": "limit mora biti ceo broj"
+            }), 400
+        
+        conditions = ["status = 'dostupan'"]
+        params = []
+        if request.args.get('tip'):
+            conditions.append("tip_bicikla = %s")
+            params.append(request.args['tip'])
+        if request.args.get('posle'):
+            conditions.append("oznaka_bicikla > %s")
+            params.append(request.args['posle'])
+        params.append(limit)
+        
         conn = get_db_connection()
         if not conn:
             return jsonify({
@@ -331,60 +3535,44 @@ def get_zaduzenja():
                 "message": "Greška pri konekciji sa bazom podataka"
             }), 500
         
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Filtiranje po statusu (opciono)
-        status_filter = request.args.get('status', None)
-        
-        if status_filter:
-            cursor.execute("""
-                SELECT id, jmbg, ime, prezime, oznaka_bicikla, tip_bicikla, 
-                       datum_zaduzivanja, datum_razduzivanja, status, created_at
-                FROM zaduzenja 
-                WHERE status = %s
-                ORDER BY created_at DESC
-            """, (status_filter,))
-        else:
-            cursor.execute("""
-                SELECT id, jmbg, ime, prezime, oznaka_bicikla, tip_bicikla, 
-                       datum_zaduzivanja, datum_razduzivanja, status, created_at
-                FROM zaduzenja 
-                ORDER BY created_at DESC
-            """)
-        
-        zaduzenja = cursor.fetchall()
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT oznaka_bicikla, tip_bicikla
+            FROM bicikli
+            WHERE {' AND '.join(conditions)}
+            ORDER BY oznaka_bicikla
+            LIMIT %s
+        """, params)
+        bicikli = [{"oznaka_bicikla": oznaka, "tip_bicikla": tip} for oznaka, tip in cursor.fetchall()]
         cursor.close()
-        conn.close()
-        
-        # Konvertovanje date objekata u string
-        result = []
-        for zaduzenje in zaduzenja:
-            z = dict(zaduzenje)
-            if z['datum_zaduzivanja']:
-                z['datum_zaduzivanja'] = z['datum_zaduzivanja'].strftime('%Y-%m-%d')
-            if z['datum_razduzivanja']:
-                z['datum_razduzivanja'] = z['datum_razduzivanja'].strftime('%Y-%m-%d')
-            result.append(z)
+        release_db_connection(conn)
         
         return jsonify({
             "success": True,
             "grad": GRAD_NAZIV,
-            "zaduzenja": result
+            "bicikli": bicikli,
+            "sledeca_strana": bicikli[-1]["oznaka_bicikla"] if len(bicikli) == limit else None
         }), 200
         
     except Exception as e:
-        print(f"Greška pri dohvatanju zaduženja: {e}")
+        print(f"Greška pri dohvatanju dostupnih bicikala: {e}")
         return jsonify({
             "success": False,
             "message": "Interna greška servera"
         }), 500
 
-
+# Pokretanje interpretera, uvoz biblioteka i izvršavanje modula (faza 'uvoz' zagrevanja)
+TRAJANJE_UVOZA = trajanje_procesa()
 
 if __name__ == '__main__':
     print("Pokretanje Bike Shop Novi Sad...")
     print("Endpoints:")
+    print("GET  /metrike")
     print("GET  /health")
     print("POST /registracija")
     
+    # Zagrevanje odmah po pokretanju, u procesu koji opslužuje zahteve (ne u nadzornom procesu reloader-a)
+    if WARMUP and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warmup.start()
+    
     app.run(host='0.0.0.0', port=5003, debug=True)
\ No newline at end of file
@@ -11,7 +11,8 @@ CREATE TABLE zaduzenja (
     datum_zaduzivanja DATE NOT NULL,
     datum_razduzivanja DATE NULL,
     status VARCHAR(20) DEFAULT 'aktivan',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Indeksi za bolje performanse
@@ -19,6 +20,8 @@ CREATE INDEX idx_zaduzenja_jmbg ON zaduzenja(jmbg);
 CREATE INDEX idx_zaduzenja_oznaka_bicikla ON zaduzenja(oznaka_bicikla);
 CREATE INDEX idx_zaduzenja_status ON zaduzenja(status);
 CREATE INDEX idx_zaduzenja_created_at ON zaduzenja(created_at);
+CREATE INDEX idx_zaduzenja_updated_at ON zaduzenja(updated_at);
+CREATE INDEX idx_zaduzenja_datum_tip ON zaduzenja(datum_zaduzivanja, tip_bicikla);
 
 -- Constraint za jedinstvene aktivne bicikle
 CREATE UNIQUE INDEX idx_unique_active_bike 
@@ -26,4 +29,58 @@ ON zaduzenja(oznaka_bicikla)
 WHERE status = 'aktivan';
 
 -- Test podaci (različiti za svaki grad)
--- Ovi podaci će biti dodani preko aplikacije ili ručno po potrebi
\ No newline at end of file
+-- Ovi podaci će biti dodani preko aplikacije ili ručno po potrebi
+
+-- Inventar bicikala (status se ažurira pri zaduženju/razduženju)
+CREATE TABLE bicikli (
+    oznaka_bicikla VARCHAR(50) PRIMARY KEY,
+    tip_bicikla VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'dostupan',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_bicikli_status_oznaka ON bicikli(status, oznaka_bicikla);
+CREATE INDEX idx_bicikli_status_tip ON bicikli(status, tip_bicikla, oznaka_bicikla);
+
+-- Dnevni agregati zaduženja po tipu bicikla (osvežavaju se inkrementalno iz aplikacije)
+CREATE TABLE statistika_zaduzenja (
+    dan DATE NOT NULL,
+    tip_bicikla VARCHAR(50) NOT NULL,
+    broj_zaduzenja INTEGER NOT NULL DEFAULT 0,
+    broj_razduzenja INTEGER NOT NULL DEFAULT 0,
+    ukupno_dana BIGINT NOT NULL DEFAULT 0,
+    osvezeno TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (dan, tip_bicikla)
+);
+
+-- Watermark inkrementalnog osvežavanja statistike
+CREATE TABLE statistika_watermark (
+    naziv VARCHAR(50) PRIMARY KEY,
+    obradjeno_do TIMESTAMP NOT NULL
+);
+
+INSERT INTO statistika_watermark (naziv, obradjeno_do) VALUES ('zaduzenja', '-infinity');
+
+-- Zakupi kvote zaduženja od centrale (jedan red po korisniku)
+CREATE TABLE zakupi (
+    jmbg VARCHAR(13) PRIMARY KEY,
+    korisnik_id INTEGER NOT NULL,
+    ime VARCHAR(50) NOT NULL,
+    prezime VARCHAR(50) NOT NULL,
+    limit_zaduzenja INTEGER NOT NULL,
+    u_drugim_gradovima INTEGER NOT NULL DEFAULT 0,
+    istice TIMESTAMP NOT NULL
+);
+
+-- Outbox događaja (zaduženja i razduženja iz zakupa) koje centrala još nije potvrdila
+CREATE TABLE dogadjaji_centrala (
+    id BIGSERIAL PRIMARY KEY,
+    vrsta VARCHAR(20) NOT NULL,
+    jmbg VARCHAR(13) NOT NULL,
+    oznaka_bicikla VARCHAR(50) NOT NULL,
+    datum_zaduzivanja DATE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_dogadjaji_centrala_oznaka ON dogadjaji_centrala(oznaka_bicikla);
+CREATE INDEX idx_dogadjaji_centrala_created_at ON dogadjaji_centrala(created_at);
@@ -1,9 +1,53 @@
-from flask import Flask, request, jsonify # type: ignore
+from flask import Flask, Response, request, jsonify, g, has_request_context, send_file, stream_with_context # type: ignore
+from flask.json.provider import DefaultJSONProvider # type: ignore
 import psycopg2 # type: ignore
-from psycopg2.extras import RealDictCursor # type: ignore
+from psycopg2 import pool as pg_pool # type: ignore
+from psycopg2.extras import RealDictCursor, execute_values # type: ignore
+import requests
+import click # type: ignore
+import cProfile
 import os
+import hashlib
+import heapq
+import queue
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+import hmac
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 import logging
+import marshal
+import pstats
+import random
+import re
+import select
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+
+try:
+    import brotli # type: ignore
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack # type: ignore
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson # type: ignore
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa # type: ignore
+    import pyarrow.parquet as pq # type: ignore
+except ImportError:
+    pa = None
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -17,36 +61,1396 @@ DB_CONFIG = {
     'port': int(os.getenv('DB_PORT', 5432))
 }
 
-def get_db_connection():
-    """Kreiranje konekcije sa bazom podataka"""
-    try:
-        conn = psycopg2.connect(**DB_CONFIG)
+# Pool konekcija - konekcije su dugotrajne, pa se šema kreira i naredbe pripremaju samo jednom po konekciji
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
 
-        cursor = conn.cursor()
+# Opciona replika za čitanje (libpq DSN, npr. "host=replika dbname=... user=... password=...")
+DB_READ_DSN = os.getenv('DB_READ_DSN')
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 1))
+REPLICA_RETRY_INTERVAL = float(os.getenv('REPLICA_RETRY_INTERVAL', 5))
+
+# Readiness provera - rezultat se kešira READY_CACHE_TTL sekundi, pa probe ne opterećuju bazu
+READY_CACHE_TTL = float(os.getenv('READY_CACHE_TTL', 5))
+READY_CHECK_TIMEOUT = float(os.getenv('READY_CHECK_TIMEOUT', 1))
+# Zagrevanje pri pokretanju - /ready vraća 503 dok se ne otvori DB_POOL_MIN konekcija sa pripremljenim naredbama,
+# ne uspostave trajne HTTP konekcije ka povezanim servisima i (uz WARMUP_PRELOAD_CACHES) ne učitaju keševi
+# (najviše WARMUP_CACHE_TIMEOUT sekundi). Trajanje svake faze se vidi u /ready.
+WARMUP = os.getenv('WARMUP', 'true').lower() == 'true'
+WARMUP_PRELOAD_CACHES = os.getenv('WARMUP_PRELOAD_CACHES', 'true').lower() == 'true'
+WARMUP_CACHE_TIMEOUT = float(os.getenv('WARMUP_CACHE_TIMEOUT', 10))
+WARMUP_RETRY_INTERVAL = float(os.getenv('WARMUP_RETRY_INTERVAL', 2))
+# Najveći broj trajnih HTTP konekcija po servisu (zajednička requests.Session za pozive drugih servisa)
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+# Rok zahteva (sekundi): statement_timeout upita i čekanje na pool i druge servise računaju se iz preostalog vremena,
+# a pozivi drugih servisa nose preostalo vreme (ms) u zaglavlju X-Request-Deadline, koje pozvani servis poštuje
+# (važi kraći od dva roka). Zahtev kome je rok istekao dobija 504 umesto da se obrađuje do kraja; 0 = bez rokova.
+REQUEST_DEADLINE = float(os.getenv('REQUEST_DEADLINE', 10))
+DEADLINE_HEADER = 'X-Request-Deadline'
+# Dugotrajne rute bez roka (tok promena, izvoz, zamena aktivnih zaduženja pri uvozu, uzorkovanje stekova)
+DEADLINE_EXEMPT = {'get_promene_brojaca', 'izvoz_korisnika', 'zameni_aktivna_zaduzenja', 'uzorkovanje_stekova'}
+# Dozvoljeno kašnjenje replike (sekundi) po read-only ruti; negativna vrednost = uvek primarna baza
+READ_MAX_LAG = {
+    'korisnici': float(os.getenv('READ_MAX_LAG_KORISNICI', 30)),
+    'proveri-zaduzenje': float(os.getenv('READ_MAX_LAG_PROVERI_ZADUZENJE', 1)),
+}
+
+# Gradske biciklane za zbirne upite ("Naziv=URL" razdvojeno zarezima)
+CITY_URLS = dict(
+    item.split('=', 1) for item in os.getenv(
+        'CITY_URLS',
+        'Novi Sad=http://novi_sad_app:5001,Kragujevac=http://kragujevac_app:5002,Subotica=http://subotica_app:5003'
+    ).split(',') if item
+)
+# Maksimalno čekanje na odgovor jednog grada (sekundi)
+FANOUT_TIMEOUT = float(os.getenv('FANOUT_TIMEOUT', 5))
+# Poslednji odgovori gradova sa ETag-om (po gradu, putanji i parametrima) - zbirni upiti šalju If-None-Match,
+# pa neizmenjene liste gradovi ne šalju ponovo
+FANOUT_CACHE_SIZE = int(os.getenv('FANOUT_CACHE_SIZE', 32))
+# Najviše bajtova svih keširanih tela odgovora gradova; veće telo se ne kešira (sledeći upit ga preuzima ceo)
+FANOUT_CACHE_BYTES = int(os.getenv('FANOUT_CACHE_BYTES', 8 * 1024 * 1024))
+# Broj redova oznake izmena po listi u verzije_tabela (ETag listi) - istovremeni upisi uvećavaju različite redove
+VERZIJE_DELOVA = 16
+# Broj redova koji se šalju u jednom delu strimovanog odgovora
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 500))
+
+# Tok promena brojača zaduženja (SSE) za keševe u gradovima
+CHANGE_FEED_HEARTBEAT = float(os.getenv('CHANGE_FEED_HEARTBEAT', 15))
+CHANGE_FEED_QUEUE_SIZE = int(os.getenv('CHANGE_FEED_QUEUE_SIZE', 1000))
+CHANGE_FEED_RETRY_INTERVAL = float(os.getenv('CHANGE_FEED_RETRY_INTERVAL', 5))
+
+# Kolonski izvoz (Parquet / Arrow IPC) - redovi se čitaju serverskim kursorom u serijama od EXPORT_BATCH_SIZE
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 50000))
+EXPORT_FORMATS = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+# Zakupi kvote zaduženja - grad koji drži važeći zakup za korisnika sam odobrava zaduženja do limita zakupa,
+# a centrali ih javlja naknadno (POST /zakupi/dogadjaji). Istekao zakup se još LEASE_GRACE sekundi računa kao
+# rezervisan, jer događaji iz grada mogu da kasne.
+LEASE_TTL = float(os.getenv('LEASE_TTL', 60))
+LEASE_GRACE = float(os.getenv('LEASE_GRACE', 30))
+# Koliko dugo (sekundi) se pamte primljeni događaji gradova radi prepoznavanja ponovljenog slanja
+LEASE_EVENT_RETENTION = float(os.getenv('LEASE_EVENT_RETENTION', 7 * 24 * 3600))
+
+# Administratorske rute (/admin/...) traže zaglavlje X-Admin-Token; bez ADMIN_TOKEN su isključene
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+# Profilisanje živog poda (/admin/profil/...): cProfile uzorka zahteva jedne rute, wall-clock uzorkovanje stekova svih
+# niti i tracemalloc snimci memorije. Podrazumevano isključeno, a i uključeno traži ADMIN_TOKEN; dok ništa nije
+# pokrenuto, trošak po zahtevu je jedna provera atributa.
+PROFILING = os.getenv('PROFILING', 'false').lower() == 'true'
+# Najduže trajanje jednog uzorkovanja stekova (sekundi) i podrazumevani razmak između uzoraka
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 60))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.01))
+# Merenje upita: trajanje svake naredbe i prsten (SLOW_QUERY_BUFFER) nedavnih upita sporijih od SLOW_QUERY_MS, bez
+# vrednosti parametara. Za upite sporije od SLOW_QUERY_EXPLAIN_MS (negativno = isključeno) pozadinska nit uzima plan,
+# najviše jednom u SLOW_QUERY_EXPLAIN_INTERVAL sekundi po naredbi. Rezultati su na /admin/spori-upiti.
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'true').lower() == 'true'
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 50))
+SLOW_QUERY_BUFFER = int(os.getenv('SLOW_QUERY_BUFFER', 100))
+# Najveći broj različitih naredbi za koje se vodi statistika
+SLOW_QUERY_STATEMENTS = int(os.getenv('SLOW_QUERY_STATEMENTS', 500))
+SLOW_QUERY_EXPLAIN_MS = float(os.getenv('SLOW_QUERY_EXPLAIN_MS', 200))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 300))
+SLOW_QUERY_EXPLAIN_TIMEOUT = float(os.getenv('SLOW_QUERY_EXPLAIN_TIMEOUT', 5))
+
+# Zapis JMBG-a u bazi: 'varchar' (VARCHAR(13)) ili 'bigint' (8 bajtova - manji indeksi i brže poređenje).
+# Vodeće nule se pri čitanju vraćaju sa lpad, a postojeće kolone se pri pokretanju konvertuju u izabrani tip.
+JMBG_STORAGE = os.getenv('JMBG_STORAGE', 'varchar')
+JMBG_TIP = 'BIGINT' if JMBG_STORAGE == 'bigint' else 'VARCHAR(13)'
+# Provera kontrolne cifre JMBG-a pri registraciji novih korisnika
+JMBG_KONTROLNA_CIFRA = os.getenv('JMBG_KONTROLNA_CIFRA', 'true').lower() == 'true'
+
+# Kontrola prijema zahteva - ograničen broj zahteva u obradi po klasi ruta i red čekanja po CoDel principu.
+# Dok se red ne isprazni duže od ADMISSION_INTERVAL, zahtevi koji čekaju duže od ADMISSION_TARGET se odbijaju
+# sa 503 i Retry-After (inače se čeka najviše ADMISSION_MAX_WAIT sekundi); upisi imaju prednost nad listanjem.
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'true').lower() == 'true'
+ADMISSION_LIMIT = int(os.getenv('ADMISSION_LIMIT', DB_POOL_MAX))
+ADMISSION_LIMITS = dict(
+    (klasa, int(limit)) for klasa, limit in (
+        item.split('=', 1) for item in os.getenv('ADMISSION_LIMITS', 'upis=10,provera=8,listanje=4').split(',') if item
+    )
+)
+ADMISSION_TARGET = float(os.getenv('ADMISSION_TARGET', 0.05))
+ADMISSION_INTERVAL = float(os.getenv('ADMISSION_INTERVAL', 0.5))
+ADMISSION_MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', 1))
+ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', 100))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 1))
+# Klasa po ruti (Flask endpoint) i prioritet klase (manji broj = veći prioritet); ostale rute ne prolaze kontrolu
+ADMISSION_KLASE = {
+    'registruj_korisnika': 'upis',
+    'zaduzi_bicikl': 'upis',
+    'razduzi_bicikl': 'upis',
+    'proveri_zaduzenje': 'provera',
+    'get_aktivna_zaduzenja_korisnika': 'listanje',
+    'get_all_users': 'listanje',
+    'izvoz_korisnika': 'listanje',
+    'get_sva_zaduzenja': 'listanje',
+    'get_zbirna_statistika': 'listanje',
+    'obnovi_zakupe': 'provera',
+    'primi_dogadjaje': 'provera',
+    'rpc': 'upis',
+}
+ADMISSION_PRIORITETI = {'upis': 0, 'provera': 1, 'listanje': 2}
+
+# Kompresija JSON odgovora (br ako je brotli instaliran, inače gzip) većih od COMPRESS_MIN_SIZE bajtova;
+# strimovani odgovori se kompresuju deo po deo. COMPRESS_MIN_SIZE=0 isključuje kompresiju.
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+
+# Interni binarni RPC za gradove (POST /rpc, msgpack): serija poziva provere, zaduženja i razduženja u jednom zahtevu.
+# Poziv je niz [operacija, jmbg, grad, oznaka_bicikla, datum_zaduzivanja], a odgovor niz čiji je prvi element status.
+RPC_MAX_BATCH = int(os.getenv('RPC_MAX_BATCH', 256))
+RPC_PROVERI, RPC_ZADUZI, RPC_RAZDUZI = 0, 1, 2
+RPC_OK, RPC_ODBIJENO, RPC_GRESKA = 0, 1, 2
+
+# JSON enkoder za odgovore: 'standard' (Flask) ili 'orjson' (brži, nativno serijalizuje date/datetime)
+JSON_ENCODER = os.getenv('JSON_ENCODER', 'standard')
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider zasnovan na orjson biblioteci"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+if JSON_ENCODER == 'orjson':
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        logging.warning("JSON_ENCODER=orjson, ali orjson nije instaliran - koristi se standardni enkoder")
+        JSON_ENCODER = 'standard'
+
+# Tipovi redova za vruće putanje - tuple umesto dict-a po redu (RealDictCursor samo za listanje)
+KorisnikStanje = namedtuple('KorisnikStanje', ['id', 'ime', 'prezime', 'broj_aktivnih_bicikala'])
+StanjeBrojaca = namedtuple('StanjeBrojaca', ['id', 'broj_aktivnih_bicikala'])
+
+# Šema kolonskog izvoza korisnika (redosled kolona odgovara upitu u izvezi_korisnike)
+KORISNICI_SCHEMA = pa.schema([
+    ('id', pa.int32()),
+    ('jmbg', pa.string()),
+    ('ime', pa.string()),
+    ('prezime', pa.string()),
+    ('adresa', pa.string()),
+    ('broj_aktivnih_bicikala', pa.int32()),
+    ('created_at', pa.timestamp('us')),
+]) if pa is not None else None
+
+# Upiti na vrućim putanjama
+SQL_KORISNIK_ID = "SELECT id FROM korisnici WHERE jmbg = %s"
+SQL_STANJE_KORISNIKA = """
+    SELECT k.id, k.ime, k.prezime, b.broj_aktivnih_bicikala 
+    FROM brojaci_zaduzenja b
+    JOIN korisnici k ON k.id = b.korisnik_id
+    WHERE b.jmbg = %s
+"""
+# Brojači su u uskoj tabeli brojaci_zaduzenja, pa zaduženja ne zaključavaju i ne prepisuju široki red u korisnici;
+# ograničenje od 2 bicikla se i dalje proverava atomski u samom UPDATE-u. Korisnik sa važećim zakupom nekog grada
+# (zakup_do) ne prolazi ovde, već kroz zaduzi_uz_zakupe, koja uračunava i deo limita rezervisan zakupima.
+SQL_ZADUZI = """
+    UPDATE brojaci_zaduzenja 
+    SET broj_aktivnih_bicikala = broj_aktivnih_bicikala + 1
+    WHERE jmbg = %s AND broj_aktivnih_bicikala < 2 AND (zakup_do IS NULL OR zakup_do < LOCALTIMESTAMP)
+    RETURNING korisnik_id, broj_aktivnih_bicikala
+"""
+# Zaduženje o kom je grad već odlučio (po zakupu) ili koje je limit prošlo u zaduzi_uz_zakupe - bez provere limita
+SQL_ZADUZI_BEZ_PROVERE = """
+    UPDATE brojaci_zaduzenja 
+    SET broj_aktivnih_bicikala = broj_aktivnih_bicikala + 1
+    WHERE jmbg = %s
+    RETURNING korisnik_id, broj_aktivnih_bicikala
+"""
+SQL_RAZDUZI = """
+    UPDATE brojaci_zaduzenja 
+    SET broj_aktivnih_bicikala = broj_aktivnih_bicikala - 1
+    WHERE jmbg = %s AND broj_aktivnih_bicikala > 0
+    RETURNING korisnik_id, broj_aktivnih_bicikala
+"""
+# Indeks aktivnih zaduženja po korisniku - ažurira se u istoj transakciji kao i brojač
+SQL_INDEKS_DODAJ = """
+    INSERT INTO aktivna_zaduzenja (jmbg, grad, oznaka_bicikla, datum_zaduzivanja)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (grad, oznaka_bicikla)
+    DO UPDATE SET jmbg = EXCLUDED.jmbg, datum_zaduzivanja = EXCLUDED.datum_zaduzivanja
+"""
+SQL_INDEKS_UKLONI = """
+    DELETE FROM aktivna_zaduzenja
+    WHERE grad = %s AND oznaka_bicikla = %s
+"""
+# Poništavanje zaduženja na koje grad nije dobio odgovor - samo ako je centrala to zaduženje zaista upisala
+SQL_INDEKS_PONISTI = """
+    DELETE FROM aktivna_zaduzenja
+    WHERE grad = %s AND oznaka_bicikla = %s AND jmbg = %s
+    RETURNING jmbg
+"""
+# Važeći limiti zakupa po (jmbg, grad): tekući zakup ili, dok ne istekne, veći limit ranije dodele koju je obnova
+# smanjila ili ukinula (grad stari limit koristi dok ne primeni odgovor obnove); važe i LEASE_GRACE sekundi posle isteka
+SQL_ZAKUPI_REZERVE = f"""(
+    SELECT jmbg, grad, max(limit_zaduzenja) AS limit_zaduzenja
+    FROM (
+        SELECT jmbg, grad, limit_zaduzenja, istice FROM zakupi
+        UNION ALL
+        SELECT jmbg, grad, limit_zaduzenja, istice FROM zakupi_smanjenja
+    ) d
+    WHERE d.istice > LOCALTIMESTAMP - make_interval(secs => {LEASE_GRACE})
+    GROUP BY jmbg, grad
+) z"""
+# Deo limita koji zakupi grada drže rezervisanim: limit zakupa umanjen za aktivna zaduženja grada u indeksu
+# (zaduženja o kojima grad još nije javio su upravo u tom delu)
+SQL_REZERVA_ZAKUPA = """
+    GREATEST(z.limit_zaduzenja - (
+        SELECT count(*) FROM aktivna_zaduzenja a WHERE a.jmbg = z.jmbg AND a.grad = z.grad
+    ), 0)
+"""
+SQL_REZERVISANO_ZAKUPIMA = f"""
+    SELECT COALESCE(SUM({SQL_REZERVA_ZAKUPA}), 0)::int
+    FROM {SQL_ZAKUPI_REZERVE}
+    WHERE z.jmbg = %s
+"""
+# Stanje korisnika za dodelu zakupa gradu %(grad)s: ukupan broj zaduženja, zaduženja u tom gradu i deo limita
+# rezervisan zakupima drugih gradova (brojači su pre ovog upita zaključani)
+SQL_STANJE_ZA_ZAKUP = f"""
+    SELECT lpad(b.jmbg::text, 13, '0') AS jmbg, b.korisnik_id, k.ime, k.prezime, b.broj_aktivnih_bicikala,
+           (SELECT count(*) FROM aktivna_zaduzenja a WHERE a.jmbg = b.jmbg AND a.grad = %(grad)s) AS u_gradu,
+           (SELECT COALESCE(SUM({SQL_REZERVA_ZAKUPA}), 0)::int
+            FROM {SQL_ZAKUPI_REZERVE}
+            WHERE z.jmbg = b.jmbg AND z.grad <> %(grad)s) AS rezervisano,
+           COALESCE((SELECT z.opozvan FROM zakupi z WHERE z.jmbg = b.jmbg AND z.grad = %(grad)s), false) AS opozvan
+    FROM brojaci_zaduzenja b
+    JOIN korisnici k ON k.id = b.korisnik_id
+    WHERE b.jmbg = ANY(%(jmbg)s::{JMBG_TIP}[])
+"""
+
+# Naredbe koje se pripremaju na serveru (ime -> upit)
+PREPARED_STATEMENTS = {
+    'korisnik_id': SQL_KORISNIK_ID,
+    'stanje_korisnika': SQL_STANJE_KORISNIKA,
+    'zaduzi': SQL_ZADUZI,
+    'zaduzi_bez_provere': SQL_ZADUZI_BEZ_PROVERE,
+    'razduzi': SQL_RAZDUZI,
+    'indeks_dodaj': SQL_INDEKS_DODAJ,
+    'indeks_ukloni': SQL_INDEKS_UKLONI,
+    'indeks_ponisti': SQL_INDEKS_PONISTI,
+}
+
+def proveri_jmbg(jmbg, kontrolna_cifra=False):
+    """
+    Provera JMBG-a: tačno 13 ASCII cifara i, opciono, ispravna kontrolna cifra.
+    Vraća poruku o grešci ili None ako je JMBG ispravan.
+    """
+    if not isinstance(jmbg, str) or len(jmbg) != 13 or not jmbg.isascii() or not jmbg.isdigit():
+        return "JMBG mora imati tačno 13 cifara"
+    if kontrolna_cifra:
+        # Kontrolna cifra po modulu 11 (težine 7..2, dva puta), računato nad ASCII kodovima;
+        # 54 * 48 poništava ord('0') jer je zbir težina 54
+        d = jmbg.encode()
+        m = 11 - (7 * (d[0] + d[6]) + 6 * (d[1] + d[7]) + 5 * (d[2] + d[8]) + 4 * (d[3] + d[9])
+                  + 3 * (d[4] + d[10]) + 2 * (d[5] + d[11]) - 54 * 48) % 11
+        if (0 if m > 9 else m) != d[12] - 48:
+            return "JMBG nema ispravnu kontrolnu cifru"
+    return None
+
+def uskladi_tip_jmbg(cursor, tabela):
+    """Konverzija kolone jmbg u tip zadat sa JMBG_STORAGE (jednokratno - prepisuje tabelu i indekse)"""
+    cursor.execute("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND column_name = 'jmbg'
+    """, (tabela,))
+    tip = cursor.fetchone()[0]
+    if tip == ('bigint' if JMBG_STORAGE == 'bigint' else 'character varying'):
+        return
+    logging.warning(f"Konverzija {tabela}.jmbg iz {tip} u {JMBG_TIP}")
+    izraz = "jmbg::bigint" if JMBG_STORAGE == 'bigint' else "lpad(jmbg::text, 13, '0')"
+    cursor.execute(f"ALTER TABLE {tabela} ALTER COLUMN jmbg TYPE {JMBG_TIP} USING {izraz}")
+
+def init_db_schema(conn):
+    """Kreiranje tabela ako ne postoje"""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS korisnici (
+        id SERIAL PRIMARY KEY,
+        jmbg {JMBG_TIP} UNIQUE NOT NULL,
+        ime VARCHAR(50) NOT NULL,
+        prezime VARCHAR(50) NOT NULL,
+        adresa TEXT NOT NULL,
+        broj_aktivnih_bicikala INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    uskladi_tip_jmbg(cursor, 'korisnici')
+
+    # Uska tabela brojača aktivnih zaduženja (kolona broj_aktivnih_bicikala u korisnici se više ne ažurira).
+    # fillfactor ostavlja mesta na stranici za HOT ažuriranja brojača.
+    cursor.execute("SELECT to_regclass('brojaci_zaduzenja') IS NULL")
+    nova_tabela = cursor.fetchone()[0]
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS brojaci_zaduzenja (
+        korisnik_id INTEGER PRIMARY KEY REFERENCES korisnici(id),
+        jmbg {JMBG_TIP} UNIQUE NOT NULL,
+        broj_aktivnih_bicikala INTEGER NOT NULL DEFAULT 0 CHECK (broj_aktivnih_bicikala >= 0)
+    ) WITH (fillfactor = 70)
+    """)
+    if nova_tabela:
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS korisnici (
-            id SERIAL PRIMARY KEY,
-            jmbg VARCHAR(13) UNIQUE NOT NULL,
-            ime VARCHAR(50) NOT NULL,
-            prezime VARCHAR(50) NOT NULL,
-            adresa TEXT NOT NULL,
-            broj_aktivnih_bicikala INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+        INSERT INTO brojaci_zaduzenja (korisnik_id, jmbg, broj_aktivnih_bicikala)
+        SELECT id, jmbg, COALESCE(broj_aktivnih_bicikala, 0) FROM korisnici
         """)
-        conn.commit()
-        cursor.close()
+    uskladi_tip_jmbg(cursor, 'brojaci_zaduzenja')
+    # Verzija po redu brojača (zbir je bio validator za ETag liste korisnika) zamenjena je oznakom izmena liste
+    cursor.execute("DROP TRIGGER IF EXISTS trg_verzija_brojaca_zaduzenja ON brojaci_zaduzenja")
+    cursor.execute("DROP FUNCTION IF EXISTS verzija_brojaca_zaduzenja()")
+    cursor.execute("ALTER TABLE brojaci_zaduzenja DROP COLUMN IF EXISTS verzija")
+    cursor.execute("DROP SEQUENCE IF EXISTS brojaci_zaduzenja_verzija_seq")
+
+    # Oznake izmena listi za ETag (zbir delova, bez prebrojavanja tabela): trigger na nivou naredbe uvećava jedan
+    # od redova liste, a izmena je vidljiva tek sa commit-om, pa zbir nikad ne prestiže sadržaj liste.
+    # Trigger nikad ne čeka na red koji drži druga transakcija (SKIP LOCKED): transakcija koja čeka na oznaku
+    # dok drži redove tabele mogla bi da uđe u zastoj sa transakcijom koja drži oznaku, a čeka te redove.
+    # Kada su svi delovi zauzeti, uvećava se red procesa baze (deo >= VERZIJE_DELOVA, pid je jedinstven).
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS verzije_tabela (
+        lista TEXT NOT NULL,
+        deo INTEGER NOT NULL,
+        verzija BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (lista, deo)
+    )
+    """)
+    cursor.execute("""
+    CREATE OR REPLACE FUNCTION povecaj_verziju_liste() RETURNS trigger AS $$
+    DECLARE
+        delova int := TG_ARGV[1]::int;
+    BEGIN
+        UPDATE verzije_tabela SET verzija = verzija + 1
+        WHERE lista = TG_ARGV[0] AND deo = (
+            SELECT deo FROM verzije_tabela
+            WHERE lista = TG_ARGV[0] AND deo < delova
+            ORDER BY (deo - pg_backend_pid() % delova + delova) % delova
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        );
+        IF NOT FOUND THEN
+            INSERT INTO verzije_tabela (lista, deo, verzija) VALUES (TG_ARGV[0], delova + pg_backend_pid(), 1)
+            ON CONFLICT (lista, deo) DO UPDATE SET verzija = verzije_tabela.verzija + 1;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    cursor.execute("""
+    INSERT INTO verzije_tabela (lista, deo)
+    SELECT 'korisnici', deo FROM generate_series(0, %s) AS deo
+    ON CONFLICT DO NOTHING
+    """, (VERZIJE_DELOVA - 1,))
+    cursor.execute(f"""
+    CREATE OR REPLACE TRIGGER trg_verzija_korisnici
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON korisnici
+    FOR EACH STATEMENT EXECUTE FUNCTION povecaj_verziju_liste('korisnici', '{VERZIJE_DELOVA}')
+    """)
+    cursor.execute(f"""
+    CREATE OR REPLACE TRIGGER trg_verzija_brojaci_zaduzenja
+    AFTER INSERT OR UPDATE OF broj_aktivnih_bicikala OR DELETE OR TRUNCATE ON brojaci_zaduzenja
+    FOR EACH STATEMENT EXECUTE FUNCTION povecaj_verziju_liste('korisnici', '{VERZIJE_DELOVA}')
+    """)
+    # Najkasniji rok do kog neki zakup korisnika (uz LEASE_GRACE) može da rezerviše deo limita
+    cursor.execute("ALTER TABLE brojaci_zaduzenja ADD COLUMN IF NOT EXISTS zakup_do TIMESTAMP")
+
+    # Indeks aktivnih zaduženja po korisniku (jmbg -> grad, bicikl, datum), hrane ga pozivi gradova
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS aktivna_zaduzenja (
+        jmbg {JMBG_TIP} NOT NULL,
+        grad VARCHAR(50) NOT NULL,
+        oznaka_bicikla VARCHAR(50) NOT NULL,
+        datum_zaduzivanja DATE,
+        PRIMARY KEY (grad, oznaka_bicikla)
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_aktivna_zaduzenja_jmbg ON aktivna_zaduzenja(jmbg)")
+    uskladi_tip_jmbg(cursor, 'aktivna_zaduzenja')
+
+    # Zakupi kvote po (korisnik, grad): grad do isteka sam odobrava do limit_zaduzenja aktivnih zaduženja korisnika
+    # kod sebe. opozvan = zakup je odbio zaduženje u drugom gradu, pa se pri obnovama svodi na postojeća zaduženja
+    # grada dok korisnik ne razduži sve bicikle.
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS zakupi (
+        jmbg {JMBG_TIP} NOT NULL,
+        grad VARCHAR(50) NOT NULL,
+        limit_zaduzenja INTEGER NOT NULL,
+        istice TIMESTAMP NOT NULL,
+        opozvan BOOLEAN NOT NULL DEFAULT false,
+        PRIMARY KEY (jmbg, grad)
+    )
+    """)
+    uskladi_tip_jmbg(cursor, 'zakupi')
+
+    # Dodele zakupa koje je obnova smanjila ili ukinula - stari limit ostaje rezervisan do isteka stare dodele
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS zakupi_smanjenja (
+        jmbg {JMBG_TIP} NOT NULL,
+        grad VARCHAR(50) NOT NULL,
+        limit_zaduzenja INTEGER NOT NULL,
+        istice TIMESTAMP NOT NULL
+    )
+    """)
+    uskladi_tip_jmbg(cursor, 'zakupi_smanjenja')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_zakupi_smanjenja_jmbg ON zakupi_smanjenja(jmbg, grad)")
+
+    # Već primenjeni događaji gradova - ponovo poslata serija se ne primenjuje dvaput
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS primljeni_dogadjaji (
+        grad VARCHAR(50) NOT NULL,
+        id BIGINT NOT NULL,
+        primljen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (grad, id)
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_primljeni_dogadjaji_primljen_at ON primljeni_dogadjaji(primljen_at)")
+
+    # Obaveštenja o promeni brojača (kanal brojaci_zaduzenja) - hrane tok promena /korisnici/promene.
+    # Brojači su od uvođenja brojaci_zaduzenja u toj tabeli, pa trigger stoji na njoj, a ne na korisnici.
+    cursor.execute("""
+    CREATE OR REPLACE FUNCTION obavesti_brojaci_zaduzenja() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' OR OLD.broj_aktivnih_bicikala IS DISTINCT FROM NEW.broj_aktivnih_bicikala THEN
+            PERFORM pg_notify('brojaci_zaduzenja', json_build_object(
+                'jmbg', lpad(NEW.jmbg::text, 13, '0'),
+                'broj_aktivnih_bicikala', NEW.broj_aktivnih_bicikala,
+                'user_id', k.id,
+                'ime', k.ime,
+                'prezime', k.prezime)::text)
+            FROM korisnici k
+            WHERE k.id = NEW.korisnik_id;
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    cursor.execute("""
+    CREATE OR REPLACE TRIGGER trg_brojaci_zaduzenja
+    AFTER INSERT OR UPDATE OF broj_aktivnih_bicikala ON brojaci_zaduzenja
+    FOR EACH ROW EXECUTE FUNCTION obavesti_brojaci_zaduzenja()
+    """)
+    conn.commit()
+    cursor.close()
+
+def redigovan_upit(query):
+    """
+    Tekst upita sa vrednostima već ugrađenim u SQL (execute_values) bez tih vrednosti: literali postaju ?,
+    a niz torki u VALUES jedna torka i ...
+    """
+    tekst = query.decode(errors='replace') if isinstance(query, bytes) else query
+    tekst = re.sub(r"'(?:[^']|'')*'", '?', tekst)
+    tekst = re.sub(r'\b\d+(?:\.\d+)?\b', '?', tekst)
+    return re.sub(r'(\([^()]*\))(?:\s*,\s*\([^()]*\))+', r'\1, ...', tekst)
+
+def redigovan_plan(plan):
+    """Plan bez vrednosti parametara - konstante u uslovima (npr. jmbg = '...'::text) postaju ?"""
+    return [re.sub(r"'(?:[^']|'')*'", '?', red) for red in plan]
+
+def redigovani_parametri(params):
+    """Tipovi parametara umesto vrednosti (JMBG i lični podaci ne ulaze u log sporih upita)"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {kljuc: type(vrednost).__name__ for kljuc, vrednost in params.items()}
+    return [type(vrednost).__name__ for vrednost in params]
+
+def tekst_naredbe(kljuc):
+    """Tekst naredbe za prikaz - za EXECUTE pripremljene naredbe njen SQL iz PREPARED_STATEMENTS"""
+    pripremljena = re.match(r'EXECUTE (\w+) \(', kljuc)
+    if pripremljena and pripremljena.group(1) in PREPARED_STATEMENTS:
+        kljuc = PREPARED_STATEMENTS[pripremljena.group(1)]
+    return ' '.join(kljuc.split())[:2000]
+
+# Naredbe koje EXPLAIN prihvata (DDL, SET, PREPARE... se samo mere)
+OBJASNJIVE_NAREDBE = re.compile(r'\s*(SELECT|INSERT|UPDATE|DELETE|WITH|VALUES|EXECUTE)\b', re.IGNORECASE)
+
+class SlowQueryLog:
+    """
+    Trajanje svih naredbi (po tekstu naredbe) i prsten najsporijih nedavnih upita.
+    Plan sporog upita uzima pozadinska nit preko posebne konekcije: EXPLAIN (ANALYZE, BUFFERS) u read-only transakciji
+    koja se poništava, a za naredbe koje se u njoj ne mogu izvršiti (upisi, FOR UPDATE) samo EXPLAIN bez izvršavanja.
+    """
+
+    def __init__(self):
+        self.naredbe = {}
+        self.spori = deque(maxlen=SLOW_QUERY_BUFFER)
+        self.red = queue.Queue(maxsize=16)
+        self.nepraceno = 0
+        self.started = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='slow-query-explain', daemon=True).start()
+
+    def zabelezi(self, query, params, trajanje):
+        ms = trajanje * 1000
+        kljuc = redigovan_upit(query) if isinstance(query, bytes) else query
+        with self.lock:
+            naredba = self.naredbe.get(kljuc)
+            if naredba is None:
+                if len(self.naredbe) < SLOW_QUERY_STATEMENTS:
+                    naredba = self.naredbe[kljuc] = {
+                        'pozivi': 0, 'ukupno_ms': 0.0, 'max_ms': 0.0, 'sporih': 0, 'plan_od': None, 'plan': None
+                    }
+                else:
+                    self.nepraceno += 1
+            if naredba is not None:
+                naredba['pozivi'] += 1
+                naredba['ukupno_ms'] += ms
+                naredba['max_ms'] = max(naredba['max_ms'], ms)
+            if ms < SLOW_QUERY_MS:
+                return
+            self.spori.append({
+                'kljuc': kljuc,
+                'parametri': redigovani_parametri(params),
+                'trajanje_ms': round(ms, 2),
+                'vreme': datetime.now().isoformat(timespec='seconds'),
+                'ruta': request.endpoint if has_request_context() else None
+            })
+            if naredba is None:
+                return
+            naredba['sporih'] += 1
+            now = time.monotonic()
+            if SLOW_QUERY_EXPLAIN_MS < 0 or ms < SLOW_QUERY_EXPLAIN_MS or not OBJASNJIVE_NAREDBE.match(kljuc) or (
+                    naredba['plan_od'] is not None and now - naredba['plan_od'] < SLOW_QUERY_EXPLAIN_INTERVAL):
+                return
+            naredba['plan_od'] = now
+        try:
+            self.red.put_nowait((kljuc, query, params, ms))
+        except queue.Full:
+            pass
+
+    def objasni(self, conn, query, params):
+        """Plan upita i da li je dobijen sa ANALYZE"""
+        pripremljena = isinstance(query, str) and re.match(r'EXECUTE (\w+) \(', query)
+        if pripremljena and pripremljena.group(1) in PREPARED_STATEMENTS:
+            # Pripremljena naredba postoji samo na konekciji koja ju je izvršila, pa se objašnjava njen SQL
+            query = PREPARED_STATEMENTS[pripremljena.group(1)]
+        cursor = conn.cursor()
+        try:
+            for opcije in ('(ANALYZE, BUFFERS) ', ''):
+                try:
+                    cursor.execute("SET TRANSACTION READ ONLY")
+                    cursor.execute("SET LOCAL statement_timeout = %s", (int(SLOW_QUERY_EXPLAIN_TIMEOUT * 1000),))
+                    prefiks = f"EXPLAIN {opcije}"
+                    cursor.execute(prefiks.encode() + query if isinstance(query, bytes) else prefiks + query, params)
+                    return redigovan_plan([red[0] for red in cursor.fetchall()]), bool(opcije)
+                except psycopg2.Error as e:
+                    # 25006 - naredba nije dozvoljena u read-only transakciji, pa se uzima plan bez izvršavanja
+                    if not opcije or e.pgcode != '25006':
+                        raise
+                finally:
+                    conn.rollback()
+        finally:
+            cursor.close()
+
+    def run(self):
+        conn = None
+        while True:
+            kljuc, query, params, ms = self.red.get()
+            plan, analyze, greska = None, False, None
+            try:
+                if conn is None or conn.closed:
+                    conn = psycopg2.connect(**DB_CONFIG)
+                plan, analyze = self.objasni(conn, query, params)
+            except Exception as e:
+                greska = str(e).strip()
+                logging.warning(f"EXPLAIN sporog upita nije uspeo: {greska}")
+            with self.lock:
+                naredba = self.naredbe.get(kljuc)
+                if naredba is not None:
+                    naredba['plan'] = {
+                        'vreme': datetime.now().isoformat(timespec='seconds'),
+                        'trajanje_ms': round(ms, 2),
+                        'analyze': analyze,
+                        'seq_scan': sorted(set(re.findall(r'Seq Scan on (\w+)', '\n'.join(plan or [])))),
+                        'plan': plan,
+                        'greska': greska
+                    }
+
+    def izvestaj(self, top):
+        with self.lock:
+            spori = sorted(self.spori, key=lambda upit: upit['trajanje_ms'], reverse=True)[:top]
+            naredbe = sorted(self.naredbe.items(), key=lambda stavka: stavka[1]['ukupno_ms'], reverse=True)[:top]
+            naredbe = [(kljuc, dict(naredba)) for kljuc, naredba in naredbe]
+            nepraceno = self.nepraceno
+        return {
+            "prag_ms": SLOW_QUERY_MS,
+            "prag_explain_ms": SLOW_QUERY_EXPLAIN_MS,
+            "nepraceno": nepraceno,
+            "spori": [
+                {k: v for k, v in dict(upit, upit=tekst_naredbe(upit['kljuc'])).items() if k != 'kljuc'}
+                for upit in spori
+            ],
+            "naredbe": [{
+                "upit": tekst_naredbe(kljuc),
+                "pozivi": naredba['pozivi'],
+                "ukupno_ms": round(naredba['ukupno_ms'], 2),
+                "prosek_ms": round(naredba['ukupno_ms'] / naredba['pozivi'], 3) if naredba['pozivi'] else 0.0,
+                "max_ms": round(naredba['max_ms'], 2),
+                "sporih": naredba['sporih'],
+                "plan": naredba['plan']
+            } for kljuc, naredba in naredbe]
+        }
+
+    def reset(self):
+        with self.lock:
+            self.naredbe.clear()
+            self.spori.clear()
+            self.nepraceno = 0
 
+slow_queries = SlowQueryLog()
+
+class TimedCursorMixin:
+    """Merenje trajanja execute() za SlowQueryLog"""
+
+    def execute(self, query, vars=None):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            slow_queries.zabelezi(query, vars, time.perf_counter() - t0)
+
+class TimedCursor(TimedCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+class TimedRealDictCursor(TimedCursorMixin, RealDictCursor):
+    pass
+
+TIMED_CURSORS = {None: TimedCursor, RealDictCursor: TimedRealDictCursor}
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """Konekcija koja pamti naredbe koje su na njoj već pripremljene (PREPARE)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        # statement_timeout sesije u ms (0 = bez ograničenja), postavljen iz roka zahteva
+        self.statement_timeout = 0
+
+    def cursor(self, *args, **kwargs):
+        """Kursor sa merenjem trajanja upita (SLOW_QUERY_LOG)"""
+        if SLOW_QUERY_LOG:
+            factory = kwargs.get('cursor_factory')
+            kwargs['cursor_factory'] = TIMED_CURSORS.get(factory, factory)
+        return super().cursor(*args, **kwargs)
+
+class DbPool:
+    """Pool konekcija sa lenjom inicijalizacijom; kada je iscrpljen, čeka se na slobodnu konekciju"""
+
+    def __init__(self, dsn=None, config=None, on_init=None):
+        self.dsn = dsn
+        self.config = config or {}
+        self.on_init = on_init
+        self.pool = None
+        self.lock = threading.Lock()
+        # ThreadedConnectionPool baca izuzetak kada je iscrpljen, pa se na slobodnu konekciju čeka ovde
+        self.slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+    def get_pool(self):
+        if self.pool is None:
+            with self.lock:
+                if self.pool is None:
+                    new_pool = pg_pool.ThreadedConnectionPool(
+                        DB_POOL_MIN, DB_POOL_MAX, self.dsn, connection_factory=PreparedConnection, **self.config
+                    )
+                    if self.on_init:
+                        conn = new_pool.getconn()
+                        try:
+                            self.on_init(conn)
+                        finally:
+                            new_pool.putconn(conn)
+                    self.pool = new_pool
+        return self.pool
+
+    def getconn(self, timeout=None):
+        if not self.slots.acquire(timeout=DB_POOL_TIMEOUT if timeout is None else timeout):
+            raise pg_pool.PoolError("nema slobodne konekcije u pool-u")
+        try:
+            conn = self.get_pool().getconn()
+        except Exception:
+            self.slots.release()
+            raise
+        conn.source_pool = self
         return conn
-    except Exception as e:
-        print(f"Greška pri konekciji sa bazom: {e}")
+
+    def putconn(self, conn):
+        close = False
+        if conn.statement_timeout and not conn.closed:
+            # Rok zahteva ne sme da ostane na konekciji koju posle preuzima pozadinska nit ili ruta bez roka
+            try:
+                conn.rollback()
+                postavi_statement_timeout(conn, 0)
+            except psycopg2.Error:
+                close = True
+        self.pool.putconn(conn, close=close)
+        self.slots.release()
+
+# Primarna baza (šema se kreira pri prvom preuzimanju konekcije) i opciona replika za read-only rute
+db_pool = DbPool(config=DB_CONFIG, on_init=init_db_schema)
+read_pool = DbPool(dsn=DB_READ_DSN) if DB_READ_DSN else None
+
+# Keširano stanje replike: kašnjenje se meri najviše jednom u REPLICA_LAG_CHECK_INTERVAL sekundi,
+# a nedostupna replika se preskače REPLICA_RETRY_INTERVAL sekundi
+replica_state = {'lag': None, 'checked_at': 0.0, 'down_until': 0.0}
+replica_lock = threading.Lock()
+
+def replica_lag():
+    """Kašnjenje replike u sekundama (None ako replika nije dostupna)"""
+    now = time.monotonic()
+    if now < replica_state['down_until']:
+        return None
+    if now - replica_state['checked_at'] < REPLICA_LAG_CHECK_INTERVAL:
+        return replica_state['lag']
+    with replica_lock:
+        if now - replica_state['checked_at'] < REPLICA_LAG_CHECK_INTERVAL:
+            return replica_state['lag']
+        try:
+            conn = read_pool.getconn()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT CASE
+                        WHEN NOT pg_is_in_recovery() THEN 0
+                        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                    END
+                """)
+                lag = cursor.fetchone()[0]
+                conn.rollback()
+                cursor.close()
+            finally:
+                read_pool.putconn(conn)
+            replica_state['lag'] = float(lag) if lag is not None else None
+        except Exception as e:
+            logging.warning(f"Replika nije dostupna, čitanje ide na primarnu bazu: {e}")
+            replica_state['lag'] = None
+            replica_state['down_until'] = now + REPLICA_RETRY_INTERVAL
+        replica_state['checked_at'] = now
+    return replica_state['lag']
+
+# Zahtevi odbijeni jer im je rok istekao pre prijema i zahtevi čiji je rok istekao tokom obrade
+rokovi = {'istekli_pri_prijemu': 0, 'prekoraceni': 0}
+
+def preostalo_vreme():
+    """Preostalo vreme (sekundi) do roka tekućeg zahteva; None van zahteva i za rute bez roka"""
+    if not has_request_context() or 'rok' not in g:
+        return None
+    return g.rok - time.monotonic()
+
+def postavi_statement_timeout(conn, sekundi):
+    """
+    statement_timeout sesije (0 = bez ograničenja). SET se izvršava van transakcije, pa važi i posle commit-a
+    ili rollback-a handlera; konekcija pamti postavljenu vrednost.
+    """
+    ms = max(1, int(sekundi * 1000)) if sekundi > 0 else 0
+    if ms == conn.statement_timeout:
+        return
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SET statement_timeout = %s", (ms,))
+        cursor.close()
+    finally:
+        conn.autocommit = False
+    conn.statement_timeout = ms
+
+def get_db_connection(max_lag=None):
+    """
+    Preuzimanje konekcije iz pool-a.
+    Sa max_lag (sekundi) read-only handler dobija konekciju ka replici ako ona kasni najviše max_lag,
+    a u suprotnom (ili ako replika nije dostupna) konekciju ka primarnoj bazi.
+    U zahtevu sa rokom se na konekciju čeka najviše do roka, a statement_timeout je preostalo vreme.
+    """
+    preostalo = preostalo_vreme()
+    if preostalo is not None and preostalo <= 0:
+        print("Rok zahteva je istekao pre preuzimanja konekcije sa bazom")
+        return None
+    cekanje = None if preostalo is None else min(DB_POOL_TIMEOUT, preostalo)
+    conn = None
+    if max_lag is not None and max_lag >= 0 and read_pool is not None:
+        lag = replica_lag()
+        if lag is not None and lag <= max_lag:
+            try:
+                conn = read_pool.getconn(cekanje)
+            except Exception as e:
+                logging.warning(f"Replika nije dostupna, čitanje ide na primarnu bazu: {e}")
+                replica_state['down_until'] = time.monotonic() + REPLICA_RETRY_INTERVAL
+    if conn is None:
+        try:
+            conn = db_pool.getconn(cekanje)
+        except Exception as e:
+            print(f"Greška pri konekciji sa bazom: {e}")
+            return None
+    if preostalo is not None:
+        try:
+            preostalo = preostalo_vreme()
+            if preostalo <= 0:
+                raise TimeoutError("rok zahteva je istekao dok se čekalo na konekciju")
+            postavi_statement_timeout(conn, preostalo)
+        except (TimeoutError, psycopg2.Error) as e:
+            print(f"Greška pri konekciji sa bazom: {e}")
+            conn.source_pool.putconn(conn)
+            return None
+    if has_request_context():
+        g.setdefault('db_connections', []).append(conn)
+    return conn
+
+def release_db_connection(conn):
+    """Vraćanje konekcije u pool iz kog je preuzeta (nezavršena transakcija se poništava)"""
+    if has_request_context() and conn in g.get('db_connections', []):
+        g.db_connections.remove(conn)
+    conn.source_pool.putconn(conn)
+
+@app.teardown_request
+def release_request_connections(exc):
+    """Vraća u pool konekcije koje handler nije vratio (npr. zbog izuzetka)"""
+    for conn in g.pop('db_connections', []):
+        conn.source_pool.putconn(conn)
+
+def pripremi_naredbu(cursor, name):
+    """PREPARE naredbe iz PREPARED_STATEMENTS na konekciji kursora, ako na njoj već nije pripremljena"""
+    conn = cursor.connection
+    if name not in conn.prepared:
+        counter = iter(range(1, PREPARED_STATEMENTS[name].count('%s') + 1))
+        query = re.sub(r'%s', lambda _: f"${next(counter)}", PREPARED_STATEMENTS[name])
+        cursor.execute(f"PREPARE {name} AS {query}")
+        conn.prepared.add(name)
+
+def execute_prepared(cursor, name, params):
+    """Izvršava naredbu iz PREPARED_STATEMENTS - PREPARE jednom po konekciji, zatim samo EXECUTE"""
+    pripremi_naredbu(cursor, name)
+    cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+def fetch_one(cursor, query, params, row_type=None):
+    """Izvršava upit i vraća jedan red kao tuple (ili namedtuple zadatog tipa)"""
+    cursor.execute(query, params)
+    row = cursor.fetchone()
+    if row is None or row_type is None:
+        return row
+    return row_type._make(row)
+
+def fetch_prepared(cursor, name, params, row_type=None):
+    """Kao fetch_one, ali za pripremljenu naredbu"""
+    execute_prepared(cursor, name, params)
+    row = cursor.fetchone()
+    if row is None or row_type is None:
+        return row
+    return row_type._make(row)
+
+class ChangeFeed:
+    """
+    Tok promena brojača zaduženja za pretplatnike (gradske biciklane).
+    Jedna nit sluša LISTEN brojaci_zaduzenja i prosleđuje obaveštenja u red svakog pretplatnika;
+    kada veza sa bazom pukne, svi tokovi se zatvaraju jer bi propuštene promene ostavile keševe zastarelim.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.connected = False
+        self.started = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='change-feed', daemon=True).start()
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=CHANGE_FEED_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, item):
+        """Prosleđuje (događaj, podaci) svim pretplatnicima; None zatvara tokove"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(item)
+            except queue.Full:
+                # Spor pretplatnik - red se prazni i tok zatvara, pa se pretplatnik ponovo povezuje i briše keš
+                self.unsubscribe(subscriber)
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(None)
+
+    def run(self):
+        while True:
+            conn = None
+            try:
+                db_pool.get_pool()  # šema i trigger moraju postojati pre LISTEN-a
+                conn = psycopg2.connect(**DB_CONFIG)
+                conn.autocommit = True
+                cursor = conn.cursor()
+                cursor.execute("LISTEN brojaci_zaduzenja")
+                self.connected = True
+                logging.info("Tok promena brojača zaduženja je aktivan")
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        # Provera da je veza živa
+                        cursor.execute("SELECT 1")
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.publish(('brojac', conn.notifies.pop(0).payload))
+            except Exception as e:
+                logging.warning(f"Tok promena brojača zaduženja nije dostupan: {e}")
+            finally:
+                self.connected = False
+                self.publish(None)
+                if conn is not None:
+                    conn.close()
+            time.sleep(CHANGE_FEED_RETRY_INTERVAL)
+
+change_feed = ChangeFeed()
+
+class AdmissionController:
+    """
+    Kontrola prijema zahteva na centrali.
+    Svaka klasa ruta ima svoj limit zahteva u obradi, uz zajednički limit ADMISSION_LIMIT; višak čeka u redu klase,
+    a oslobođeno mesto dobija najstariji zahtev iz klase najvećeg prioriteta koja ima slobodan limit.
+    Red se prazni po CoDel principu: dok red klase nije bio prazan duže od ADMISSION_INTERVAL, klasa je preopterećena
+    i zahtevi koji su čekali duže od ADMISSION_TARGET se odbijaju (umesto da čekaju do isteka vremena kod klijenta).
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.u_obradi = 0
+        self.klase = {
+            klasa: {
+                'limit': ADMISSION_LIMITS.get(klasa, ADMISSION_LIMIT),
+                'u_obradi': 0,
+                'red': deque(),
+                'prazan': time.monotonic(),
+                'primljeno': 0,
+                'odbijeno': {'red_pun': 0, 'codel': 0, 'istek': 0, 'rok': 0},
+                'cekanje': deque(maxlen=1024),
+            }
+            for klasa in sorted(ADMISSION_PRIORITETI, key=ADMISSION_PRIORITETI.get)
+        }
+
+    def slobodno(self, stanje):
+        return self.u_obradi < ADMISSION_LIMIT and stanje['u_obradi'] < stanje['limit']
+
+    def preopterecena(self, stanje, now):
+        return bool(stanje['red']) and now - stanje['prazan'] > ADMISSION_INTERVAL
+
+    def primi(self, stanje, cekanje):
+        self.u_obradi += 1
+        stanje['u_obradi'] += 1
+        stanje['primljeno'] += 1
+        stanje['cekanje'].append(cekanje)
+
+    def rasporedi(self):
+        """Dodela slobodnih mesta zahtevima iz redova, po prioritetu klase (poziva se pod self.cond)"""
+        now = time.monotonic()
+        for stanje in self.klase.values():
+            while stanje['red'] and self.slobodno(stanje):
+                preopterecena = self.preopterecena(stanje, now)
+                zahtev = stanje['red'].popleft()
+                if not stanje['red']:
+                    stanje['prazan'] = now
+                cekanje = now - zahtev['od']
+                if cekanje > (ADMISSION_TARGET if preopterecena else ADMISSION_MAX_WAIT):
+                    zahtev['odluka'] = 'codel' if preopterecena else 'istek'
+                    stanje['odbijeno'][zahtev['odluka']] += 1
+                else:
+                    zahtev['odluka'] = 'primljen'
+                    self.primi(stanje, cekanje)
+        self.cond.notify_all()
+
+    def acquire(self, klasa, rok=None):
+        """Čeka na mesto za obradu, najviše do roka zahteva; vraća None kada je zahtev primljen, a inače razlog odbijanja"""
+        stanje = self.klase[klasa]
+        with self.cond:
+            if not stanje['red'] and self.slobodno(stanje):
+                self.primi(stanje, 0.0)
+                return None
+            if len(stanje['red']) >= ADMISSION_QUEUE_SIZE:
+                stanje['odbijeno']['red_pun'] += 1
+                return 'red_pun'
+            if not stanje['red']:
+                stanje['prazan'] = time.monotonic()
+            zahtev = {'od': time.monotonic(), 'odluka': None}
+            stanje['red'].append(zahtev)
+            while zahtev['odluka'] is None:
+                now = time.monotonic()
+                preopterecena = self.preopterecena(stanje, now)
+                preostalo = zahtev['od'] + (ADMISSION_TARGET if preopterecena else ADMISSION_MAX_WAIT) - now
+                do_roka = rok - now if rok is not None else preostalo
+                if preostalo <= 0 or do_roka <= 0:
+                    stanje['red'].remove(zahtev)
+                    if not stanje['red']:
+                        stanje['prazan'] = now
+                    if preostalo <= 0:
+                        zahtev['odluka'] = 'codel' if preopterecena else 'istek'
+                    else:
+                        zahtev['odluka'] = 'rok'
+                    stanje['odbijeno'][zahtev['odluka']] += 1
+                    break
+                # Stanje preopterećenja se menja i dok zahtev čeka, pa se rok ponovo računa najkasnije posle ADMISSION_TARGET
+                self.cond.wait(min(preostalo, do_roka, ADMISSION_TARGET))
+            return None if zahtev['odluka'] == 'primljen' else zahtev['odluka']
+
+    def release(self, klasa):
+        with self.cond:
+            self.u_obradi -= 1
+            self.klase[klasa]['u_obradi'] -= 1
+            self.rasporedi()
+
+    def metrike(self):
+        with self.cond:
+            now = time.monotonic()
+            klase = {}
+            for klasa, stanje in self.klase.items():
+                cekanje = sorted(stanje['cekanje'])
+                klase[klasa] = {
+                    'prioritet': ADMISSION_PRIORITETI[klasa],
+                    'limit': stanje['limit'],
+                    'u_obradi': stanje['u_obradi'],
+                    'u_redu': len(stanje['red']),
+                    'preopterecena': self.preopterecena(stanje, now),
+                    'primljeno': stanje['primljeno'],
+                    'odbijeno': dict(stanje['odbijeno'], ukupno=sum(stanje['odbijeno'].values())),
+                    # Vreme čekanja u redu (ms) za poslednjih do 1024 primljenih zahteva
+                    'cekanje_ms': {
+                        naziv: round(cekanje[min(len(cekanje) - 1, int(len(cekanje) * p))] * 1000, 2) if cekanje else 0.0
+                        for naziv, p in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))
+                    },
+                }
+            return {'limit': ADMISSION_LIMIT, 'u_obradi': self.u_obradi, 'klase': klase}
+
+admission = AdmissionController()
+
+def povezi_gradove():
+    """Otvara trajne konekcije ka gradovima (paralelno); vraća stanje po gradu ('ok' ili opis greške)"""
+    def povezi(url):
+        try:
+            gradovi_http.get(f"{url}/live", timeout=READY_CHECK_TIMEOUT).raise_for_status()
+            return 'ok'
+        except requests.exceptions.RequestException as e:
+            return f"greška: {e}"
+    with ThreadPoolExecutor(max_workers=max(len(CITY_URLS), 1)) as executor:
+        return dict(zip(CITY_URLS, executor.map(povezi, CITY_URLS.values())))
+
+def trajanje_procesa():
+    """Sekundi od pokretanja procesa (iz /proc, samo Linux; inače None)"""
+    try:
+        with open('/proc/self/stat') as f:
+            pocetak = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - pocetak / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def otvori_baze():
+    """Pool primarne baze (sa kreiranjem šeme) i replike otvaraju DB_POOL_MIN konekcija"""
+    db_pool.get_pool()
+    if read_pool is not None:
+        read_pool.get_pool()
+
+def pripremi_pool():
+    """Na DB_POOL_MIN konekcija primarne baze (ostaju otvorene u pool-u) priprema sve naredbe; vraća njihov broj"""
+    konekcije = []
+    try:
+        for _ in range(DB_POOL_MIN):
+            konekcije.append(db_pool.getconn())
+        for conn in konekcije:
+            cursor = conn.cursor()
+            for name in PREPARED_STATEMENTS:
+                pripremi_naredbu(cursor, name)
+            conn.commit()
+            cursor.close()
+    finally:
+        for conn in konekcije:
+            db_pool.putconn(conn)
+    return len(konekcije)
+
+def sacekaj_keseve(kesevi):
+    """Čeka da keševi (naziv -> funkcija spremnosti) budu učitani, najviše WARMUP_CACHE_TIMEOUT sekundi"""
+    rok = time.monotonic() + WARMUP_CACHE_TIMEOUT
+    while not all(spreman() for spreman in kesevi.values()) and time.monotonic() < rok:
+        time.sleep(0.05)
+    return {naziv: 'ok' if spreman() else 'nije učitan' for naziv, spreman in kesevi.items()}
+
+class StartupWarmup:
+    """
+    Zagrevanje pre spremnosti: faze se izvršavaju redom i mere, a neuspela faza (npr. baza nije dostupna) ponavlja se
+    posle WARMUP_RETRY_INTERVAL sekundi. Nedostupni povezani servisi i neučitani keševi ne blokiraju spremnost -
+    njihovo stanje se samo beleži u izveštaju.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.zavrseno = False
+        self.lock = threading.Lock()
+        self.faze = {}
+        self.stanje = {}
+        self.greska = None
+        self.ukupno = None
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.run, name='warmup', daemon=True).start()
+
+    def faza(self, naziv, funkcija):
+        t0 = time.perf_counter()
+        rezultat = funkcija()
+        self.faze[naziv] = round((time.perf_counter() - t0) * 1000, 1)
+        return rezultat
+
+    def izvestaj(self):
+        return {
+            "zavrseno": self.zavrseno,
+            "faze_ms": self.faze,
+            "ukupno_ms": self.ukupno,
+            "stanje": self.stanje,
+            "greska": self.greska
+        }
+
+    def run(self):
+        if TRAJANJE_UVOZA is not None:
+            self.faze['uvoz'] = round(TRAJANJE_UVOZA * 1000, 1)
+        while True:
+            try:
+                self.faza('baza_i_sema', otvori_baze)
+                self.stanje['konekcije'] = self.faza('pripremljene_naredbe', pripremi_pool)
+                self.stanje['gradovi'] = self.faza('gradovi', povezi_gradove)
+                start_background_workers()
+                if WARMUP_PRELOAD_CACHES:
+                    kesevi = {'tok_promena': lambda: change_feed.connected}
+                    self.stanje['kesevi'] = self.faza('kesevi', lambda: sacekaj_keseve(kesevi))
+                break
+            except Exception as e:
+                self.greska = str(e)
+                logging.warning(f"Zagrevanje nije uspelo, ponavlja se: {e}")
+                time.sleep(WARMUP_RETRY_INTERVAL)
+        self.greska = None
+        trajanje = trajanje_procesa()
+        self.ukupno = round(trajanje * 1000, 1) if trajanje is not None else round(sum(self.faze.values()), 1)
+        self.zavrseno = True
+        logging.info(f"Zagrevanje završeno, pokretanje je trajalo {self.ukupno} ms (faze: {self.faze})")
+
+warmup = StartupWarmup()
+
+@app.before_request
+def start_background_workers():
+    """Pokretanje pozadinskih niti (i zagrevanja) pri prvom zahtevu"""
+    if WARMUP and not warmup.started:
+        warmup.start()
+    if not change_feed.started:
+        change_feed.start()
+    if SLOW_QUERY_LOG and SLOW_QUERY_EXPLAIN_MS >= 0 and not slow_queries.started:
+        slow_queries.start()
+
+@app.before_request
+def postavi_rok():
+    """Rok zahteva - REQUEST_DEADLINE ili kraće preostalo vreme pozivaoca iz X-Request-Deadline; istekao rok = 504"""
+    if REQUEST_DEADLINE <= 0 or request.endpoint in DEADLINE_EXEMPT:
+        return None
+    budzet = REQUEST_DEADLINE
+    try:
+        budzet = min(budzet, float(request.headers.get(DEADLINE_HEADER, 'inf')) / 1000)
+    except ValueError:
+        pass
+    g.rok = time.monotonic() + budzet
+    if budzet > 0:
+        return None
+    rokovi['istekli_pri_prijemu'] += 1
+    return jsonify({
+        "success": False,
+        "message": "Rok zahteva je istekao"
+    }), 504
+
+@app.after_request
+def prekoracen_rok(response):
+    """Greška zahteva kome je rok istekao tokom obrade (statement_timeout, istek poziva drugog servisa) postaje 504"""
+    preostalo = preostalo_vreme()
+    if response.status_code < 500 or response.status_code == 504 or preostalo is None or preostalo > 0:
+        return response
+    rokovi['prekoraceni'] += 1
+    response.set_data(app.json.dumps({"success": False, "message": "Rok zahteva je istekao"}))
+    response.mimetype = 'application/json'
+    response.status_code = 504
+    return response
+
+@app.before_request
+def admit_request():
+    """Kontrola prijema - zahtev čeka na mesto za obradu ili se odmah odbija sa 503 i Retry-After"""
+    klasa = ADMISSION_KLASE.get(request.endpoint)
+    if not ADMISSION_CONTROL or klasa is None:
+        return None
+    razlog = admission.acquire(klasa, g.get('rok'))
+    if razlog is None:
+        g.admission_klasa = klasa
+        return None
+    if razlog == 'rok':
+        return jsonify({
+            "success": False,
+            "message": "Rok zahteva je istekao pre početka obrade"
+        }), 504
+    response = jsonify({
+        "success": False,
+        "message": "Centralna biciklana je preopterećena, pokušajte ponovo kasnije"
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(ADMISSION_RETRY_AFTER)
+    return response
+
+@app.teardown_request
+def release_admission(exc):
+    """Oslobađanje mesta za obradu i prijem sledećeg zahteva iz reda"""
+    klasa = g.pop('admission_klasa', None)
+    if klasa is not None:
+        admission.release(klasa)
+
+def izracunaj_etag(*validator):
+    """Slab ETag iz validatora sadržaja (broj redova, poslednja izmena...) i JSON enkodera, od kog zavisi format datuma"""
+    return hashlib.sha1(repr((validator, JSON_ENCODER)).encode()).hexdigest()[:24]
+
+def nije_izmenjeno(etag):
+    """304 odgovor ako klijent već ima verziju sa ovim ETag-om (If-None-Match), inače None"""
+    if not request.if_none_match.contains_weak(etag):
         return None
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def sa_etag(response, etag):
+    """Dodaje ETag odgovoru; no-cache znači da klijent sme da čuva odgovor, ali ga uvek proverava sa If-None-Match"""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def izaberi_kodiranje():
+    """Kodiranje za odgovor prema Accept-Encoding zaglavlju ('br', 'gzip' ili None)"""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def kompresor(kodiranje):
+    """Vraća (compress, flush, finish) za strimovanu kompresiju u zadatom kodiranju"""
+    if kodiranje == 'br':
+        c = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+        return c.process, c.flush, c.finish
+    c = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+def kompresuj_tok(delovi, kodiranje):
+    """Kompresija strimovanog odgovora - svaki deo se odmah šalje (sync flush), pa tok ne čeka na kraj"""
+    compress, flush, finish = kompresor(kodiranje)
+    for deo in delovi:
+        if deo:
+            yield compress(deo) + flush()
+    yield finish()
+
+@app.after_request
+def compress_response(response):
+    """Kompresija JSON odgovora većih od COMPRESS_MIN_SIZE (i svih strimovanih), prema Accept-Encoding"""
+    if (COMPRESS_MIN_SIZE <= 0 or response.status_code != 200 or response.mimetype != 'application/json'
+            or response.direct_passthrough or 'Content-Encoding' in response.headers):
+        return response
+    if not response.is_streamed and response.content_length is not None and response.content_length < COMPRESS_MIN_SIZE:
+        return response
+    response.vary.add('Accept-Encoding')
+    kodiranje = izaberi_kodiranje()
+    if kodiranje is None:
+        return response
+    if response.is_streamed:
+        response.response = kompresuj_tok(response.iter_encoded(), kodiranje)
+        response.headers.pop('Content-Length', None)
+    else:
+        compress, _, finish = kompresor(kodiranje)
+        response.set_data(compress(response.get_data()) + finish())
+    response.headers['Content-Encoding'] = kodiranje
+    return response
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({"status": "OK", "service": "Central Bike Shop"}), 200
 
+ready_state = {'checked_at': None, 'ready': False, 'checks': {}}
+ready_lock = threading.Lock()
+
+def check_database():
+    """Provera da li pool može da izda konekciju i da baza odgovara"""
+    try:
+        conn = db_pool.getconn(timeout=READY_CHECK_TIMEOUT)
+    except Exception as e:
+        return f"greška: {e}"
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+        conn.rollback()
+        return "ok"
+    except Exception as e:
+        return f"greška: {e}"
+    finally:
+        db_pool.putconn(conn)
+
+def check_readiness():
+    """Vraća (ready, checks); provere se izvršavaju najviše jednom u READY_CACHE_TTL sekundi"""
+    if WARMUP and not warmup.zavrseno:
+        return False, {'zagrevanje': f"greška: {warmup.greska}" if warmup.greska else 'u toku'}
+    now = time.monotonic()
+    with ready_lock:
+        if ready_state['checked_at'] is None or now - ready_state['checked_at'] >= READY_CACHE_TTL:
+            checks = {'baza': check_database()}
+            ready_state['checks'] = checks
+            ready_state['ready'] = checks['baza'] == 'ok'
+            ready_state['checked_at'] = now
+        return ready_state['ready'], ready_state['checks']
+
+@app.route('/metrike', methods=['GET'])
+def get_metrike():
+    """
+    Metrike kontrole prijema (zahtevi u obradi i u redu, odbijeni zahtevi i vreme čekanja po klasi ruta)
+    i zahtevi kojima je istekao rok
+    """
+    return jsonify({"success": True, "admission": admission.metrike(), "rokovi": rokovi}), 200
+
+@app.route('/live', methods=['GET'])
+def liveness_check():
+    """Liveness proba - proces radi i obrađuje zahteve"""
+    return jsonify({"status": "OK", "service": "Central Bike Shop"}), 200
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness proba - zagrevanje je završeno i zavisnosti su dostupne (rezultat provere je keširan)"""
+    ready, checks = check_readiness()
+    return jsonify({
+        "status": "OK" if ready else "NOT READY",
+        "service": "Central Bike Shop",
+        "checks": checks,
+        "pokretanje": warmup.izvestaj()
+    }), 200 if ready else 503
+
 @app.route('/korisnici/registracija', methods=['POST'])
 def registruj_korisnika():
     """
@@ -70,11 +1474,12 @@ def registruj_korisnika():
                     "message": f"Nedostaje obavezan podatak: {field}"
                 }), 400
         
-        # Validacija JMBG (mora biti 13 karaktera)
-        if len(data['jmbg']) != 13 or not data['jmbg'].isdigit():
+        # Validacija JMBG (13 cifara i kontrolna cifra)
+        greska = proveri_jmbg(data['jmbg'], JMBG_KONTROLNA_CIFRA)
+        if greska:
             return jsonify({
                 "success": False,
-                "message": "JMBG mora imati tačno 13 cifara"
+                "message": greska
             }), 400
             
         conn = get_db_connection()
@@ -84,15 +1489,14 @@ def registruj_korisnika():
                 "message": "Greška pri konekciji sa bazom podataka"
             }), 500
             
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor()
         
         # Provera da li korisnik već postoji
-        cursor.execute("SELECT id FROM korisnici WHERE jmbg = %s", (data['jmbg'],))
-        existing_user = cursor.fetchone()
+        existing_user = fetch_prepared(cursor, 'korisnik_id', (data['jmbg'],))
         
         if existing_user:
             cursor.close()
-            conn.close()
+            release_db_connection(conn)
             return jsonify({
                 "success": False,
                 "message": "Korisnik sa datim JMBG već postoji"
@@ -105,10 +1509,14 @@ def registruj_korisnika():
             RETURNING id
         """, (data['jmbg'], data['ime'], data['prezime'], data['adresa']))
         
-        user_id = cursor.fetchone()['id']
+        user_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO brojaci_zaduzenja (korisnik_id, jmbg, broj_aktivnih_bicikala)
+            VALUES (%s, %s, 0)
+        """, (user_id, data['jmbg']))
         conn.commit()
         cursor.close()
-        conn.close()
+        release_db_connection(conn)
         
         return jsonify({
             "success": True,
@@ -139,46 +1547,47 @@ def proveri_zaduzenje():
                 "success": False,
                 "message": "JMBG je obavezan parametar"
             }), 400
+        
+        greska = proveri_jmbg(data['jmbg'])
+        if greska:
+            return jsonify({
+                "success": False,
+                "message": greska
+            }), 400
             
-        conn = get_db_connection()
+        conn = get_db_connection(max_lag=READ_MAX_LAG['proveri-zaduzenje'])
         if not conn:
             return jsonify({
                 "success": False,
                 "message": "Greška pri konekciji sa bazom podataka"
             }), 500
             
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor()
         
         # Pronalaženje korisnika i brojanje aktivnih bicikala
-        cursor.execute("""
-            SELECT id, ime, prezime, broj_aktivnih_bicikala 
-            FROM korisnici 
-            WHERE jmbg = %s
-        """, (data['jmbg'],))
-        
-        user = cursor.fetchone()
+        user = fetch_prepared(cursor, 'stanje_korisnika', (data['jmbg'],), KorisnikStanje)
         
         if not user:
             cursor.close()
-            conn.close()
+            release_db_connection(conn)
             return jsonify({
                 "success": False,
                 "message": "Korisnik nije registrovan"
             }), 404
         
         # Provera da li može da zaduži (maksimalno 2 bicikla)
-        can_rent = user['broj_aktivnih_bicikala'] < 2
+        can_rent = user.broj_aktivnih_bicikala < 2
         
         cursor.close()
-        conn.close()
+        release_db_connection(conn)
         
         return jsonify({
             "success": True,
             "can_rent": can_rent,
-            "current_rentals": user['broj_aktivnih_bicikala'],
-            "user_id": user['id'],
-            "ime": user['ime'],
-            "prezime": user['prezime']
+            "current_rentals": user.broj_aktivnih_bicikala,
+            "user_id": user.id,
+            "ime": user.ime,
+            "prezime": user.prezime
         }), 200
         
     except Exception as e:
@@ -188,12 +1597,48 @@ def proveri_zaduzenje():
             "message": "Interna greška servera"
         }), 500
 
+def limit_zakupa(broj_aktivnih, u_gradu, rezervisano, opozvan):
+    """
+    Limit zakupa grada za korisnika: 2 - zaduženja u drugim gradovima - deo limita rezervisan zakupima drugih gradova.
+    Opozvan zakup ne drži rezervu dok korisnik ima aktivnih zaduženja (ostala zaduženja idu preko centrale).
+    Vraća (limit, zaduženja u drugim gradovima, da li je zakup i dalje opozvan).
+    """
+    u_drugim_gradovima = broj_aktivnih - u_gradu
+    limit = max(0, min(2, 2 - u_drugim_gradovima - rezervisano))
+    opozvan = opozvan and broj_aktivnih > 0
+    if opozvan:
+        limit = min(limit, u_gradu)
+    return limit, max(u_drugim_gradovima, 0), opozvan
+
+def zaduzi_uz_zakupe(cursor, jmbg):
+    """
+    Zaduženje korisnika koji ima važeće zakupe (SQL_ZADUZI ih ne uračunava): posle zaključavanja brojača limit se
+    proverava zajedno sa delom rezervisanim zakupima svih gradova. Ako zaduženje ne prolazi zbog zakupa, zakupi se
+    označavaju kao opozvani i smanjuju pri sledećoj obnovi. Vraća StanjeBrojaca ili None.
+    """
+    stanje = fetch_one(cursor, """
+        SELECT broj_aktivnih_bicikala, zakup_do > LOCALTIMESTAMP FROM brojaci_zaduzenja
+        WHERE jmbg = %s FOR UPDATE
+    """, (jmbg,))
+    if stanje is None or stanje[0] >= 2 or not stanje[1]:
+        return None
+    # Nova naredba vidi zakupe obnovljene dok se čekalo na zaključavanje brojača
+    rezervisano = fetch_one(cursor, SQL_REZERVISANO_ZAKUPIMA, (jmbg,))[0]
+    if stanje[0] + rezervisano >= 2:
+        cursor.execute("UPDATE zakupi SET opozvan = true WHERE jmbg = %s AND istice > LOCALTIMESTAMP", (jmbg,))
+        cursor.connection.commit()
+        return None
+    return fetch_prepared(cursor, 'zaduzi_bez_provere', (jmbg,), StanjeBrojaca)
+
 @app.route('/korisnici/zaduzi-bicikl', methods=['POST'])
 def zaduzi_bicikl():
     """
     Registrovanje novog zaduženja bicikla
     Expected JSON: {
-        "jmbg": "1234567890123"
+        "jmbg": "1234567890123",
+        "grad": "Novi Sad",                   (opciono, za indeks aktivnih zaduženja)
+        "oznaka_bicikla": "NS001",            (opciono, za indeks aktivnih zaduženja)
+        "datum_zaduzivanja": "2025-09-16"     (opciono)
     }
     """
     try:
@@ -204,6 +1649,13 @@ def zaduzi_bicikl():
                 "success": False,
                 "message": "JMBG je obavezan parametar"
             }), 400
+        
+        greska = proveri_jmbg(data['jmbg'])
+        if greska:
+            return jsonify({
+                "success": False,
+                "message": greska
+            }), 400
             
         conn = get_db_connection()
         if not conn:
@@ -212,35 +1664,35 @@ def zaduzi_bicikl():
                 "message": "Greška pri konekciji sa bazom podataka"
             }), 500
             
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Ažuriranje broja aktivnih bicikala
-        cursor.execute("""
-            UPDATE korisnici 
-            SET broj_aktivnih_bicikala = broj_aktivnih_bicikala + 1
-            WHERE jmbg = %s AND broj_aktivnih_bicikala < 2
-            RETURNING id, broj_aktivnih_bicikala
-        """, (data['jmbg'],))
+        cursor = conn.cursor()
         
-        result = cursor.fetchone()
+        # Ažuriranje broja aktivnih bicikala (uz važeće zakupe gradova preko sporije putanje)
+        result = fetch_prepared(cursor, 'zaduzi', (data['jmbg'],), StanjeBrojaca)
+        if not result:
+            result = zaduzi_uz_zakupe(cursor, data['jmbg'])
         
         if not result:
             cursor.close()
-            conn.close()
+            release_db_connection(conn)
             return jsonify({
                 "success": False,
                 "message": "Korisnik nije pronađen ili je dostigao maksimalan broj zaduženja"
             }), 400
         
+        if data.get('grad') and data.get('oznaka_bicikla'):
+            execute_prepared(cursor, 'indeks_dodaj', (
+                data['jmbg'], data['grad'], data['oznaka_bicikla'], data.get('datum_zaduzivanja')
+            ))
+        
         conn.commit()
         cursor.close()
-        conn.close()
+        release_db_connection(conn)
         
         return jsonify({
             "success": True,
             "message": "Zaduženje uspešno registrovano",
-            "user_id": result['id'],
-            "active_rentals": result['broj_aktivnih_bicikala']
+            "user_id": result.id,
+            "active_rentals": result.broj_aktivnih_bicikala
         }), 200
         
     except Exception as e:
@@ -255,7 +1707,9 @@ def razduzi_bicikl():
     """
     Razduženje bicikla - smanjuje broj aktivnih zaduženja
     Expected JSON: {
-        "jmbg": "1234567890123"
+        "jmbg": "1234567890123",
+        "grad": "Novi Sad",                   (opciono, za indeks aktivnih zaduženja)
+        "oznaka_bicikla": "NS001"             (opciono, za indeks aktivnih zaduženja)
     }
     """
     try:
@@ -266,6 +1720,13 @@ def razduzi_bicikl():
                 "success": False,
                 "message": "JMBG je obavezan parametar"
             }), 400
+        
+        greska = proveri_jmbg(data['jmbg'])
+        if greska:
+            return jsonify({
+                "success": False,
+                "message": greska
+            }), 400
             
         conn = get_db_connection()
         if not conn:
@@ -274,35 +1735,31 @@ def razduzi_bicikl():
                 "message": "Greška pri konekciji sa bazom podataka"
             }), 500
             
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor()
         
         # Smanjenje broja aktivnih bicikala
-        cursor.execute("""
-            UPDATE korisnici 
-            SET broj_aktivnih_bicikala = broj_aktivnih_bicikala - 1
-            WHERE jmbg = %s AND broj_aktivnih_bicikala > 0
-            RETURNING id, broj_aktivnih_bicikala
-        """, (data['jmbg'],))
-        
-        result = cursor.fetchone()
+        result = fetch_prepared(cursor, 'razduzi', (data['jmbg'],), StanjeBrojaca)
         
         if not result:
             cursor.close()
-            conn.close()
+            release_db_connection(conn)
             return jsonify({
                 "success": False,
                 "message": "Korisnik nije pronađen ili nema aktivnih zaduženja"
             }), 400
         
+        if data.get('grad') and data.get('oznaka_bicikla'):
+            execute_prepared(cursor, 'indeks_ukloni', (data['grad'], data['oznaka_bicikla']))
+        
         conn.commit()
         cursor.close()
-        conn.close()
+        release_db_connection(conn)
         
         return jsonify({
             "success": True,
             "message": "Razduženje uspešno registrovano",
-            "user_id": result['id'],
-            "active_rentals": result['broj_aktivnih_bicikala']
+            "user_id": result.id,
+            "active_rentals": result.broj_aktivnih_bicikala
         }), 200
         
     except Exception as e:
@@ -312,42 +1769,1330 @@ def razduzi_bicikl():
             "message": "Interna greška servera"
         }), 500
 
-@app.route('/korisnici', methods=['GET'])
-def get_all_users():
-    """Vraća sve registrovane korisnike"""
-    logging.info("/korisnici endpoint je pogodjen")
+def rpc_izvrsi(cursor, poziv, pocetak):
+    """
+    Jedan poziv internog RPC-a u sopstvenoj transakciji; vraća niz odgovora (status je prvi element).
+    Poziv sa rokom (ms od prijema zahteva u pocetak) se ne izvršava ako je rok istekao, a njegove naredbe
+    prekida statement_timeout u roku - pozivalac posle roka poništava zaduženje, pa ono ne sme da se upiše kasnije.
+    """
+    operacija, jmbg, grad, oznaka_bicikla, datum_zaduzivanja, rok_ms = (list(poziv) + [None] * 6)[:6]
+    greska = proveri_jmbg(jmbg)
+    if greska:
+        return [RPC_GRESKA, greska]
+    preostalo = preostalo_vreme()
+    if isinstance(rok_ms, (int, float)):
+        preostalo_poziva = pocetak + rok_ms / 1000 - time.monotonic()
+        preostalo = preostalo_poziva if preostalo is None else min(preostalo, preostalo_poziva)
+    if preostalo is not None and preostalo <= 0:
+        return [RPC_GRESKA, "Rok poziva je istekao pre izvršavanja"]
+    try:
+        if isinstance(rok_ms, (int, float)):
+            cursor.execute("SELECT set_config('statement_timeout', %s, true)", (f"{max(1, int(preostalo * 1000))}ms",))
+        if operacija == RPC_PROVERI:
+            user = fetch_prepared(cursor, 'stanje_korisnika', (jmbg,), KorisnikStanje)
+            cursor.connection.commit()
+            if not user:
+                return [RPC_ODBIJENO]
+            return [RPC_OK, user.broj_aktivnih_bicikala, user.id, user.ime, user.prezime]
+        if operacija == RPC_ZADUZI:
+            result = fetch_prepared(cursor, 'zaduzi', (jmbg,), StanjeBrojaca) or zaduzi_uz_zakupe(cursor, jmbg)
+            if result and grad and oznaka_bicikla:
+                execute_prepared(cursor, 'indeks_dodaj', (jmbg, grad, oznaka_bicikla, datum_zaduzivanja))
+        elif operacija == RPC_RAZDUZI:
+            result = fetch_prepared(cursor, 'razduzi', (jmbg,), StanjeBrojaca)
+            if result and grad and oznaka_bicikla:
+                execute_prepared(cursor, 'indeks_ukloni', (grad, oznaka_bicikla))
+        else:
+            return [RPC_GRESKA, f"Nepoznata operacija {operacija}"]
+        cursor.connection.commit()
+        if not result:
+            return [RPC_ODBIJENO]
+        return [RPC_OK, result.broj_aktivnih_bicikala, result.id]
+    except Exception as e:
+        cursor.connection.rollback()
+        print(f"Greška u RPC pozivu {operacija}: {e}")
+        return [RPC_GRESKA, "Interna greška servera"]
+
+@app.route('/rpc', methods=['POST'])
+def rpc():
+    """
+    Interni binarni RPC za gradove (Content-Type: application/msgpack) - javni JSON API ostaje nepromenjen
+    Telo: [[operacija, jmbg, grad, oznaka_bicikla, datum_zaduzivanja, rok_ms], ...] (do RPC_MAX_BATCH poziva)
+      operacija: RPC_PROVERI (0), RPC_ZADUZI (1), RPC_RAZDUZI (2); grad, oznaka, datum i rok_ms su opcioni
+      rok_ms: preostalo vreme pozivaoca pri slanju - poziv se posle njega ne izvršava
+    Odgovor: niz odgovora istim redosledom
+      [RPC_OK, broj_aktivnih_bicikala, user_id] (uz proveru i ime, prezime)
+      [RPC_ODBIJENO]  - korisnik ne postoji, dostigao je limit ili nema aktivnih zaduženja
+      [RPC_GRESKA, poruka]
+    """
     try:
+        if msgpack is None:
+            return jsonify({
+                "success": False,
+                "message": "RPC nije dostupan (msgpack nije instaliran)"
+            }), 501
+        
+        try:
+            pozivi = msgpack.unpackb(request.get_data())
+        except ValueError:
+            pozivi = None
+        if not isinstance(pozivi, list) or len(pozivi) > RPC_MAX_BATCH:
+            return jsonify({
+                "success": False,
+                "message": f"Telo mora biti niz od najviše {RPC_MAX_BATCH} poziva"
+            }), 400
+        
         conn = get_db_connection()
         if not conn:
             return jsonify({
                 "success": False,
                 "message": "Greška pri konekciji sa bazom podataka"
             }), 500
-            
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cursor.execute("""
-            SELECT id, jmbg, ime, prezime, adresa, broj_aktivnih_bicikala, created_at
-            FROM korisnici 
-            ORDER BY created_at DESC
-        """)
         
-        users = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        cursor = conn.cursor()
+        try:
+            pocetak = time.monotonic()
+            odgovori = [rpc_izvrsi(cursor, poziv, pocetak) for poziv in pozivi]
+        finally:
+            cursor.close()
+            release_db_connection(conn)
         
-        return jsonify({
-            "success": True,
-            "users": [dict(user) for user in users]
-        }), 200
+        return Response(msgpack.packb(odgovori), mimetype='application/msgpack')
         
     except Exception as e:
-        logging.info(f"Greška pri dohvatanju korisnika: {e}")
+        print(f"Greška u RPC zahtevu: {e}")
         return jsonify({
             "success": False,
-            "message": f"Interna greška servera {e}"
+            "message": "Interna greška servera"
         }), 500
 
+@app.route('/korisnici/<jmbg>/zaduzenja', methods=['GET'])
+def get_aktivna_zaduzenja_korisnika(jmbg):
+    """Vraća aktivna zaduženja korisnika u svim gradovima iz indeksa (bez upita ka gradovima)"""
+    try:
+        greska = proveri_jmbg(jmbg)
+        if greska:
+            return jsonify({
+                "success": False,
+                "message": greska
+            }), 400
+        
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({
+                "success": False,
+                "message": "Greška pri konekciji sa bazom podataka"
+            }), 500
+            
+        cursor = conn.cursor()
+        
+        brojac = fetch_one(cursor, "SELECT broj_aktivnih_bicikala FROM brojaci_zaduzenja WHERE jmbg = %s", (jmbg,))
+        if not brojac:
+            cursor.close()
+            release_db_connection(conn)
+            return jsonify({
+                "success": False,
+                "message": "Korisnik nije registrovan"
+            }), 404
+        
+        cursor.execute("""
+            SELECT grad, oznaka_bicikla, datum_zaduzivanja
+            FROM aktivna_zaduzenja
+            WHERE jmbg = %s
+            ORDER BY datum_zaduzivanja, grad, oznaka_bicikla
+        """, (jmbg,))
+        zaduzenja = [{
+            "grad": grad,
+            "oznaka_bicikla": oznaka_bicikla,
+            "datum_zaduzivanja": datum_zaduzivanja.strftime('%Y-%m-%d') if datum_zaduzivanja else None
+        } for grad, oznaka_bicikla, datum_zaduzivanja in cursor.fetchall()]
+        cursor.close()
+        release_db_connection(conn)
+        
+        return jsonify({
+            "success": True,
+            "jmbg": jmbg,
+            "broj_aktivnih_bicikala": brojac[0],
+            "zaduzenja": zaduzenja
+        }), 200
+        
+    except Exception as e:
+        print(f"Greška pri dohvatanju zaduženja korisnika: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+@app.route('/korisnici/promene', methods=['GET'])
+def get_promene_brojaca():
+    """
+    Tok promena brojača zaduženja (Server-Sent Events) za keševe u gradovima.
+    Prvi događaj je 'reset' (pretplatnik briše keš), a zatim 'brojac' za svaku promenu:
+    {"jmbg", "broj_aktivnih_bicikala", "user_id", "ime", "prezime"}.
+    Zatvaranje toka znači da keš pretplatnika više nije ažuran.
+    """
+    if not change_feed.connected:
+        return jsonify({
+            "success": False,
+            "message": "Tok promena trenutno nije dostupan"
+        }), 503
+
+    subscriber = change_feed.subscribe()
+
+    def generate():
+        try:
+            yield 'event: reset\ndata: {}\n\n'
+            while True:
+                try:
+                    item = subscriber.get(timeout=CHANGE_FEED_HEARTBEAT)
+                except queue.Empty:
+                    if not change_feed.connected:
+                        return
+                    yield ': ping\n\n'
+                    continue
+                if item is None:
+                    return
+                event, data = item
+                yield f'event: {event}\ndata: {data}\n\n'
+        finally:
+            change_feed.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def admin_dozvoljen():
+    """Da li zahtev nosi ispravan administratorski token"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+def profilisanje_zabranjeno():
+    """Odgovor za zahtev profilisanja kada ono nije uključeno (404) ili zahtev nema administratorski token (403)"""
+    if not PROFILING:
+        return jsonify({
+            "success": False,
+            "message": "Profilisanje nije uključeno (PROFILING=true)"
+        }), 404
+    if not admin_dozvoljen():
+        return jsonify({
+            "success": False,
+            "message": "Pristup dozvoljen samo administratoru"
+        }), 403
+    return None
+
+class RouteProfiler:
+    """
+    cProfile uzorka zahteva jedne rute (naziv endpoint-a ili pravilo putanje, npr. '/zaduzenje').
+    Profiliše se deo zahteva (uzorak) dok se ne skupi zadati broj profila, koji se zatim sabiraju u jedan izveštaj.
+    """
+
+    def __init__(self):
+        # ruta je None kada profilisanje nije aktivno, a izabrana ostaje i posle završetka
+        self.ruta = None
+        self.izabrana = None
+        self.uzorak = 1.0
+        self.zahteva = 0
+        self.u_toku = 0
+        self.profili = []
+        self.pokrenuto = None
+        self.lock = threading.Lock()
+
+    def pokreni(self, ruta, uzorak, zahteva):
+        with self.lock:
+            self.ruta, self.uzorak, self.zahteva = ruta, uzorak, zahteva
+            self.izabrana = ruta
+            self.profili = []
+            self.pokrenuto = datetime.now().isoformat(timespec='seconds')
+
+    def zaustavi(self):
+        with self.lock:
+            self.ruta = None
+
+    def pocni(self):
+        """Profil za tekući zahtev ako je to izabrana ruta i zahtev je u uzorku, inače None"""
+        if self.ruta is None:
+            return None
+        if self.ruta != request.endpoint and (request.url_rule is None or self.ruta != request.url_rule.rule):
+            return None
+        if random.random() >= self.uzorak:
+            return None
+        with self.lock:
+            if self.ruta is None or len(self.profili) + self.u_toku >= self.zahteva:
+                return None
+            self.u_toku += 1
+        profil = cProfile.Profile()
+        profil.enable()
+        return profil
+
+    def zavrsi(self, profil):
+        profil.disable()
+        with self.lock:
+            self.u_toku -= 1
+            self.profili.append(profil)
+            if len(self.profili) >= self.zahteva:
+                self.ruta = None
+
+    def stats(self):
+        """Zbirni pstats.Stats svih skupljenih profila (None ako još nema nijednog)"""
+        with self.lock:
+            profili = list(self.profili)
+        if not profili:
+            return None
+        stats = pstats.Stats(profili[0])
+        for profil in profili[1:]:
+            stats.add(profil)
+        return stats
+
+    def stanje(self):
+        with self.lock:
+            return {
+                "ruta": self.izabrana,
+                "aktivno": self.ruta is not None,
+                "uzorak": self.uzorak,
+                "zahteva": self.zahteva,
+                "profilisano": len(self.profili),
+                "pokrenuto": self.pokrenuto
+            }
+
+route_profiler = RouteProfiler()
+
+@app.before_request
+def profilisi_zahtev():
+    if PROFILING and route_profiler.ruta is not None:
+        g.profil = route_profiler.pocni()
+
+@app.teardown_request
+def zavrsi_profil_zahteva(exc):
+    profil = g.pop('profil', None)
+    if profil is not None:
+        route_profiler.zavrsi(profil)
+
+@app.route('/admin/profil/ruta', methods=['POST'])
+def pokreni_profil_rute():
+    """
+    Pokretanje cProfile-a za uzorak zahteva jedne rute
+    Expected JSON: {
+        "ruta": "zaduzi_bicikl",
+        "uzorak": 0.1,
+        "zahteva": 20
+    }
+    """
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    try:
+        data = request.get_json(silent=True) or {}
+        ruta = data.get('ruta')
+        pravila = {rule.endpoint for rule in app.url_map.iter_rules()} | {rule.rule for rule in app.url_map.iter_rules()}
+        if ruta not in pravila:
+            return jsonify({
+                "success": False,
+                "message": "Nepoznata ruta (naziv endpoint-a ili putanja pravila, npr. /zaduzenje)"
+            }), 400
+        uzorak = float(data.get('uzorak', 1.0))
+        zahteva = int(data.get('zahteva', 20))
+        if not 0 < uzorak <= 1 or zahteva < 1:
+            return jsonify({
+                "success": False,
+                "message": "uzorak mora biti u (0, 1], a zahteva pozitivan broj"
+            }), 400
+        route_profiler.pokreni(ruta, uzorak, zahteva)
+        return jsonify({"success": True, "profil": route_profiler.stanje()}), 200
+    except (TypeError, ValueError):
+        return jsonify({
+            "success": False,
+            "message": "Neispravni parametri profilisanja"
+        }), 400
+
+@app.route('/admin/profil/ruta', methods=['GET'])
+def izvestaj_profila_rute():
+    """
+    Zbirni profil skupljenih zahteva: ?sortiranje=cumulative|tottime|calls&top=30,
+    ili ?format=pstats za binarni pstats fajl (snakeviz, python -m pstats)
+    """
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    stats = route_profiler.stats()
+    if request.args.get('format') == 'pstats':
+        if stats is None:
+            return jsonify({"success": False, "message": "Još nema profilisanih zahteva"}), 404
+        return Response(marshal.dumps(stats.stats), mimetype='application/octet-stream',
+                        headers={'Content-Disposition': 'attachment; filename=profil.pstats'})
+    sortiranje = request.args.get('sortiranje', 'cumulative')
+    if sortiranje not in ('cumulative', 'tottime', 'calls'):
+        return jsonify({"success": False, "message": "sortiranje mora biti cumulative, tottime ili calls"}), 400
+    top = request.args.get('top', 30, type=int)
+    funkcije = []
+    if stats is not None:
+        stats.sort_stats(sortiranje)
+        for funkcija in stats.fcn_list[:top]:
+            _, poziva, ukupno, kumulativno, _ = stats.stats[funkcija]
+            funkcije.append({
+                "funkcija": pstats.func_std_string(funkcija),
+                "poziva": poziva,
+                "sopstveno_ms": round(ukupno * 1000, 3),
+                "kumulativno_ms": round(kumulativno * 1000, 3)
+            })
+    return jsonify({"success": True, "profil": route_profiler.stanje(), "funkcije": funkcije}), 200
+
+@app.route('/admin/profil/ruta', methods=['DELETE'])
+def zaustavi_profil_rute():
+    """Zaustavljanje profilisanja rute (skupljeni profili ostaju dostupni do sledećeg pokretanja)"""
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    route_profiler.zaustavi()
+    return jsonify({"success": True, "profil": route_profiler.stanje()}), 200
+
+# Uzorkovanje stekova ne sme da se preklapa (svako bi uzorkovalo i drugo)
+uzorkovanje_lock = threading.Lock()
+
+def uzorkuj_stekove(sekundi, interval):
+    """
+    Wall-clock uzorkovanje stekova svih niti osim tekuće, svakih interval sekundi.
+    Vraća (broj pojavljivanja po steku u collapsed formatu 'nit;funkcija (fajl:linija);...', broj uzoraka).
+    """
+    stekovi = Counter()
+    tekuca = threading.get_ident()
+    uzoraka = 0
+    kraj = time.monotonic() + sekundi
+    while time.monotonic() < kraj:
+        # Brojevi u imenima niti (Thread-12, rpc-3) bi rasuli iste stekove po nitima
+        imena = {nit.ident: re.sub(r'-\d+', '', nit.name) for nit in threading.enumerate()}
+        for ident, okvir in sys._current_frames().items():
+            if ident == tekuca:
+                continue
+            funkcije = []
+            while okvir is not None:
+                code = okvir.f_code
+                funkcije.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                okvir = okvir.f_back
+            funkcije.append(imena.get(ident, 'nit'))
+            stekovi[';'.join(reversed(funkcije))] += 1
+        uzoraka += 1
+        time.sleep(interval)
+    return stekovi, uzoraka
+
+def stablo_stekova(stekovi):
+    """Collapsed stekovi u stablo za d3-flame-graph ({"name", "value", "children"})"""
+    koren = {"name": "sve", "value": 0, "children": {}}
+    for stek, broj in stekovi.items():
+        koren['value'] += broj
+        cvor = koren
+        for funkcija in stek.split(';'):
+            cvor = cvor['children'].setdefault(funkcija, {"name": funkcija, "value": 0, "children": {}})
+            cvor['value'] += broj
+
+    def u_listu(cvor):
+        return dict(cvor, children=[u_listu(dete) for dete in cvor['children'].values()])
+    return u_listu(koren)
+
+@app.route('/admin/profil/uzorkovanje', methods=['GET'])
+def uzorkovanje_stekova():
+    """
+    Wall-clock uzorkovanje stekova svih niti: ?sekundi=5&interval=0.01&format=collapsed|json.
+    collapsed je tekst za flamegraph.pl/speedscope ('stek broj' po redu), a json stablo za d3-flame-graph.
+    """
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    sekundi = request.args.get('sekundi', 5, type=float)
+    interval = request.args.get('interval', PROFILE_SAMPLE_INTERVAL, type=float)
+    format = request.args.get('format', 'collapsed')
+    if not 0 < sekundi <= PROFILE_MAX_SECONDS or interval <= 0 or format not in ('collapsed', 'json'):
+        return jsonify({
+            "success": False,
+            "message": f"sekundi mora biti u (0, {PROFILE_MAX_SECONDS}], interval pozitivan, a format collapsed ili json"
+        }), 400
+    if not uzorkovanje_lock.acquire(blocking=False):
+        return jsonify({"success": False, "message": "Uzorkovanje stekova je već u toku"}), 409
+    try:
+        stekovi, uzoraka = uzorkuj_stekove(sekundi, interval)
+    finally:
+        uzorkovanje_lock.release()
+    if format == 'json':
+        return jsonify({"success": True, "uzoraka": uzoraka, "interval": interval, "stekovi": stablo_stekova(stekovi)}), 200
+    telo = ''.join(f"{stek} {broj}\n" for stek, broj in stekovi.most_common())
+    return Response(telo, mimetype='text/plain', headers={'X-Uzoraka': str(uzoraka)})
+
+# Osnovni tracemalloc snimak sa kojim se porede sledeći (rast memorije)
+memorija = {'osnova': None, 'lock': threading.Lock()}
+MEMORIJA_FILTERI = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+def stavke_memorije(statistike, top):
+    stavke = []
+    for stat in statistike[:top]:
+        stavka = {
+            "mesto": [f"{okvir.filename}:{okvir.lineno}" for okvir in stat.traceback],
+            "kb": round(stat.size / 1024, 1),
+            "blokova": stat.count
+        }
+        if isinstance(stat, tracemalloc.StatisticDiff):
+            stavka["kb_razlika"] = round(stat.size_diff / 1024, 1)
+            stavka["blokova_razlika"] = stat.count_diff
+        stavke.append(stavka)
+    return stavke
+
+@app.route('/admin/profil/memorija', methods=['POST'])
+def pokreni_pracenje_memorije():
+    """Uključivanje tracemalloc-a (?okviri=1 - dubina steka po alokaciji) i osnovni snimak za poređenje"""
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    okviri = request.args.get('okviri', 1, type=int)
+    with memorija['lock']:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, okviri))
+        memorija['osnova'] = tracemalloc.take_snapshot().filter_traces(MEMORIJA_FILTERI)
+    trenutno, vrh = tracemalloc.get_traced_memory()
+    return jsonify({
+        "success": True,
+        "okviri": tracemalloc.get_traceback_limit(),
+        "kb_trenutno": round(trenutno / 1024, 1),
+        "kb_vrh": round(vrh / 1024, 1)
+    }), 200
+
+@app.route('/admin/profil/memorija', methods=['GET'])
+def snimak_memorije():
+    """
+    Snimak memorije: najveća mesta alokacije i rast od osnovnog snimka,
+    ?top=20&grupisanje=lineno|filename|traceback, a sa ?nova_osnova=true snimak postaje nova osnova
+    """
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    grupisanje = request.args.get('grupisanje', 'lineno')
+    top = request.args.get('top', 20, type=int)
+    if grupisanje not in ('lineno', 'filename', 'traceback'):
+        return jsonify({"success": False, "message": "grupisanje mora biti lineno, filename ili traceback"}), 400
+    with memorija['lock']:
+        if not tracemalloc.is_tracing():
+            return jsonify({
+                "success": False,
+                "message": "Praćenje memorije nije uključeno (POST /admin/profil/memorija)"
+            }), 409
+        snimak = tracemalloc.take_snapshot().filter_traces(MEMORIJA_FILTERI)
+        osnova = memorija['osnova']
+        if request.args.get('nova_osnova', 'false').lower() == 'true':
+            memorija['osnova'] = snimak
+    trenutno, vrh = tracemalloc.get_traced_memory()
+    return jsonify({
+        "success": True,
+        "kb_trenutno": round(trenutno / 1024, 1),
+        "kb_vrh": round(vrh / 1024, 1),
+        "kb_pracenje": round(tracemalloc.get_tracemalloc_memory() / 1024, 1),
+        "najvece": stavke_memorije(snimak.statistics(grupisanje), top),
+        "rast": stavke_memorije(snimak.compare_to(osnova, grupisanje), top) if osnova is not None else []
+    }), 200
+
+@app.route('/admin/profil/memorija', methods=['DELETE'])
+def zaustavi_pracenje_memorije():
+    """Isključivanje tracemalloc-a i brisanje osnovnog snimka"""
+    zabranjeno = profilisanje_zabranjeno()
+    if zabranjeno:
+        return zabranjeno
+    with memorija['lock']:
+        tracemalloc.stop()
+        memorija['osnova'] = None
+    return jsonify({"success": True, "message": "Praćenje memorije je isključeno"}), 200
+
+@app.route('/admin/spori-upiti', methods=['GET'])
+def get_spori_upiti():
+    """
+    Najsporiji nedavni upiti (bez vrednosti parametara) i naredbe sa najvećim ukupnim trajanjem,
+    sa poslednjim uzetim planom (EXPLAIN) i tabelama koje plan čita sekvencijalno (?top=20)
+    """
+    if not admin_dozvoljen():
+        return jsonify({
+            "success": False,
+            "message": "Pristup dozvoljen samo administratoru"
+        }), 403
+    if not SLOW_QUERY_LOG:
+        return jsonify({
+            "success": False,
+            "message": "Merenje upita nije uključeno (SLOW_QUERY_LOG=true)"
+        }), 404
+    top = request.args.get('top', 20, type=int)
+    return jsonify(dict(slow_queries.izvestaj(top), success=True)), 200
+
+@app.route('/admin/spori-upiti', methods=['DELETE'])
+def reset_spori_upiti():
+    """Brisanje skupljenih trajanja, sporih upita i planova"""
+    if not admin_dozvoljen():
+        return jsonify({
+            "success": False,
+            "message": "Pristup dozvoljen samo administratoru"
+        }), 403
+    slow_queries.reset()
+    return jsonify({"success": True, "message": "Statistika upita je obrisana"}), 200
+
+@app.route('/admin/aktivna-zaduzenja', methods=['POST'])
+def zameni_aktivna_zaduzenja():
+    """
+    Zamena svih aktivnih zaduženja jednog grada u indeksu i preračunavanje brojača jednim upitom
+    (posle masovnog uvoza ili obnove u gradu)
+    Expected JSON: {
+        "grad": "Novi Sad",
+        "zaduzenja": [{"jmbg": "1234567890123", "oznaka_bicikla": "NS001", "datum_zaduzivanja": "2025-09-16"}],
+        "indeks_potpun": false    (opciono - true kada su indeksu već poslata zaduženja svih gradova)
+    }
+    Brojač pogođenog korisnika postaje broj njegovih zaduženja u indeksu (svih gradova). Korisnik čiji se brojač pre
+    zamene ne slaže sa indeksom (npr. zaduženja starija od indeksa, kojih u njemu nema) se ne menja, nego vraća
+    u neuskladjeni_korisnici; sa indeks_potpun se i njegov brojač preračunava iz indeksa.
+    """
+    try:
+        if not admin_dozvoljen():
+            return jsonify({
+                "success": False,
+                "message": "Pristup dozvoljen samo administratoru"
+            }), 403
+        
+        data = request.get_json()
+        if not data or not data.get('grad') or not isinstance(data.get('zaduzenja'), list):
+            return jsonify({
+                "success": False,
+                "message": "Obavezni parametri: grad, zaduzenja"
+            }), 400
+        
+        for zaduzenje in data['zaduzenja']:
+            greska = proveri_jmbg(zaduzenje.get('jmbg'))
+            if greska or not zaduzenje.get('oznaka_bicikla'):
+                return jsonify({
+                    "success": False,
+                    "message": f"Neispravno zaduženje {zaduzenje}: {greska or 'nedostaje oznaka_bicikla'}"
+                }), 400
+        
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({
+                "success": False,
+                "message": "Greška pri konekciji sa bazom podataka"
+            }), 500
+        
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            CREATE TEMP TABLE nova_zaduzenja (
+                jmbg {JMBG_TIP} NOT NULL,
+                oznaka_bicikla VARCHAR(50) NOT NULL,
+                datum_zaduzivanja DATE
+            ) ON COMMIT DROP
+        """)
+        execute_values(cursor, "INSERT INTO nova_zaduzenja (jmbg, oznaka_bicikla, datum_zaduzivanja) VALUES %s", [
+            (z['jmbg'], z['oznaka_bicikla'], z.get('datum_zaduzivanja')) for z in data['zaduzenja']
+        ], page_size=1000)
+        
+        # Pogođeni korisnici (dosadašnja i nova zaduženja grada); brojači se zaključavaju pre poređenja sa indeksom,
+        # pa zaduženja u toku (brojač i indeks se menjaju u istoj transakciji) ne remete poređenje
+        cursor.execute("""
+            CREATE TEMP TABLE pogodjeni ON COMMIT DROP AS
+            SELECT jmbg FROM aktivna_zaduzenja WHERE grad = %s
+            UNION
+            SELECT jmbg FROM nova_zaduzenja
+        """, (data['grad'],))
+        cursor.execute("""
+            SELECT 1 FROM brojaci_zaduzenja
+            WHERE jmbg IN (SELECT jmbg FROM pogodjeni)
+            ORDER BY korisnik_id
+            FOR UPDATE
+        """)
+        cursor.execute("""
+            CREATE TEMP TABLE neuskladjeni ON COMMIT DROP AS
+            SELECT b.jmbg FROM brojaci_zaduzenja b
+            WHERE b.jmbg IN (SELECT jmbg FROM pogodjeni) AND NOT %s
+              AND b.broj_aktivnih_bicikala <> (SELECT count(*) FROM aktivna_zaduzenja a WHERE a.jmbg = b.jmbg)
+        """, (bool(data.get('indeks_potpun')),))
+        neuskladjeno = cursor.rowcount
+        cursor.execute("DELETE FROM aktivna_zaduzenja WHERE grad = %s", (data['grad'],))
+        cursor.execute("""
+            INSERT INTO aktivna_zaduzenja (jmbg, grad, oznaka_bicikla, datum_zaduzivanja)
+            SELECT jmbg, %s, oznaka_bicikla, datum_zaduzivanja FROM nova_zaduzenja
+            ON CONFLICT (grad, oznaka_bicikla) DO NOTHING
+        """, (data['grad'],))
+        cursor.execute("""
+            UPDATE brojaci_zaduzenja b
+            SET broj_aktivnih_bicikala = r.broj
+            FROM (
+                SELECT p.jmbg, (SELECT count(*) FROM aktivna_zaduzenja a WHERE a.jmbg = p.jmbg) AS broj
+                FROM pogodjeni p
+                WHERE p.jmbg NOT IN (SELECT jmbg FROM neuskladjeni)
+            ) r
+            WHERE b.jmbg = r.jmbg AND b.broj_aktivnih_bicikala <> r.broj
+        """)
+        azurirano = cursor.rowcount
+        cursor.execute("SELECT lpad(jmbg::text, 13, '0') FROM neuskladjeni ORDER BY jmbg LIMIT 100")
+        neuskladjeni = [row[0] for row in cursor.fetchall()]
+        cursor.execute("""
+            SELECT COUNT(DISTINCT n.jmbg) FROM nova_zaduzenja n
+            WHERE NOT EXISTS (SELECT 1 FROM brojaci_zaduzenja b WHERE b.jmbg = n.jmbg)
+        """)
+        nepoznati = cursor.fetchone()[0]
+        conn.commit()
+        cursor.close()
+        release_db_connection(conn)
+        
+        logging.info(f"Aktivna zaduženja za {data['grad']} zamenjena ({len(data['zaduzenja'])}), brojači: {azurirano}"
+                     f", neusklađeni: {neuskladjeno}")
+        return jsonify({
+            "success": True,
+            "message": f"Aktivna zaduženja za {data['grad']} su zamenjena",
+            "zaduzenja": len(data['zaduzenja']),
+            "azurirani_brojaci": azurirano,
+            "nepoznati_korisnici": nepoznati,
+            # Brojači koji se ne slažu sa indeksom ostaju nepromenjeni (prvih 100 JMBG-ova)
+            "neuskladjeni_brojaci": neuskladjeno,
+            "neuskladjeni_korisnici": neuskladjeni
+        }), 200
+        
+    except Exception as e:
+        print(f"Greška pri zameni aktivnih zaduženja: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+@app.route('/zakupi', methods=['POST'])
+def obnovi_zakupe():
+    """
+    Dodela i obnova zakupa kvote zaduženja za jedan grad, jednom serijom
+    Expected JSON: {
+        "grad": "Novi Sad",
+        "jmbg": ["1234567890123", ...]    (svi korisnici za koje grad traži zakup - ostali zakupi grada se opozivaju)
+    }
+    Limit zakupa računa limit_zakupa. Zakup važi "trajanje" sekundi od odgovora; "grace" (LEASE_GRACE) je koliko
+    posle isteka centrala još čeka događaje grada, pa grad ne koristi zakupe dok mu je OUTBOX_MAX_AGE veći ili jednak.
+    Smanjen ili ukinut zakup ostaje rezervisan do isteka dosadašnje dodele, pa grad do primene odgovora bezbedno
+    zadužuje po starim limitima (obnova u gradu ne zaključava zakupe).
+    """
+    try:
+        data = request.get_json()
+        if not data or not data.get('grad') or not isinstance(data.get('jmbg'), list):
+            return jsonify({
+                "success": False,
+                "message": "Obavezni parametri: grad, jmbg"
+            }), 400
+        
+        for jmbg in data['jmbg']:
+            greska = proveri_jmbg(jmbg)
+            if greska:
+                return jsonify({
+                    "success": False,
+                    "message": f"Neispravan JMBG {jmbg}: {greska}"
+                }), 400
+        
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({
+                "success": False,
+                "message": "Greška pri konekciji sa bazom podataka"
+            }), 500
+        
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        # Brojači se zaključavaju pre računanja (uvek istim redosledom), pa sinhrona zaduženja čekaju na novi zakup
+        cursor.execute(f"""
+            SELECT korisnik_id FROM brojaci_zaduzenja
+            WHERE jmbg = ANY(%s::{JMBG_TIP}[])
+            ORDER BY korisnik_id
+            FOR UPDATE
+        """, (data['jmbg'],))
+        # Grad koristi dosadašnje zakupe dok ne primeni ovaj odgovor, pa ukinuti zakup ostaje rezervisan do svog isteka
+        cursor.execute(f"""
+            WITH ukinuti AS (
+                DELETE FROM zakupi WHERE grad = %s AND NOT (jmbg = ANY(%s::{JMBG_TIP}[]))
+                RETURNING jmbg, grad, limit_zaduzenja, istice
+            )
+            INSERT INTO zakupi_smanjenja (jmbg, grad, limit_zaduzenja, istice)
+            SELECT jmbg, grad, limit_zaduzenja, istice FROM ukinuti WHERE limit_zaduzenja > 0
+        """, (data['grad'], data['jmbg']))
+        ukinuto = cursor.rowcount
+        cursor.execute("""
+            DELETE FROM zakupi_smanjenja
+            WHERE grad = %s AND istice < LOCALTIMESTAMP - make_interval(secs => %s)
+        """, (data['grad'], LEASE_GRACE))
+        cursor.execute(SQL_STANJE_ZA_ZAKUP, {'grad': data['grad'], 'jmbg': data['jmbg']})
+        zakupi = []
+        for stanje in cursor.fetchall():
+            limit, u_drugim_gradovima, opozvan = limit_zakupa(
+                stanje['broj_aktivnih_bicikala'], stanje['u_gradu'], stanje['rezervisano'], stanje['opozvan']
+            )
+            zakupi.append({
+                "jmbg": stanje['jmbg'],
+                "user_id": stanje['korisnik_id'],
+                "ime": stanje['ime'],
+                "prezime": stanje['prezime'],
+                "limit": limit,
+                "u_drugim_gradovima": u_drugim_gradovima,
+                "opozvan": opozvan
+            })
+        if zakupi:
+            # Smanjen limit: dosadašnja dodela ostaje rezervisana do svog isteka (SQL_ZAKUPI_REZERVE)
+            execute_values(cursor, """
+                INSERT INTO zakupi_smanjenja (jmbg, grad, limit_zaduzenja, istice)
+                SELECT z.jmbg, z.grad, z.limit_zaduzenja, z.istice
+                FROM zakupi z JOIN (VALUES %s) AS n (jmbg, grad, limit_zaduzenja) ON z.jmbg = n.jmbg AND z.grad = n.grad
+                WHERE z.limit_zaduzenja > n.limit_zaduzenja AND z.istice > LOCALTIMESTAMP
+            """, [(z['jmbg'], data['grad'], z['limit']) for z in zakupi],
+                template=f"(%s::{JMBG_TIP}, %s, %s)", page_size=1000)
+            execute_values(cursor, """
+                INSERT INTO zakupi (jmbg, grad, limit_zaduzenja, istice, opozvan) VALUES %s
+                ON CONFLICT (jmbg, grad) DO UPDATE
+                SET limit_zaduzenja = EXCLUDED.limit_zaduzenja, istice = EXCLUDED.istice, opozvan = EXCLUDED.opozvan
+            """, [(z['jmbg'], data['grad'], z['limit'], LEASE_TTL, z['opozvan']) for z in zakupi],
+                template="(%s, %s, %s, LOCALTIMESTAMP + make_interval(secs => %s), %s)", page_size=1000)
+            cursor.execute(f"""
+                UPDATE brojaci_zaduzenja
+                SET zakup_do = GREATEST(zakup_do, LOCALTIMESTAMP + make_interval(secs => %s))
+                WHERE jmbg = ANY(%s::{JMBG_TIP}[])
+            """, (LEASE_TTL + LEASE_GRACE, [z['jmbg'] for z in zakupi]))
+        conn.commit()
+        cursor.close()
+        release_db_connection(conn)
+        
+        poznati = {z['jmbg'] for z in zakupi}
+        return jsonify({
+            "success": True,
+            "trajanje": LEASE_TTL,
+            "grace": LEASE_GRACE,
+            "zakupi": zakupi,
+            "ukinuto": ukinuto,
+            "nepoznati_korisnici": [jmbg for jmbg in data['jmbg'] if jmbg not in poznati]
+        }), 200
+        
+    except Exception as e:
+        print(f"Greška pri obnovi zakupa: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+@app.route('/zakupi/dogadjaji', methods=['POST'])
+def primi_dogadjaje():
+    """
+    Zaduženja i razduženja koja je grad odobrio po zakupu, u redosledu nastanka
+    Expected JSON: {
+        "grad": "Novi Sad",
+        "dogadjaji": [{"id": 1, "vrsta": "zaduzenje" | "razduzenje" | "ponistavanje", "jmbg": "1234567890123",
+                       "oznaka_bicikla": "NS001", "datum_zaduzivanja": "2025-09-16"}]
+    }
+    Događaj koji je već primljen (isti grad i id) se preskače, pa grad seriju može bezbedno da pošalje ponovo.
+    Poništavanje (zaduženje na koje grad nije dobio odgovor) umanjuje brojač samo ako je zaduženje u indeksu.
+    """
+    try:
+        data = request.get_json()
+        if not data or not data.get('grad') or not isinstance(data.get('dogadjaji'), list):
+            return jsonify({
+                "success": False,
+                "message": "Obavezni parametri: grad, dogadjaji"
+            }), 400
+        
+        for dogadjaj in data['dogadjaji']:
+            greska = proveri_jmbg(dogadjaj.get('jmbg'))
+            if not greska and dogadjaj.get('vrsta') not in ('zaduzenje', 'razduzenje', 'ponistavanje'):
+                greska = "vrsta mora biti zaduzenje, razduzenje ili ponistavanje"
+            if not greska and (not isinstance(dogadjaj.get('id'), int) or not dogadjaj.get('oznaka_bicikla')):
+                greska = "nedostaje id ili oznaka_bicikla"
+            if greska:
+                return jsonify({
+                    "success": False,
+                    "message": f"Neispravan događaj {dogadjaj}: {greska}"
+                }), 400
+        
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({
+                "success": False,
+                "message": "Greška pri konekciji sa bazom podataka"
+            }), 500
+        
+        cursor = conn.cursor()
+        primenjeno = 0
+        ponovljeno = 0
+        nepoznati = []
+        for dogadjaj in data['dogadjaji']:
+            cursor.execute("""
+                INSERT INTO primljeni_dogadjaji (grad, id) VALUES (%s, %s)
+                ON CONFLICT (grad, id) DO NOTHING
+            """, (data['grad'], dogadjaj['id']))
+            if cursor.rowcount == 0:
+                ponovljeno += 1
+                continue
+            if dogadjaj['vrsta'] == 'zaduzenje':
+                result = fetch_prepared(cursor, 'zaduzi_bez_provere', (dogadjaj['jmbg'],))
+                if result:
+                    execute_prepared(cursor, 'indeks_dodaj', (
+                        dogadjaj['jmbg'], data['grad'], dogadjaj['oznaka_bicikla'], dogadjaj.get('datum_zaduzivanja')
+                    ))
+            elif dogadjaj['vrsta'] == 'razduzenje':
+                result = fetch_prepared(cursor, 'razduzi', (dogadjaj['jmbg'],))
+                execute_prepared(cursor, 'indeks_ukloni', (data['grad'], dogadjaj['oznaka_bicikla']))
+            else:
+                # Zaduženje koje centrala nije upisala nema šta da poništi
+                result = True
+                if fetch_prepared(cursor, 'indeks_ponisti', (data['grad'], dogadjaj['oznaka_bicikla'], dogadjaj['jmbg'])):
+                    result = fetch_prepared(cursor, 'razduzi', (dogadjaj['jmbg'],))
+            if not result:
+                nepoznati.append(dogadjaj['id'])
+            primenjeno += 1
+        cursor.execute("""
+            DELETE FROM primljeni_dogadjaji WHERE primljen_at < LOCALTIMESTAMP - make_interval(secs => %s)
+        """, (LEASE_EVENT_RETENTION,))
+        conn.commit()
+        cursor.close()
+        release_db_connection(conn)
+        
+        if nepoznati:
+            logging.warning(f"Događaji iz {data['grad']} bez odgovarajućeg brojača: {nepoznati}")
+        return jsonify({
+            "success": True,
+            "primenjeno": primenjeno,
+            "ponovljeno": ponovljeno,
+            "neprimenljivi": nepoznati
+        }), 200
+        
+    except Exception as e:
+        print(f"Greška pri prijemu događaja: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+def pripremi_korisnike(users):
+    """Priprema redova korisnika za JSON odgovor"""
+    # orjson direktno serijalizuje RealDictRow (podklasa dict-a), pa kopiranje nije potrebno
+    if JSON_ENCODER == 'orjson':
+        return users
+    return [dict(user) for user in users]
+
+@app.route('/korisnici', methods=['GET'])
+def get_all_users():
+    """Vraća sve registrovane korisnike"""
+    logging.info("/korisnici endpoint je pogodjen")
+    try:
+        conn = get_db_connection(max_lag=READ_MAX_LAG['korisnici'])
+        if not conn:
+            return jsonify({
+                "success": False,
+                "message": "Greška pri konekciji sa bazom podataka"
+            }), 500
+            
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        
+        # Validator za ETag (pre liste, pa lista nikad nije starija od svog ETag-a): oznaka izmena liste korisnika,
+        # koju menja svaka izmena korisnika i brojača zaduženja
+        cursor.execute("SELECT sum(verzija) AS verzija FROM verzije_tabela WHERE lista = 'korisnici'")
+        etag = izracunaj_etag(cursor.fetchone()['verzija'])
+        response = nije_izmenjeno(etag)
+        if response is not None:
+            cursor.close()
+            release_db_connection(conn)
+            return response
+        
+        cursor.execute("""
+            SELECT k.id, lpad(k.jmbg::text, 13, '0') AS jmbg, k.ime, k.prezime, k.adresa,
+                   COALESCE(b.broj_aktivnih_bicikala, 0) AS broj_aktivnih_bicikala, k.created_at
+            FROM korisnici k
+            LEFT JOIN brojaci_zaduzenja b ON b.korisnik_id = k.id
+            ORDER BY k.created_at DESC
+        """)
+        
+        users = cursor.fetchall()
+        cursor.close()
+        release_db_connection(conn)
+        
+        return sa_etag(jsonify({
+            "success": True,
+            "users": pripremi_korisnike(users)
+        }), etag), 200
+        
+    except Exception as e:
+        logging.info(f"Greška pri dohvatanju korisnika: {e}")
+        return jsonify({
+            "success": False,
+            "message": f"Interna greška servera {e}"
+        }), 500
+
+def zapisi_izvoz(cursor, schema, izlaz, format):
+    """
+    Upis redova iz serverskog kursora u Parquet ili Arrow IPC fajl (putanja ili fajl objekat), seriju po seriju.
+    U memoriji je najviše EXPORT_BATCH_SIZE redova; svaka serija je jedna row group (Parquet) odnosno
+    record batch (Arrow). Vraća broj upisanih redova.
+    """
+    if format == 'parquet':
+        writer = pq.ParquetWriter(izlaz, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(izlaz, schema)
+    broj = 0
+    try:
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            broj += len(rows)
+    finally:
+        writer.close()
+    return broj
+
+def izvezi_korisnike(izlaz, format='parquet', od=None, do=None):
+    """Izvoz korisnika (opciono po datumu registracije) u izlaz; vraća broj izvezenih redova"""
+    conditions = []
+    params = []
+    for value, condition in [(od, "k.created_at >= %s"), (do, "k.created_at < %s::date + 1")]:
+        if value:
+            conditions.append(condition)
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = get_db_connection(max_lag=READ_MAX_LAG['korisnici'])
+    if not conn:
+        raise RuntimeError("Greška pri konekciji sa bazom podataka")
+    try:
+        # Imenovani (serverski) kursor - redovi se sa servera preuzimaju u serijama, a ne svi odjednom
+        cursor = conn.cursor(name='izvoz_korisnika')
+        cursor.itersize = EXPORT_BATCH_SIZE
+        cursor.execute(f"""
+            SELECT k.id, lpad(k.jmbg::text, 13, '0') AS jmbg, k.ime, k.prezime, k.adresa,
+                   COALESCE(b.broj_aktivnih_bicikala, 0), k.created_at
+            FROM korisnici k
+            LEFT JOIN brojaci_zaduzenja b ON b.korisnik_id = k.id
+            {where}
+            ORDER BY k.id
+        """, params)
+        broj = zapisi_izvoz(cursor, KORISNICI_SCHEMA, izlaz, format)
+        cursor.close()
+        conn.rollback()
+    finally:
+        release_db_connection(conn)
+    return broj
+
+@app.route('/korisnici/izvoz', methods=['GET'])
+def izvoz_korisnika():
+    """
+    Kolonski izvoz korisnika za analitiku
+    Parametri: ?format=parquet|arrow&od=2025-01-01&do=2025-12-31 (datum registracije)
+    Izvoz se piše u privremeni fajl na disku (memorija ne raste sa brojem redova) i šalje kao prilog.
+    """
+    try:
+        if pa is None:
+            return jsonify({
+                "success": False,
+                "message": "Izvoz nije dostupan - pyarrow nije instaliran"
+            }), 501
+        
+        format = request.args.get('format', 'parquet')
+        if format not in EXPORT_FORMATS:
+            return jsonify({
+                "success": False,
+                "message": f"Nepodržan format izvoza. Koristiti: {', '.join(EXPORT_FORMATS)}"
+            }), 400
+        
+        for field in ('od', 'do'):
+            if request.args.get(field):
+                try:
+                    datetime.strptime(request.args[field], '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({
+                        "success": False,
+                        "message": "Neisprava format datuma. Koristiti YYYY-MM-DD"
+                    }), 400
+        
+        izlaz = tempfile.TemporaryFile()
+        try:
+            broj = izvezi_korisnike(izlaz, format, request.args.get('od'), request.args.get('do'))
+        except Exception:
+            izlaz.close()
+            raise
+        izlaz.seek(0)
+        
+        logging.info(f"Izvoz korisnika: {broj} redova ({format})")
+        return send_file(izlaz, mimetype=EXPORT_FORMATS[format], as_attachment=True,
+                         download_name=f"korisnici.{format}")
+        
+    except Exception as e:
+        print(f"Greška pri izvozu korisnika: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Interna greška servera"
+        }), 500
+
+@app.cli.command('izvoz-korisnika')
+@click.argument('izlaz')
+@click.option('--format', type=click.Choice(list(EXPORT_FORMATS)), default='parquet')
+@click.option('--od', type=click.DateTime(formats=['%Y-%m-%d']), help='Datum registracije od (YYYY-MM-DD)')
+@click.option('--do', type=click.DateTime(formats=['%Y-%m-%d']), help='Datum registracije do (YYYY-MM-DD)')
+def izvoz_korisnika_cli(izlaz, format, od, do):
+    """Kolonski izvoz korisnika u fajl IZLAZ (Parquet ili Arrow IPC)"""
+    if pa is None:
+        raise click.ClickException("Izvoz nije dostupan - pyarrow nije instaliran")
+    broj = izvezi_korisnike(izlaz, format, od.date() if od else None, do.date() if do else None)
+    click.echo(f"Izvezeno {broj} korisnika u {izlaz}")
+
+fanout_executor = ThreadPoolExecutor(max_workers=max(len(CITY_URLS), 1) * 4)
+
+class FanoutCache:
+    """
+    LRU keš poslednjih odgovora gradova sa ETag-om - ključ je (grad, putanja, parametri), vrednost (etag, telo).
+    Telo se čuva kao primljeni bajtovi (svaki upit ga parsira iznova, pa keširani odgovor niko ne menja),
+    a ukupna veličina je ograničena na FANOUT_CACHE_BYTES.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.bajtova = 0
+        self.lock = threading.Lock()
+
+    def get(self, kljuc):
+        with self.lock:
+            entry = self.entries.get(kljuc)
+            if entry is not None:
+                self.entries.move_to_end(kljuc)
+            return entry
+
+    def put(self, kljuc, etag, body):
+        with self.lock:
+            stari = self.entries.pop(kljuc, None)
+            if stari is not None:
+                self.bajtova -= len(stari[1])
+            if len(body) > FANOUT_CACHE_BYTES:
+                return
+            self.entries[kljuc] = (etag, body)
+            self.bajtova += len(body)
+            while len(self.entries) > FANOUT_CACHE_SIZE or self.bajtova > FANOUT_CACHE_BYTES:
+                self.bajtova -= len(self.entries.popitem(last=False)[1][1])
+
+fanout_cache = FanoutCache()
+
+# Zajednička HTTP sesija za upite gradovima - trajne konekcije ka svakom gradu
+gradovi_http = requests.Session()
+gradovi_http.mount('http://', requests.adapters.HTTPAdapter(pool_connections=max(len(CITY_URLS), 1),
+                                                            pool_maxsize=HTTP_POOL_SIZE))
+gradovi_http.mount('https://', requests.adapters.HTTPAdapter(pool_connections=max(len(CITY_URLS), 1),
+                                                             pool_maxsize=HTTP_POOL_SIZE))
+
+def citaj_ndjson(response, kljuc, etag):
+    """
+    Zapisi iz NDJSON odgovora grada, jedan po jedan, kako stižu. Pročitan odgovor se kešira ako ima ETag i
+    ne prelazi FANOUT_CACHE_BYTES; HTTP konekcija se vraća u pool i kada čitanje prekine pre kraja.
+    """
+    linije = [] if etag and FANOUT_CACHE_SIZE > 0 else None
+    velicina = 0
+    try:
+        for linija in response.iter_lines(chunk_size=64 * 1024):
+            if not linija:
+                continue
+            if linije is not None:
+                velicina += len(linija) + 1
+                linije = linije if velicina <= FANOUT_CACHE_BYTES else None
+                if linije is not None:
+                    linije.append(linija)
+            yield app.json.loads(linija)
+    finally:
+        response.close()
+    if linije is not None:
+        fanout_cache.put(kljuc, etag, b'\n'.join(linije))
+
+def fetch_city(grad, url, path, params, timeout=FANOUT_TIMEOUT, ndjson=False):
+    """
+    GET ka jednoj gradskoj biciklani; vraća (telo, etag).
+    Ako je raniji odgovor sa ETag-om u kešu, šalje se If-None-Match i na 304 vraća keširano telo (parsirano iznova).
+    Sa ndjson se traži NDJSON odgovor, a telo je iterator zapisa koji se čitaju tek pri prolasku kroz njega.
+    Grad u X-Request-Deadline dobija vreme koje centrala čeka na njegov odgovor.
+    """
+    kljuc = (grad, path, tuple(sorted((params or {}).items())), ndjson)
+    cached = fanout_cache.get(kljuc) if FANOUT_CACHE_SIZE > 0 else None
+    headers = {'If-None-Match': cached[0]} if cached else {}
+    headers[DEADLINE_HEADER] = f"{timeout * 1000:.0f}"
+    if ndjson:
+        headers['Accept'] = 'application/x-ndjson'
+    response = gradovi_http.get(f"{url}{path}", params=params, headers=headers, timeout=timeout, stream=ndjson)
+    if response.status_code == 304 and cached:
+        response.close()
+        if ndjson:
+            return (app.json.loads(linija) for linija in cached[1].split(b'\n') if linija), cached[0]
+        return app.json.loads(cached[1]), cached[0]
+    if ndjson:
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            response.close()
+            raise
+        return citaj_ndjson(response, kljuc, response.headers.get('ETag')), response.headers.get('ETag')
+    response.raise_for_status()
+    etag = response.headers.get('ETag')
+    if etag and FANOUT_CACHE_SIZE > 0:
+        fanout_cache.put(kljuc, etag, response.content)
+    return response.json(), etag
+
+def fan_out(path, params=None, ndjson=False):
+    """
+    Paralelni GET ka svim gradskim biciklanama.
+    Vraća (rezultati, statusi, etagovi): rezultati su JSON odgovori gradova koji su odgovorili na vreme
+    (sa ndjson iteratori zapisa - na odgovor se tada čeka samo do zaglavlja), statusi opisuju ishod po gradu
+    ('ok', 'timeout' ili 'greška: ...'), a etagovi su ETag-ovi odgovora gradova.
+    """
+    preostalo = preostalo_vreme()
+    timeout = FANOUT_TIMEOUT if preostalo is None else max(0.0, min(FANOUT_TIMEOUT, preostalo))
+    futures = {grad: fanout_executor.submit(fetch_city, grad, url, path, params, timeout, ndjson)
+               for grad, url in CITY_URLS.items()}
+    done, _ = wait(futures.values(), timeout=timeout)
+    results = {}
+    statuses = {}
+    etags = {}
+    for grad, future in futures.items():
+        if future not in done:
+            future.cancel()
+            statuses[grad] = 'timeout'
+        elif future.exception() is not None:
+            e = future.exception()
+            statuses[grad] = 'timeout' if isinstance(e, requests.exceptions.Timeout) else f"greška: {e}"
+        else:
+            results[grad], etags[grad] = future.result()
+            statuses[grad] = 'ok'
+    return results, statuses, etags
+
+def created_at_key(zaduzenje):
+    """Ključ za sortiranje po created_at (ISO format ili HTTP datum, zavisno od JSON enkodera grada)"""
+    value = zaduzenje.get('created_at') or '1970-01-01T00:00:00'
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return parsedate_to_datetime(value).replace(tzinfo=None)
+
+def sa_gradom(zaduzenja, grad):
+    """Kopije zaduženja jednog grada sa dodatim poljem grad (odgovor grada se ne menja)"""
+    for zaduzenje in zaduzenja:
+        yield dict(zaduzenje, grad=grad)
+
+@app.route('/zaduzenja', methods=['GET'])
+def get_sva_zaduzenja():
+    """
+    Zbirni pregled zaduženja iz svih gradova, od najnovijeg ka najstarijem
+    Filteri se prosleđuju gradovima: ?jmbg=1234567890123&status=aktivan&od=2025-09-01&do=2025-09-30
+    Gradovi koji ne odgovore u roku FANOUT_TIMEOUT su navedeni u "gradovi" i odgovor je tada delimičan.
+    Liste gradova stižu kao NDJSON i spajaju se dok se čitaju; ako prenos nekog grada pukne posle početka
+    odgovora, prekida se i zbirni odgovor (zaglavlje i statusi su već poslati).
+    """
+    params = {field: request.args[field] for field in ('jmbg', 'status', 'od', 'do') if request.args.get(field)}
+    for field in ('od', 'do'):
+        if field in params:
+            try:
+                datetime.strptime(params[field], '%Y-%m-%d')
+            except ValueError:
+                return jsonify({
+                    "success": False,
+                    "message": "Neisprava format datuma. Koristiti YYYY-MM-DD"
+                }), 400
+
+    results, statuses, etags = fan_out('/zaduzenja', params, ndjson=True)
+
+    # Zbirni ETag postoji samo za potpun odgovor u kom su svi gradovi poslali ETag - tada se na
+    # If-None-Match odgovara sa 304 bez spajanja lista
+    etag = None
+    if all(s == 'ok' for s in statuses.values()) and all(etags.get(grad) for grad in statuses):
+        etag = izracunaj_etag(sorted(etags.items()))
+        response = nije_izmenjeno(etag)
+        if response is not None:
+            return response
+
+    # Svaki grad strimuje zaduženja sortirana po created_at DESC, pa je dovoljno k-way spajanje iteratora
+    streams = [sa_gradom(zapisi, grad) for grad, zapisi in results.items()]
+
+    def generate():
+        try:
+            yield (f'{{"success": true, "potpun": {"true" if all(s == "ok" for s in statuses.values()) else "false"}, '
+                   f'"gradovi": {app.json.dumps(statuses)}, "zaduzenja": [')
+            batch = []
+            first = True
+            for zaduzenje in heapq.merge(*streams, key=created_at_key, reverse=True):
+                batch.append(app.json.dumps(zaduzenje))
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield ('' if first else ',') + ','.join(batch)
+                    first = False
+                    batch = []
+            if batch:
+                yield ('' if first else ',') + ','.join(batch)
+            yield ']}'
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logging.error(f"Zbirni pregled zaduženja prekinut - prenos liste grada nije uspeo: {e}")
+            raise
+        finally:
+            # Vraćanje HTTP konekcija gradova i kada klijent prekine prijem odgovora
+            for zapisi in results.values():
+                zapisi.close()
+
+    logging.info(f"Zbirni pregled zaduženja: {statuses}")
+    response = Response(stream_with_context(generate()), mimetype='application/json')
+    return sa_etag(response, etag) if etag else response
+
+@app.route('/statistika', methods=['GET'])
+def get_zbirna_statistika():
+    """
+    Zbirna dnevna statistika zaduženja iz agregata gradova (bez čitanja sirovih zaduženja)
+    Filteri se prosleđuju gradovima: ?od=2025-09-01&do=2025-09-30&tip=Gradski
+    "ukupno" sabira gradove po (dan, tip), a "po_gradovima" sadrži redove svakog grada.
+    """
+    params = {field: request.args[field] for field in ('od', 'do', 'tip') if request.args.get(field)}
+    for field in ('od', 'do'):
+        if field in params:
+            try:
+                datetime.strptime(params[field], '%Y-%m-%d')
+            except ValueError:
+                return jsonify({
+                    "success": False,
+                    "message": "Neisprava format datuma. Koristiti YYYY-MM-DD"
+                }), 400
+
+    results, statuses, _ = fan_out('/statistika', params)
+
+    ukupno = {}
+    po_gradovima = []
+    osvezeno_do = {}
+    for grad, body in results.items():
+        if not body.get('success'):
+            statuses[grad] = f"greška: {body.get('message')}"
+            continue
+        osvezeno_do[grad] = body.get('osvezeno_do')
+        for red in body['statistika']:
+            po_gradovima.append(dict(red, grad=grad))
+            zbir = ukupno.setdefault((red['dan'], red['tip_bicikla']), {
+                "dan": red['dan'],
+                "tip_bicikla": red['tip_bicikla'],
+                "broj_zaduzenja": 0,
+                "broj_razduzenja": 0,
+                "ukupno_dana": 0
+            })
+            zbir['broj_zaduzenja'] += red['broj_zaduzenja']
+            zbir['broj_razduzenja'] += red['broj_razduzenja']
+            zbir['ukupno_dana'] += red['ukupno_dana']
+
+    # Prosečno trajanje se računa iz zbirova, a ne kao prosek gradskih proseka
+    for zbir in ukupno.values():
+        zbir['prosecno_trajanje_dana'] = (
+            round(zbir['ukupno_dana'] / zbir['broj_razduzenja'], 2) if zbir['broj_razduzenja'] else None
+        )
+
+    logging.info(f"Zbirna statistika: {statuses}")
+    return jsonify({
+        "success": True,
+        "potpun": all(s == 'ok' for s in statuses.values()),
+        "gradovi": statuses,
+        "osvezeno_do": osvezeno_do,
+        "ukupno": [ukupno[key] for key in sorted(ukupno)],
+        "po_gradovima": po_gradovima
+    }), 200
+
+# Pokretanje interpretera, uvoz biblioteka i izvršavanje modula (faza 'uvoz' zagrevanja)
+TRAJANJE_UVOZA = trajanje_procesa()
+
 if __name__ == '__main__':
     print("Pokretanje Centralne Biciklane...")
     print("Endpoints:")
@@ -356,6 +3101,19 @@ if __name__ == '__main__':
     print("POST /korisnici/zaduzi-bicikl")
     print("POST /korisnici/razduzi-bicikl")
     print("GET  /korisnici")
+    print("GET  /korisnici/<jmbg>/zaduzenja")
+    print("GET  /korisnici/promene")
+    print("GET  /korisnici/izvoz")
+    print("POST /zakupi")
+    print("POST /zakupi/dogadjaji")
+    print("POST /admin/aktivna-zaduzenja")
+    print("GET  /zaduzenja")
+    print("GET  /statistika")
+    print("GET  /metrike")
     print("GET  /health")
     
+    # Zagrevanje odmah po pokretanju, u procesu koji opslužuje zahteve (ne u nadzornom procesu reloader-a)
+    if WARMUP and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warmup.start()
+    
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -19,4 +19,46 @@ INSERT INTO korisnici (jmbg, ime, prezime, adresa, broj_aktivnih_bicikala) VALUE
 ('9876543210987', 'Ana', 'Jovanović', 'Zmaj Jovina 15, Novi Sad', 1),
 ('1122334455667', 'Stefan', 'Nikolić', 'Kralja Petra 22, Subotica', 2),
 ('5555666677778', 'Milica', 'Stojanović', 'Svetozara Markovića 5, Kragujevac', 0),
-('9999888877776', 'Nikola', 'Milosavljević', 'Kneza Miloša 12, Kragujevac', 1);
\ No newline at end of file
+('9999888877776', 'Nikola', 'Milosavljević', 'Kneza Miloša 12, Kragujevac', 1);
+
+-- Uska tabela brojača aktivnih zaduženja (ažurira se pri svakom zaduženju/razduženju)
+CREATE TABLE brojaci_zaduzenja (
+    korisnik_id INTEGER PRIMARY KEY REFERENCES korisnici(id),
+    jmbg VARCHAR(13) UNIQUE NOT NULL,
+    broj_aktivnih_bicikala INTEGER NOT NULL DEFAULT 0 CHECK (broj_aktivnih_bicikala >= 0),
+    zakup_do TIMESTAMP
+) WITH (fillfactor = 70);
+
+INSERT INTO brojaci_zaduzenja (korisnik_id, jmbg, broj_aktivnih_bicikala)
+SELECT id, jmbg, broj_aktivnih_bicikala FROM korisnici;
+
+-- Indeks aktivnih zaduženja po korisniku (ažuriraju ga pozivi gradova pri zaduženju/razduženju)
+CREATE TABLE aktivna_zaduzenja (
+    jmbg VARCHAR(13) NOT NULL,
+    grad VARCHAR(50) NOT NULL,
+    oznaka_bicikla VARCHAR(50) NOT NULL,
+    datum_zaduzivanja DATE,
+    PRIMARY KEY (grad, oznaka_bicikla)
+);
+
+CREATE INDEX idx_aktivna_zaduzenja_jmbg ON aktivna_zaduzenja(jmbg);
+
+-- Zakupi kvote zaduženja po (korisnik, grad) - grad do isteka sam odobrava zaduženja do limit_zaduzenja
+CREATE TABLE zakupi (
+    jmbg VARCHAR(13) NOT NULL,
+    grad VARCHAR(50) NOT NULL,
+    limit_zaduzenja INTEGER NOT NULL,
+    istice TIMESTAMP NOT NULL,
+    opozvan BOOLEAN NOT NULL DEFAULT false,
+    PRIMARY KEY (jmbg, grad)
+);
+
+-- Već primenjeni događaji gradova (zaduženja i razduženja odobrena po zakupu)
+CREATE TABLE primljeni_dogadjaji (
+    grad VARCHAR(50) NOT NULL,
+    id BIGINT NOT NULL,
+    primljen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (grad, id)
+);
+
+CREATE INDEX idx_primljeni_dogadjaji_primljen_at ON primljeni_dogadjaji(primljen_at);
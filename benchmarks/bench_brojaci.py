@@ -0,0 +1,144 @@
+"""
+Benchmark konkurentnih zaduženja: brojač u širokom redu korisnici naspram uske tabele brojaci_zaduzenja
+
+Više niti (svaka sa svojom konekcijom) naizmenično zadužuje i razdužuje bicikl,
+svaka operacija u zasebnoj transakciji, za:
+  - istog korisnika (sve niti se takmiče za isti red)
+  - različite korisnike (svaka nit ima svog korisnika)
+
+Izveštava broj operacija u sekundi, prosečnu latenciju i udeo HOT ažuriranja.
+Radi u privremenoj šemi bench_brojaci koja se na kraju briše.
+Konekcija se podešava istim environment varijablama kao servisi (DB_HOST, DB_NAME, ...).
+
+Pokretanje (iz korena repozitorijuma):
+    python benchmarks/bench_brojaci.py [--niti 8] [--sekundi 5] [--korisnika 100000]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import psycopg2 # type: ignore
+
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(KOREN, 'CentralBikeShop'))
+
+import central_bike_shop_app as central # noqa: E402
+
+SEMA = 'bench_brojaci'
+
+# Raniji upiti: brojač u širokom redu tabele korisnici
+STARI_ZADUZI = """
+    UPDATE korisnici 
+    SET broj_aktivnih_bicikala = broj_aktivnih_bicikala + 1
+    WHERE jmbg = %s AND broj_aktivnih_bicikala < 2
+    RETURNING id, broj_aktivnih_bicikala
+"""
+STARI_RAZDUZI = """
+    UPDATE korisnici 
+    SET broj_aktivnih_bicikala = broj_aktivnih_bicikala - 1
+    WHERE jmbg = %s AND broj_aktivnih_bicikala > 0
+    RETURNING id, broj_aktivnih_bicikala
+"""
+
+
+def konekcija():
+    conn = psycopg2.connect(**central.DB_CONFIG)
+    conn.cursor().execute(f"SET search_path TO {SEMA}")
+    conn.commit()
+    return conn
+
+
+def pripremi_semu(n):
+    conn = psycopg2.connect(**central.DB_CONFIG)
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SEMA}")
+    cursor.execute(f"SET search_path TO {SEMA}")
+    central.init_db_schema(conn)
+    cursor.execute(f"SET search_path TO {SEMA}")
+    cursor.execute("CREATE INDEX idx_korisnici_created_at ON korisnici(created_at)")
+    cursor.execute("""
+        INSERT INTO korisnici (jmbg, ime, prezime, adresa, broj_aktivnih_bicikala)
+        SELECT lpad(i::text, 13, '0'), 'Marko', 'Petrović', 'Bulevar Oslobođenja 1, Novi Sad', 0
+        FROM generate_series(1, %s) AS i
+    """, (n,))
+    cursor.execute("""
+        INSERT INTO brojaci_zaduzenja (korisnik_id, jmbg, broj_aktivnih_bicikala)
+        SELECT id, jmbg, 0 FROM korisnici
+    """)
+    cursor.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+
+def hot_statistika(tabela):
+    conn = konekcija()
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_stat_force_next_flush()")
+    cursor.execute("""
+        SELECT n_tup_upd, n_tup_hot_upd FROM pg_stat_user_tables
+        WHERE schemaname = %s AND relname = %s
+    """, (SEMA, tabela))
+    upd, hot = cursor.fetchone()
+    conn.close()
+    return upd, hot
+
+
+def pokreni(zaduzi, razduzi, niti, sekundi, isti_korisnik):
+    operacija = [0] * niti
+    latencija = [0.0] * niti
+    kraj = time.perf_counter() + sekundi
+
+    def radnik(indeks):
+        conn = konekcija()
+        cursor = conn.cursor()
+        jmbg = f"{1 if isti_korisnik else indeks + 1:013d}"
+        while time.perf_counter() < kraj:
+            for upit in (zaduzi, razduzi):
+                t0 = time.perf_counter()
+                cursor.execute(upit, (jmbg,))
+                cursor.fetchone()
+                conn.commit()
+                latencija[indeks] += time.perf_counter() - t0
+                operacija[indeks] += 1
+        conn.close()
+
+    radnici = [threading.Thread(target=radnik, args=(i,)) for i in range(niti)]
+    for r in radnici:
+        r.start()
+    for r in radnici:
+        r.join()
+    ukupno = sum(operacija)
+    return ukupno / sekundi, sum(latencija) / max(ukupno, 1) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--niti', type=int, default=8)
+    parser.add_argument('--sekundi', type=float, default=5)
+    parser.add_argument('--korisnika', type=int, default=100000)
+    args = parser.parse_args()
+
+    pripremi_semu(args.korisnika)
+    print(f"{'tabela':<20}{'korisnik':<12}{'op/s':>10}{'latencija [ms]':>16}{'HOT %':>8}")
+    for tabela, zaduzi, razduzi in [
+        ('korisnici', STARI_ZADUZI, STARI_RAZDUZI),
+        ('brojaci_zaduzenja', central.SQL_ZADUZI, central.SQL_RAZDUZI),
+    ]:
+        for isti_korisnik in (True, False):
+            upd0, hot0 = hot_statistika(tabela)
+            ops, lat = pokreni(zaduzi, razduzi, args.niti, args.sekundi, isti_korisnik)
+            upd1, hot1 = hot_statistika(tabela)
+            hot = (hot1 - hot0) / max(upd1 - upd0, 1) * 100
+            print(f"{tabela:<20}{'isti' if isti_korisnik else 'različiti':<12}{ops:>10.0f}{lat:>16.2f}{hot:>8.1f}")
+
+    conn = psycopg2.connect(**central.DB_CONFIG)
+    conn.cursor().execute(f"DROP SCHEMA {SEMA} CASCADE")
+    conn.commit()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
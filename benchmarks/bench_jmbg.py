@@ -0,0 +1,133 @@
+"""
+Benchmark zapisa JMBG-a: VARCHAR(13) naspram BIGINT (JMBG_STORAGE=bigint) i provera JMBG-a u Pythonu
+
+Za oba tipa se pravi tabela sa N korisnika i jedinstvenim indeksom nad jmbg, pa se izveštava:
+  - veličina indeksa i tabele
+  - pretraga po JMBG-u pripremljenom naredbom (jedan upit po pozivu) - op/s i latencija
+Na kraju se meri i proveri_jmbg (samo format i sa kontrolnom cifrom) naspram ranije provere len()/isdigit().
+Radi u privremenoj šemi bench_jmbg koja se na kraju briše.
+Konekcija se podešava istim environment varijablama kao servisi (DB_HOST, DB_NAME, ...).
+
+Pokretanje (iz korena repozitorijuma):
+    python benchmarks/bench_jmbg.py [--korisnika 10000000] [--upita 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+
+import psycopg2 # type: ignore
+
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(KOREN, 'CentralBikeShop'))
+
+import central_bike_shop_app as central # noqa: E402
+
+SEMA = 'bench_jmbg'
+TIPOVI = ['VARCHAR(13)', 'BIGINT']
+# Množenje prostim brojem po modulu 10^13 je bijekcija, pa su JMBG-ovi jedinstveni i rasuti po opsegu
+MNOZILAC = 1000003
+
+
+def jmbg(i):
+    return f"{i * MNOZILAC % 10 ** 13:013d}"
+
+
+def tabela(tip):
+    return 'korisnici_' + tip.split('(')[0].lower()
+
+
+def pripremi_semu(n):
+    conn = psycopg2.connect(**central.DB_CONFIG)
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SEMA}")
+    cursor.execute(f"SET search_path TO {SEMA}")
+    for tip in TIPOVI:
+        t0 = time.perf_counter()
+        cursor.execute(f"""
+            CREATE TABLE {tabela(tip)} (
+                id SERIAL PRIMARY KEY,
+                jmbg {tip} NOT NULL,
+                ime VARCHAR(50) NOT NULL,
+                prezime VARCHAR(50) NOT NULL
+            )
+        """)
+        izraz = f"mod(i * {MNOZILAC}, 10000000000000)"
+        vrednost = izraz if tip == 'BIGINT' else f"lpad({izraz}::text, 13, '0')"
+        cursor.execute(f"""
+            INSERT INTO {tabela(tip)} (jmbg, ime, prezime)
+            SELECT {vrednost}, 'Marko', 'Petrović'
+            FROM generate_series(1::bigint, %s) AS i
+        """, (n,))
+        cursor.execute(f"ALTER TABLE {tabela(tip)} ADD CONSTRAINT {tabela(tip)}_jmbg_key UNIQUE (jmbg)")
+        cursor.execute(f"ANALYZE {tabela(tip)}")
+        conn.commit()
+        print(f"{tabela(tip)}: {n} redova za {time.perf_counter() - t0:.1f} s")
+    conn.close()
+
+
+def velicine(cursor, tip):
+    cursor.execute("""
+        SELECT pg_relation_size(%s::regclass), pg_relation_size(%s::regclass)
+    """, (f"{SEMA}.{tabela(tip)}_jmbg_key", f"{SEMA}.{tabela(tip)}"))
+    return cursor.fetchone()
+
+
+def pretraga(cursor, tip, kljucevi):
+    cursor.execute(f"PREPARE pretraga_{tabela(tip)} AS SELECT id FROM {tabela(tip)} WHERE jmbg = $1")
+    # Zagrevanje keša (indeks treba da bude u shared_buffers/OS kešu za oba tipa podjednako)
+    for kljuc in kljucevi[:1000]:
+        cursor.execute(f"EXECUTE pretraga_{tabela(tip)}(%s)", (kljuc,))
+        cursor.fetchone()
+    t0 = time.perf_counter()
+    for kljuc in kljucevi:
+        cursor.execute(f"EXECUTE pretraga_{tabela(tip)}(%s)", (kljuc,))
+        assert cursor.fetchone() is not None
+    trajanje = time.perf_counter() - t0
+    return len(kljucevi) / trajanje, trajanje / len(kljucevi) * 1e6
+
+
+def stara_provera(vrednost):
+    return len(vrednost) == 13 and vrednost.isdigit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--korisnika', type=int, default=10000000)
+    parser.add_argument('--upita', type=int, default=100000)
+    args = parser.parse_args()
+
+    pripremi_semu(args.korisnika)
+
+    conn = psycopg2.connect(**central.DB_CONFIG)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute(f"SET search_path TO {SEMA}")
+    kljucevi = [jmbg(random.randint(1, args.korisnika)) for _ in range(args.upita)]
+
+    print(f"\n{'tip':<14}{'indeks [MB]':>12}{'tabela [MB]':>13}{'pretraga op/s':>15}{'latencija [µs]':>16}")
+    for tip in TIPOVI:
+        indeks, podaci = velicine(cursor, tip)
+        ops, latencija = pretraga(cursor, tip, kljucevi)
+        print(f"{tip:<14}{indeks / 2 ** 20:>12.1f}{podaci / 2 ** 20:>13.1f}{ops:>15.0f}{latencija:>16.1f}")
+
+    cursor.execute(f"DROP SCHEMA {SEMA} CASCADE")
+    conn.close()
+
+    print(f"\n{'provera JMBG-a':<36}{'ns/poziv':>10}")
+    vrednost = '0101990710008'
+    for naziv, funkcija in [
+        ('len()/isdigit() (ranije)', lambda: stara_provera(vrednost)),
+        ('proveri_jmbg (format)', lambda: central.proveri_jmbg(vrednost)),
+        ('proveri_jmbg (kontrolna cifra)', lambda: central.proveri_jmbg(vrednost, True)),
+    ]:
+        broj = 200000
+        trajanje = min(timeit.repeat(funkcija, number=broj, repeat=3))
+        print(f"{naziv:<36}{trajanje / broj * 1e9:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark pripremljenih naredbi (PREPARE/EXECUTE) naspram tekstualnih upita
+
+Za naredbe sa vruće putanje centralne biciklane (lookup po JMBG-u i brojači) meri:
+  - prosečno vreme poziva sa klijenta (tekstualni upit naspram EXECUTE)
+  - prosečno vreme planiranja na serveru (Planning Time iz EXPLAIN ANALYZE)
+
+Koristi privremenu tabelu i poništava sve izmene, pa je bezbedno pokretati nad bilo kojom bazom.
+Konekcija se podešava istim environment varijablama kao servisi (DB_HOST, DB_NAME, ...).
+
+Pokretanje (iz korena repozitorijuma):
+    python benchmarks/bench_prepared.py [--redova 100000] [--poziva 5000]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import psycopg2 # type: ignore
+
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(KOREN, 'CentralBikeShop'))
+
+import central_bike_shop_app as central # noqa: E402
+
+NAREDBE = ['korisnik_id', 'stanje_korisnika', 'zaduzi', 'razduzi']
+
+
+def pripremi_tabelu(conn, n):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE korisnici (
+            id SERIAL PRIMARY KEY,
+            jmbg VARCHAR(13) UNIQUE NOT NULL,
+            ime VARCHAR(50) NOT NULL,
+            prezime VARCHAR(50) NOT NULL,
+            adresa TEXT NOT NULL,
+            broj_aktivnih_bicikala INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO korisnici (jmbg, ime, prezime, adresa, broj_aktivnih_bicikala)
+        SELECT lpad(i::text, 13, '0'), 'Marko', 'Petrović', 'Bulevar Oslobođenja 1, Novi Sad', 1
+        FROM generate_series(1, %s) AS i
+    """, (n,))
+    cursor.execute("""
+        CREATE TEMP TABLE brojaci_zaduzenja AS
+        SELECT id AS korisnik_id, jmbg, broj_aktivnih_bicikala FROM korisnici
+    """)
+    cursor.execute("ALTER TABLE brojaci_zaduzenja ADD PRIMARY KEY (korisnik_id), ADD UNIQUE (jmbg)")
+    cursor.execute("ANALYZE korisnici")
+    cursor.execute("ANALYZE brojaci_zaduzenja")
+    conn.commit()
+    cursor.close()
+
+
+def vreme_planiranja(cursor, upit, params):
+    """Planning Time (ms) iz EXPLAIN ANALYZE; izmene se poništavaju pozivaocem"""
+    cursor.execute("EXPLAIN (ANALYZE, SUMMARY) " + upit, params)
+    plan = "\n".join(red[0] for red in cursor.fetchall())
+    return float(re.search(r"Planning Time: ([\d.]+) ms", plan).group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--redova', type=int, default=100000)
+    parser.add_argument('--poziva', type=int, default=5000)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(connection_factory=central.PreparedConnection, **central.DB_CONFIG)
+    pripremi_tabelu(conn, args.redova)
+    cursor = conn.cursor()
+    jmbgovi = [(f"{(i * 7919) % args.redova + 1:013d}",) for i in range(args.poziva)]
+
+    print(f"{'naredba':<20}{'tekst [µs]':>12}{'EXECUTE [µs]':>14}{'plan tekst [ms]':>17}{'plan EXECUTE [ms]':>19}")
+    for naziv in NAREDBE:
+        upit = central.PREPARED_STATEMENTS[naziv]
+        t0 = time.perf_counter()
+        for params in jmbgovi:
+            cursor.execute(upit, params)
+        tekst = (time.perf_counter() - t0) / args.poziva * 1e6
+        conn.rollback()
+
+        t0 = time.perf_counter()
+        for params in jmbgovi:
+            central.execute_prepared(cursor, naziv, params)
+        pripremljeno = (time.perf_counter() - t0) / args.poziva * 1e6
+        conn.rollback()
+
+        plan_tekst = vreme_planiranja(cursor, upit, jmbgovi[0])
+        plan_execute = vreme_planiranja(cursor, f"EXECUTE {naziv} (%s)", jmbgovi[0])
+        conn.rollback()
+
+        print(f"{naziv:<20}{tekst:>12.1f}{pripremljeno:>14.1f}{plan_tekst:>17.3f}{plan_execute:>19.3f}")
+
+    cursor.close()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark alokacija: RealDictCursor naspram tuple/namedtuple redova
+
+Poredi memoriju koju zauzimaju dohvaćeni redovi i vreme pojedinačnih
+lookup-a po JMBG-u (vruća putanja proveri-zaduzenje) za:
+  - RealDictCursor (dict po redu, kao ranije u svim handler-ima)
+  - običan kursor (tuple po redu)
+  - običan kursor + namedtuple (fetch_one sa row_type)
+
+Koristi privremenu tabelu, pa je bezbedno pokretati nad bilo kojom bazom.
+Konekcija se podešava istim environment varijablama kao servisi (DB_HOST, DB_NAME, ...).
+
+Pokretanje (iz korena repozitorijuma):
+    python benchmarks/bench_redovi.py [--redova 100000] [--lookup 20000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import psycopg2 # type: ignore
+from psycopg2.extras import RealDictCursor # type: ignore
+
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(KOREN, 'CentralBikeShop'))
+
+import central_bike_shop_app as central # noqa: E402
+
+
+def pripremi_tabelu(conn, n):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE korisnici (
+            id SERIAL PRIMARY KEY,
+            jmbg VARCHAR(13) UNIQUE NOT NULL,
+            ime VARCHAR(50) NOT NULL,
+            prezime VARCHAR(50) NOT NULL,
+            adresa TEXT NOT NULL,
+            broj_aktivnih_bicikala INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO korisnici (jmbg, ime, prezime, adresa, broj_aktivnih_bicikala)
+        SELECT lpad(i::text, 13, '0'), 'Marko', 'Petrović', 'Bulevar Oslobođenja 1, Novi Sad', i %% 3
+        FROM generate_series(1, %s) AS i
+    """, (n,))
+    cursor.execute("""
+        CREATE TEMP TABLE brojaci_zaduzenja AS
+        SELECT id AS korisnik_id, jmbg, broj_aktivnih_bicikala FROM korisnici
+    """)
+    cursor.execute("ALTER TABLE brojaci_zaduzenja ADD PRIMARY KEY (korisnik_id), ADD UNIQUE (jmbg)")
+    conn.commit()
+    cursor.close()
+
+
+def izmeri_fetchall(conn, cursor_factory, row_type):
+    """Memorija (bajtova po redu) koju zauzimaju svi dohvaćeni redovi"""
+    cursor = conn.cursor(cursor_factory=cursor_factory) if cursor_factory else conn.cursor()
+    tracemalloc.start()
+    cursor.execute("SELECT id, ime, prezime, broj_aktivnih_bicikala FROM korisnici")
+    redovi = cursor.fetchall()
+    if row_type is not None:
+        redovi = [row_type._make(red) for red in redovi]
+    zauzeto, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cursor.close()
+    return zauzeto / max(len(redovi), 1)
+
+
+def izmeri_lookup(conn, cursor_factory, row_type, n, broj_lookup):
+    """Prosečno vreme (µs) jednog lookup-a po JMBG-u"""
+    cursor = conn.cursor(cursor_factory=cursor_factory) if cursor_factory else conn.cursor()
+    jmbgovi = [f"{(i * 7919) % n + 1:013d}" for i in range(broj_lookup)]
+    t0 = time.perf_counter()
+    for jmbg in jmbgovi:
+        if cursor_factory:
+            cursor.execute(central.SQL_STANJE_KORISNIKA, (jmbg,))
+            cursor.fetchone()
+        else:
+            central.fetch_one(cursor, central.SQL_STANJE_KORISNIKA, (jmbg,), row_type)
+    trajanje = time.perf_counter() - t0
+    cursor.close()
+    return trajanje / broj_lookup * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--redova', type=int, default=100000)
+    parser.add_argument('--lookup', type=int, default=20000)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**central.DB_CONFIG)
+    pripremi_tabelu(conn, args.redova)
+
+    varijante = [
+        ('RealDictCursor', RealDictCursor, None),
+        ('tuple', None, None),
+        ('namedtuple', None, central.KorisnikStanje),
+    ]
+    print(f"{'varijanta':<16}{'bajtova/red':>14}{'lookup [µs]':>14}")
+    for naziv, cursor_factory, row_type in varijante:
+        po_redu = izmeri_fetchall(conn, cursor_factory, row_type)
+        lookup = izmeri_lookup(conn, cursor_factory, row_type, args.redova, args.lookup)
+        print(f"{naziv:<16}{po_redu:>14.0f}{lookup:>14.1f}")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
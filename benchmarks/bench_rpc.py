@@ -0,0 +1,137 @@
+"""
+Benchmark poziva grad -> centrala: JSON API naspram internog msgpack RPC-a (INTERNAL_RPC=msgpack)
+
+Više niti poziva centralu preko posalji_centrali iz aplikacije grada (ista putanja kao rute grada) za:
+  - json-nova-konekcija - javni JSON API, nova HTTP konekcija po pozivu (ranija putanja), radi poređenja
+  - json                - javni JSON API preko zajedničke trajne sesije centrala_http
+  - msgpack             - interni RPC (POST /rpc) preko RpcKlijent-a - trajne konekcije i serije poziva
+Operacije: provera prava na zaduženje i par zaduženje + razduženje (dva poziva, brojač se vraća na početno stanje).
+Sve niti koriste istog korisnika, pa se uz više niti deo zaduženja odbija zbog limita od 2 bicikla (kolona greške).
+
+Izveštava pozive u sekundi, prosečnu i p99 latenciju poziva, CPU klijenta po pozivu i, uz --pid, CPU procesa
+centrale po pozivu (iz /proc, samo Linux), kao i prosečan broj poziva po RPC zahtevu.
+Centrala mora da radi na CENTRAL_URL (podrazumevano http://localhost:5000); korisnik za pozive se zadaje sa --jmbg,
+a inače se uzima prvi korisnik iz GET /korisnici.
+
+Pokretanje (iz korena repozitorijuma):
+    python benchmarks/bench_rpc.py [--niti 1 8] [--sekundi 5] [--jmbg 0101990710008] [--pid <pid centrale>]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import requests
+
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(KOREN, 'BikeShopNoviSad'))
+
+import bike_shop_novi_sad_app as grad # noqa: E402
+
+TAKT = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def cpu_procesa(pid):
+    """Ukupno CPU vreme procesa (user + system) u sekundama, iz /proc/<pid>/stat"""
+    with open(f"/proc/{pid}/stat") as f:
+        polja = f.read().rsplit(')', 1)[1].split()
+    return (int(polja[11]) + int(polja[12])) / TAKT
+
+
+def operacije(jmbg):
+    provera = [('/korisnici/proveri-zaduzenje', {'jmbg': jmbg})]
+    zaduzenje = [
+        ('/korisnici/zaduzi-bicikl', {'jmbg': jmbg}),
+        ('/korisnici/razduzi-bicikl', {'jmbg': jmbg}),
+    ]
+    return {'provera': provera, 'zaduzenje+razduzenje': zaduzenje}
+
+
+def json_nova_konekcija(endpoint, data):
+    """JSON API sa novom HTTP konekcijom po pozivu"""
+    try:
+        return requests.post(f"{grad.CENTRAL_URL}{endpoint}", json=data, timeout=10).json()
+    except requests.exceptions.RequestException:
+        return None
+
+
+def pokreni(posalji, pozivi, niti, sekundi, pid):
+    latencije = [[] for _ in range(niti)]
+    greske = [0] * niti
+    kraj = time.perf_counter() + sekundi
+
+    def radnik(i):
+        while time.perf_counter() < kraj:
+            for endpoint, data in pozivi:
+                t0 = time.perf_counter()
+                odgovor = posalji(endpoint, data)
+                latencije[i].append(time.perf_counter() - t0)
+                if not isinstance(odgovor, dict) or not odgovor.get('success'):
+                    greske[i] += 1
+
+    cpu0, server0 = time.process_time(), cpu_procesa(pid) if pid else None
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=radnik, args=(i,)) for i in range(niti)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    trajanje = time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+    server = cpu_procesa(pid) - server0 if pid else None
+
+    sve = sorted(l for niz in latencije for l in niz)
+    broj = len(sve)
+    return {
+        'ops': broj / trajanje,
+        'prosek': sum(sve) / broj * 1e6,
+        'p99': sve[min(broj - 1, int(broj * 0.99))] * 1e6,
+        'cpu': cpu / broj * 1e6,
+        'server': server / broj * 1e6 if server is not None else None,
+        'greske': sum(greske),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--niti', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--sekundi', type=float, default=5)
+    parser.add_argument('--jmbg')
+    parser.add_argument('--pid', type=int, help='PID procesa centrale (CPU servera po pozivu)')
+    args = parser.parse_args()
+
+    if grad.msgpack is None:
+        sys.exit("msgpack nije instaliran (pip install msgpack)")
+    jmbg = args.jmbg
+    if not jmbg:
+        jmbg = requests.get(f"{grad.CENTRAL_URL}/korisnici", timeout=10).json()['users'][0]['jmbg']
+
+    rpc = grad.RpcKlijent()
+    rpc.start()
+    varijante = [
+        ('json-nova-konekcija', None, json_nova_konekcija),
+        ('json', None, grad.posalji_centrali),
+        ('msgpack', rpc, grad.posalji_centrali),
+    ]
+
+    print(f"centrala {grad.CENTRAL_URL}, korisnik {jmbg}\n")
+    print(f"{'operacija':<22}{'niti':>5}{'putanja':>21}{'poziva/s':>10}{'prosek [µs]':>13}{'p99 [µs]':>10}"
+          f"{'CPU kl. [µs]':>14}{'CPU c. [µs]':>13}{'poziva/zahtev':>15}{'greške':>8}")
+    for naziv, pozivi in operacije(jmbg).items():
+        for niti in args.niti:
+            for putanja, klijent, posalji in varijante:
+                grad.rpc_klijent = klijent
+                pre = dict(rpc.stats)
+                r = pokreni(posalji, pozivi, niti, args.sekundi, args.pid)
+                po_zahtevu = ''
+                zahteva = rpc.stats['zahtevi'] - pre['zahtevi']
+                if klijent is not None and zahteva:
+                    po_zahtevu = f"{(rpc.stats['pozivi'] - pre['pozivi']) / zahteva:.2f}"
+                server = f"{r['server']:.0f}" if r['server'] is not None else '-'
+                print(f"{naziv:<22}{niti:>5}{putanja:>21}{r['ops']:>10.0f}{r['prosek']:>13.0f}{r['p99']:>10.0f}"
+                      f"{r['cpu']:>14.0f}{server:>13}{po_zahtevu:>15}{r['greske']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Mikro-benchmark serijalizacije odgovora za GET /korisnici i GET /zaduzenja
+
+Meri pripremu redova iz baze (RealDictRow) i generisanje JSON tela odgovora
+za standardni Flask enkoder i za orjson (JSON_ENCODER=orjson).
+
+Pokretanje (iz korena repozitorijuma):
+    python benchmarks/bench_serijalizacija.py
+    python benchmarks/bench_serijalizacija.py --redova 1000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from psycopg2.extras import RealDictRow # type: ignore
+
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(KOREN, 'CentralBikeShop'))
+sys.path.insert(0, os.path.join(KOREN, 'BikeShopNoviSad'))
+
+import central_bike_shop_app as central # noqa: E402
+import bike_shop_novi_sad_app as grad # noqa: E402
+
+
+def generisi_korisnike(n):
+    """Sintetički redovi kakve vraća SELECT iz get_all_users"""
+    pocetak = datetime(2025, 1, 1, 8, 0, 0)
+    return [RealDictRow([
+        ('id', i),
+        ('jmbg', f"{1000000000000 + i:013d}"),
+        ('ime', 'Marko'),
+        ('prezime', 'Petrović'),
+        ('adresa', 'Bulevar Oslobođenja 1, Novi Sad'),
+        ('broj_aktivnih_bicikala', i % 3),
+        ('created_at', pocetak + timedelta(seconds=i)),
+    ]) for i in range(n)]
+
+
+def generisi_zaduzenja(n):
+    """Sintetički redovi kakve vraća SELECT iz get_zaduzenja"""
+    pocetak = datetime(2025, 1, 1, 8, 0, 0)
+    redovi = []
+    for i in range(n):
+        razduzen = i % 2 == 0
+        redovi.append(RealDictRow([
+            ('id', i),
+            ('jmbg', f"{1000000000000 + i:013d}"),
+            ('ime', 'Ana'),
+            ('prezime', 'Jovanović'),
+            ('oznaka_bicikla', f"NS{i:06d}"),
+            ('tip_bicikla', 'Gradski'),
+            ('datum_zaduzivanja', date(2025, 1, 1) + timedelta(days=i % 365)),
+            ('datum_razduzivanja', date(2025, 1, 2) + timedelta(days=i % 365) if razduzen else None),
+            ('status', 'razduzen' if razduzen else 'aktivan'),
+            ('created_at', pocetak + timedelta(seconds=i)),
+        ]))
+    return redovi
+
+
+def postavi_enkoder(modul, naziv):
+    """Prebacuje modul aplikacije na zadati JSON enkoder"""
+    modul.JSON_ENCODER = naziv
+    if naziv == 'orjson':
+        modul.app.json = modul.OrjsonProvider(modul.app)
+    else:
+        modul.app.json = modul.app.json_provider_class(modul.app)
+
+
+def izmeri(fn, ponavljanja):
+    """Najbolje vreme (u sekundama) od zadatog broja ponavljanja"""
+    najbolje = None
+    for _ in range(ponavljanja):
+        t0 = time.perf_counter()
+        fn()
+        trajanje = time.perf_counter() - t0
+        najbolje = trajanje if najbolje is None else min(najbolje, trajanje)
+    return najbolje
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--redova', type=int, nargs='+', default=[1000, 100000, 1000000])
+    args = parser.parse_args()
+
+    enkoderi = ['standard'] + (['orjson'] if central.orjson is not None else [])
+    print(f"{'endpoint':<16}{'redova':>10}{'enkoder':>10}{'vreme [ms]':>14}{'bajtova':>14}")
+
+    for n in args.redova:
+        ponavljanja = 5 if n <= 100000 else 2
+        slucajevi = [
+            ('/korisnici', central, generisi_korisnike(n),
+             lambda m, redovi: {"success": True, "users": m.pripremi_korisnike(redovi)}),
+            ('/zaduzenja', grad, generisi_zaduzenja(n),
+             lambda m, redovi: {"success": True, "grad": m.GRAD_NAZIV, "zaduzenja": m.pripremi_zaduzenja(redovi)}),
+        ]
+        for endpoint, modul, redovi, telo in slucajevi:
+            for enkoder in enkoderi:
+                postavi_enkoder(modul, enkoder)
+                with modul.app.app_context():
+                    velicina = len(modul.app.json.dumps(telo(modul, redovi)))
+                    trajanje = izmeri(lambda: modul.app.json.dumps(telo(modul, redovi)), ponavljanja)
+                print(f"{endpoint:<16}{n:>10}{enkoder:>10}{trajanje * 1000:>14.1f}{velicina:>14}")
+
+
+if __name__ == '__main__':
+    main()
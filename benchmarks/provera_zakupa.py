@@ -0,0 +1,289 @@
+"""
+Provera protokola zakupa kvote: korisnik nikada nema više od 2 odobrena zaduženja
+
+  1. aritmetika limita zakupa (limit_zakupa) nad tabelom slučajeva
+  2. scenariji preko ruta centrale (Flask test klijent): dodela zakupa (/zakupi), sinhrono zaduženje
+     (/korisnici/zaduzi-bicikl, sa zaduzi_uz_zakupe kada korisnik ima zakupe) i događaji gradova (/zakupi/dogadjaji)
+  3. trka: dva grada zadužuju po zakupu (do limita, zatim javljaju događaje) dok treći istovremeno zadužuje
+     sinhrono preko centrale; zbir odobrenih zaduženja ne sme preći 2, a brojač centrale posle događaja
+     mora biti jednak tom zbiru
+
+Radi u privremenoj šemi provera_zakupa koja se na kraju briše (search_path se zadaje preko PGOPTIONS,
+pa ga dobijaju i konekcije iz pool-a centrale). Konekcija se podešava istim environment varijablama kao
+servisi (DB_HOST, DB_NAME, ...). Izlazni kod je 1 ako neka provera ne prođe.
+
+Pokretanje (iz korena repozitorijuma):
+    python benchmarks/provera_zakupa.py [--krugova 200]
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import threading
+
+import psycopg2 # type: ignore
+
+SEMA = 'provera_zakupa'
+os.environ['PGOPTIONS'] = f"{os.environ.get('PGOPTIONS', '')} -c search_path={SEMA}".strip()
+os.environ.setdefault('WARMUP', 'false')
+
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(KOREN, 'CentralBikeShop'))
+
+import central_bike_shop_app as central # noqa: E402
+
+JMBG = '0101990710008'
+GRADOVI_ZAKUPA = ('Novi Sad', 'Subotica')
+GRAD_SINHRONO = 'Kragujevac'
+
+# (broj_aktivnih, u_gradu, rezervisano, opozvan) -> (limit, u_drugim_gradovima, opozvan)
+SLUCAJEVI_LIMITA = [
+    ((0, 0, 0, False), (2, 0, False)),
+    ((1, 1, 0, False), (2, 0, False)),  # sopstvena zaduženja grada ne umanjuju limit
+    ((1, 0, 0, False), (1, 1, False)),
+    ((2, 0, 0, False), (0, 2, False)),
+    ((0, 0, 2, False), (0, 0, False)),  # ceo limit drži zakup drugog grada
+    ((0, 0, 1, False), (1, 0, False)),
+    ((1, 0, 1, False), (0, 1, False)),
+    ((2, 2, 0, False), (2, 0, False)),
+    ((0, 0, 0, True), (2, 0, False)),   # opozvan zakup bez aktivnih zaduženja se vraća
+    ((1, 1, 0, True), (1, 0, True)),    # opozvan zakup drži samo zaduženja koja grad već ima
+    ((1, 0, 0, True), (0, 1, True)),
+    ((0, 1, 0, False), (2, 0, False)),  # indeks ispred brojača (događaj još nije primenjen)
+]
+
+greske = []
+brojac_dogadjaja = itertools.count(1)
+
+
+def proveri(uslov, opis):
+    if not uslov:
+        greske.append(opis)
+        print(f"  GREŠKA: {opis}")
+
+
+def pripremi_semu():
+    conn = psycopg2.connect(**central.DB_CONFIG)
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SEMA}")
+    central.init_db_schema(conn)
+    cursor.execute("""
+        INSERT INTO korisnici (jmbg, ime, prezime, adresa, broj_aktivnih_bicikala)
+        VALUES (%s, 'Marko', 'Petrović', 'Bulevar Oslobođenja 1, Novi Sad', 0)
+        RETURNING id
+    """, (JMBG,))
+    cursor.execute("""
+        INSERT INTO brojaci_zaduzenja (korisnik_id, jmbg, broj_aktivnih_bicikala)
+        SELECT id, jmbg, 0 FROM korisnici
+    """)
+    conn.commit()
+    conn.close()
+
+
+def obrisi_semu():
+    conn = psycopg2.connect(**central.DB_CONFIG)
+    conn.cursor().execute(f"DROP SCHEMA IF EXISTS {SEMA} CASCADE")
+    conn.commit()
+    conn.close()
+
+
+def resetuj_korisnika():
+    conn = psycopg2.connect(**central.DB_CONFIG)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM zakupi")
+    cursor.execute("DELETE FROM zakupi_smanjenja")
+    cursor.execute("DELETE FROM aktivna_zaduzenja")
+    cursor.execute("UPDATE brojaci_zaduzenja SET broj_aktivnih_bicikala = 0, zakup_do = NULL")
+    conn.commit()
+    conn.close()
+
+
+def stanje_centrale():
+    conn = psycopg2.connect(**central.DB_CONFIG)
+    cursor = conn.cursor()
+    cursor.execute("SELECT broj_aktivnih_bicikala FROM brojaci_zaduzenja WHERE jmbg = %s", (JMBG,))
+    broj = cursor.fetchone()[0]
+    cursor.execute("SELECT count(*) FROM aktivna_zaduzenja WHERE jmbg = %s", (JMBG,))
+    u_indeksu = cursor.fetchone()[0]
+    conn.close()
+    return broj, u_indeksu
+
+
+def istekni_smanjenja():
+    """Smanjene i ukinute dodele zakupa ističu (sa LEASE_GRACE)"""
+    conn = psycopg2.connect(**central.DB_CONFIG)
+    conn.cursor().execute("""
+        UPDATE zakupi_smanjenja SET istice = LOCALTIMESTAMP - make_interval(secs => %s + 1)
+    """, (central.LEASE_GRACE,))
+    conn.commit()
+    conn.close()
+
+
+def zakup(klijent, grad):
+    """Obnova zakupa grada za korisnika; vraća limit zakupa"""
+    odgovor = klijent.post('/zakupi', json={'grad': grad, 'jmbg': [JMBG]})
+    assert odgovor.status_code == 200, odgovor.get_data(as_text=True)
+    return odgovor.get_json()['zakupi'][0]['limit']
+
+
+def zaduzi_sinhrono(klijent, grad, oznaka):
+    odgovor = klijent.post('/korisnici/zaduzi-bicikl', json={
+        'jmbg': JMBG, 'grad': grad, 'oznaka_bicikla': oznaka, 'datum_zaduzivanja': '2025-09-16'
+    })
+    assert odgovor.status_code in (200, 201, 400), odgovor.get_data(as_text=True)
+    return odgovor.status_code != 400
+
+
+def javi(klijent, grad, vrsta, oznake):
+    odgovor = klijent.post('/zakupi/dogadjaji', json={'grad': grad, 'dogadjaji': [
+        {'id': next(brojac_dogadjaja), 'vrsta': vrsta, 'jmbg': JMBG, 'oznaka_bicikla': oznaka,
+         'datum_zaduzivanja': '2025-09-16'}
+        for oznaka in oznake
+    ]})
+    assert odgovor.status_code == 200, odgovor.get_data(as_text=True)
+
+
+def proveri_aritmetiku():
+    print("Aritmetika limita zakupa")
+    for ulaz, ocekivano in SLUCAJEVI_LIMITA:
+        dobijeno = central.limit_zakupa(*ulaz)
+        proveri(dobijeno == ocekivano, f"limit_zakupa{ulaz} = {dobijeno}, očekivano {ocekivano}")
+    # Zbir limita koje dobijaju gradovi redom (svaki vidi rezervu prethodnih) nikada ne prelazi 2
+    for broj_aktivnih in range(3):
+        rezervisano = 0
+        for _ in range(3):
+            limit, _, _ = central.limit_zakupa(broj_aktivnih, 0, rezervisano, False)
+            rezervisano += limit
+        proveri(broj_aktivnih + rezervisano <= 2,
+                f"zakupi tri grada uz {broj_aktivnih} zaduženja rezervišu {rezervisano}")
+
+
+def proveri_scenarije(klijent):
+    print("Scenariji preko ruta centrale")
+    resetuj_korisnika()
+    proveri(zakup(klijent, 'Novi Sad') == 2, "prvi zakup dobija ceo limit")
+    proveri(zakup(klijent, 'Subotica') == 0, "drugi grad ne dobija deo limita koji drži prvi zakup")
+    proveri(not zaduzi_sinhrono(klijent, GRAD_SINHRONO, 'KG001'),
+            "sinhrono zaduženje se odbija dok zakup drži ceo limit")
+    proveri(stanje_centrale() == (0, 0), "odbijeno zaduženje ne menja brojač ni indeks")
+
+    resetuj_korisnika()
+    proveri(zaduzi_sinhrono(klijent, GRAD_SINHRONO, 'KG001'), "sinhrono zaduženje bez zakupa prolazi")
+    proveri(zakup(klijent, 'Novi Sad') == 1, "zakup posle jednog zaduženja u drugom gradu dobija 1")
+    proveri(zakup(klijent, 'Subotica') == 0, "treći grad ne dobija ništa")
+    proveri(not zaduzi_sinhrono(klijent, GRAD_SINHRONO, 'KG002'),
+            "drugo sinhrono zaduženje se odbija zbog rezerve zakupa")
+
+    resetuj_korisnika()
+    zakup(klijent, 'Novi Sad')
+    javi(klijent, 'Novi Sad', 'zaduzenje', ['NS001'])
+    proveri(stanje_centrale() == (1, 1), "događaj zaduženja iz zakupa ulazi u brojač i indeks")
+    proveri(zakup(klijent, 'Novi Sad') == 2, "sopstveno zaduženje grada ne umanjuje njegov zakup")
+    proveri(not zaduzi_sinhrono(klijent, GRAD_SINHRONO, 'KG001'),
+            "sinhrono zaduženje se odbija dok zakup drži preostali deo limita")
+    javi(klijent, 'Novi Sad', 'razduzenje', ['NS001'])
+    proveri(stanje_centrale() == (0, 0), "razduženje iz zakupa vraća brojač")
+
+    resetuj_korisnika()
+    proveri(zaduzi_sinhrono(klijent, GRAD_SINHRONO, 'KG001'), "sinhrono zaduženje prolazi")
+    javi(klijent, GRAD_SINHRONO, 'ponistavanje', ['KG009'])
+    proveri(stanje_centrale() == (1, 1), "poništavanje nepoznatog zaduženja je bez efekta")
+    javi(klijent, GRAD_SINHRONO, 'ponistavanje', ['KG001'])
+    proveri(stanje_centrale() == (0, 0), "poništavanje upisanog zaduženja vraća brojač i indeks")
+
+    # Grad do primene odgovora obnove koristi stare limite, pa smanjen ili ukinut zakup ostaje rezervisan do isteka
+    resetuj_korisnika()
+    zakup(klijent, 'Novi Sad')
+    javi(klijent, 'Novi Sad', 'zaduzenje', ['NS001'])
+    proveri(not zaduzi_sinhrono(klijent, GRAD_SINHRONO, 'KG001'), "sinhrono zaduženje opoziva zakup")
+    proveri(zakup(klijent, 'Novi Sad') == 1, "opozvan zakup se smanjuje na zaduženja grada")
+    proveri(not zaduzi_sinhrono(klijent, GRAD_SINHRONO, 'KG001'),
+            "smanjen zakup drži stari limit do isteka stare dodele")
+    istekni_smanjenja()
+    proveri(zaduzi_sinhrono(klijent, GRAD_SINHRONO, 'KG001'), "posle isteka stare dodele važi smanjen limit")
+    proveri(stanje_centrale() == (2, 2), "brojač i indeks posle smanjenja zakupa")
+
+    resetuj_korisnika()
+    zakup(klijent, 'Novi Sad')
+    odgovor = klijent.post('/zakupi', json={'grad': 'Novi Sad', 'jmbg': []})
+    proveri(odgovor.get_json()['ukinuto'] == 1, "zakup korisnika koji nije u obnovi se ukida")
+    proveri(not zaduzi_sinhrono(klijent, GRAD_SINHRONO, 'KG001'), "ukinut zakup drži limit do isteka")
+    istekni_smanjenja()
+    proveri(zaduzi_sinhrono(klijent, GRAD_SINHRONO, 'KG001'), "posle isteka ukinutog zakupa zaduženje prolazi")
+
+
+def krug(krug_broj):
+    """Jedan krug trke; vraća broj odobrenih zaduženja po gradu"""
+    resetuj_korisnika()
+    odobreno = {}
+    start = threading.Barrier(len(GRADOVI_ZAKUPA) + 1)
+
+    def grad_sa_zakupom(grad):
+        klijent = central.app.test_client()
+        start.wait()
+        limit = zakup(klijent, grad)
+        # Grad zadužuje lokalno dok ima mesta u zakupu, a centrali javlja tek posle (outbox)
+        oznake = [f"{grad[:2].upper()}{krug_broj}-{i}" for i in range(limit)]
+        odobreno[grad] = len(oznake)
+        if oznake:
+            javi(klijent, grad, 'zaduzenje', oznake)
+
+    def grad_sinhrono():
+        klijent = central.app.test_client()
+        start.wait()
+        odobreno[GRAD_SINHRONO] = sum(
+            zaduzi_sinhrono(klijent, GRAD_SINHRONO, f"KG{krug_broj}-{i}") for i in range(2)
+        )
+
+    niti = [threading.Thread(target=grad_sa_zakupom, args=(grad,)) for grad in GRADOVI_ZAKUPA]
+    niti.append(threading.Thread(target=grad_sinhrono))
+    random.shuffle(niti)
+    for nit in niti:
+        nit.start()
+    for nit in niti:
+        nit.join()
+    return odobreno
+
+
+def proveri_trku(krugova):
+    print(f"Trka zakupa i sinhronih zaduženja ({krugova} krugova)")
+    raspodele = {}
+    for i in range(krugova):
+        odobreno = krug(i)
+        ukupno = sum(odobreno.values())
+        proveri(ukupno <= 2, f"krug {i}: odobreno {ukupno} zaduženja {odobreno}")
+        broj, u_indeksu = stanje_centrale()
+        proveri(broj == ukupno and u_indeksu == ukupno,
+                f"krug {i}: brojač {broj}, indeks {u_indeksu}, odobreno {ukupno} {odobreno}")
+        kljuc = tuple(odobreno.get(grad, 0) for grad in GRADOVI_ZAKUPA + (GRAD_SINHRONO,))
+        raspodele[kljuc] = raspodele.get(kljuc, 0) + 1
+    print("  raspodele (" + ", ".join(GRADOVI_ZAKUPA + (GRAD_SINHRONO,)) + "): "
+          + ", ".join(f"{k}: {v}" for k, v in sorted(raspodele.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--krugova', type=int, default=200)
+    args = parser.parse_args()
+
+    proveri_aritmetiku()
+    pripremi_semu()
+    try:
+        klijent = central.app.test_client()
+        proveri_scenarije(klijent)
+        proveri_trku(args.krugova)
+    finally:
+        if central.db_pool.pool is not None:
+            central.db_pool.pool.closeall()
+        obrisi_semu()
+
+    if greske:
+        print(f"\nNije prošlo {len(greske)} provera")
+        sys.exit(1)
+    print("\nSve provere su prošle")
+
+
+if __name__ == '__main__':
+    main()
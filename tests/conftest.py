@@ -0,0 +1,15 @@
+"""
+Zajednička podešavanja testova: servisi se uvoze kao moduli iz svojih direktorijuma (kao u benchmarks/),
+bez zagrevanja pri pokretanju. Testovi ne otvaraju konekcije ka bazi ni ka drugim servisima.
+
+Pokretanje (iz korena repozitorijuma):
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+os.environ.setdefault('WARMUP', 'false')
+
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for direktorijum in ('CentralBikeShop', 'BikeShopNoviSad'):
+    sys.path.insert(0, os.path.join(KOREN, direktorijum))
@@ -0,0 +1,100 @@
+"""Kontrola prijema zahteva na centrali (AdmissionController): redosled po prioritetu i CoDel odbijanje"""
+import threading
+import time
+
+import pytest
+
+import central_bike_shop_app as central
+
+
+def sacekaj(uslov, rok=2.0):
+    kraj = time.monotonic() + rok
+    while not uslov():
+        assert time.monotonic() < kraj, "uslov nije ispunjen na vreme"
+        time.sleep(0.005)
+
+
+def u_redu(kontroler, klasa):
+    with kontroler.cond:
+        return len(kontroler.klase[klasa]['red'])
+
+
+@pytest.fixture
+def kontroler(monkeypatch):
+    """Kontroler sa jednim mestom za obradu; CoDel i maksimalno čekanje podešava svaki test"""
+    monkeypatch.setattr(central, 'ADMISSION_LIMIT', 1)
+    monkeypatch.setattr(central, 'ADMISSION_LIMITS', {})
+    monkeypatch.setattr(central, 'ADMISSION_QUEUE_SIZE', 10)
+    monkeypatch.setattr(central, 'ADMISSION_TARGET', 0.05)
+    monkeypatch.setattr(central, 'ADMISSION_INTERVAL', 60)
+    monkeypatch.setattr(central, 'ADMISSION_MAX_WAIT', 5)
+    return central.AdmissionController()
+
+
+def zahtev_u_niti(kontroler, klasa, ishodi, rok=None):
+    def izvrsi():
+        ishodi[klasa] = (kontroler.acquire(klasa, rok), time.monotonic())
+    nit = threading.Thread(target=izvrsi)
+    nit.start()
+    return nit
+
+
+def test_slobodno_mesto_dobija_klasa_veceg_prioriteta(kontroler):
+    assert kontroler.acquire('listanje') is None
+    ishodi = {}
+    # Listanje čeka duže, ali oslobođeno mesto dobija upis (veći prioritet)
+    listanje = zahtev_u_niti(kontroler, 'listanje', ishodi)
+    sacekaj(lambda: u_redu(kontroler, 'listanje') == 1)
+    upis = zahtev_u_niti(kontroler, 'upis', ishodi)
+    sacekaj(lambda: u_redu(kontroler, 'upis') == 1)
+
+    kontroler.release('listanje')
+    upis.join(2)
+    assert ishodi['upis'][0] is None
+    assert 'listanje' not in ishodi
+    assert u_redu(kontroler, 'listanje') == 1
+
+    kontroler.release('upis')
+    listanje.join(2)
+    assert ishodi['listanje'][0] is None
+    assert kontroler.u_obradi == 1
+    kontroler.release('listanje')
+    assert kontroler.u_obradi == 0
+
+
+def test_limit_klase_ne_blokira_druge_klase(monkeypatch):
+    monkeypatch.setattr(central, 'ADMISSION_LIMIT', 2)
+    monkeypatch.setattr(central, 'ADMISSION_LIMITS', {'listanje': 1})
+    kontroler = central.AdmissionController()
+    assert kontroler.acquire('listanje') is None
+    assert kontroler.acquire('upis') is None
+    assert kontroler.metrike()['u_obradi'] == 2
+
+
+def test_codel_odbija_zahteve_preopterecene_klase(kontroler, monkeypatch):
+    monkeypatch.setattr(central, 'ADMISSION_INTERVAL', 0.1)
+    assert kontroler.acquire('upis') is None
+    pocetak = time.monotonic()
+    # Red nije prazan duže od ADMISSION_INTERVAL - zahtev koji je čekao duže od ADMISSION_TARGET se odbija,
+    # umesto da čeka ADMISSION_MAX_WAIT
+    assert kontroler.acquire('provera') == 'codel'
+    assert time.monotonic() - pocetak < 1.0
+    assert kontroler.metrike()['klase']['provera']['odbijeno']['codel'] == 1
+    assert u_redu(kontroler, 'provera') == 0
+
+
+def test_bez_preopterecenja_zahtev_ceka_do_max_wait(kontroler, monkeypatch):
+    monkeypatch.setattr(central, 'ADMISSION_MAX_WAIT', 0.1)
+    assert kontroler.acquire('upis') is None
+    pocetak = time.monotonic()
+    assert kontroler.acquire('provera') == 'istek'
+    assert time.monotonic() - pocetak >= 0.1
+
+
+def test_rok_zahteva_i_pun_red(kontroler, monkeypatch):
+    assert kontroler.acquire('upis') is None
+    assert kontroler.acquire('provera', rok=time.monotonic() + 0.05) == 'rok'
+    monkeypatch.setattr(central, 'ADMISSION_QUEUE_SIZE', 0)
+    assert kontroler.acquire('provera') == 'red_pun'
+    odbijeno = kontroler.metrike()['klase']['provera']['odbijeno']
+    assert (odbijeno['rok'], odbijeno['red_pun'], odbijeno['ukupno']) == (1, 1, 2)
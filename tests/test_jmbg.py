@@ -0,0 +1,44 @@
+"""Provera JMBG-a (proveri_jmbg) - ista funkcija u centrali i gradovima"""
+import pytest
+
+import bike_shop_novi_sad_app as grad
+import central_bike_shop_app as central
+
+ISPRAVNI = ['0101990710008', '0101990710016', '0101990710024']
+
+
+@pytest.fixture(params=[central, grad], ids=['centrala', 'grad'])
+def proveri_jmbg(request):
+    return request.param.proveri_jmbg
+
+
+@pytest.mark.parametrize('jmbg', ISPRAVNI)
+def test_ispravan_jmbg(proveri_jmbg, jmbg):
+    assert proveri_jmbg(jmbg) is None
+    assert proveri_jmbg(jmbg, kontrolna_cifra=True) is None
+
+
+@pytest.mark.parametrize('jmbg', [
+    '', '010199071000', '01019907100080', '010199071000a', ' 101990710008',
+    '٠١٠١٩٩٠٧١٠٠٠٨',  # cifre van ASCII opsega (str.isdigit ih prihvata)
+    101990710008, None,
+])
+def test_neispravan_format(proveri_jmbg, jmbg):
+    assert proveri_jmbg(jmbg) == "JMBG mora imati tačno 13 cifara"
+
+
+@pytest.mark.parametrize('jmbg', ['0101990710009', '0101990710000', '1234567890123'])
+def test_pogresna_kontrolna_cifra(proveri_jmbg, jmbg):
+    assert proveri_jmbg(jmbg) is None
+    assert proveri_jmbg(jmbg, kontrolna_cifra=True) == "JMBG nema ispravnu kontrolnu cifru"
+
+
+def test_kontrolna_cifra_prema_definiciji(proveri_jmbg):
+    # Poređenje sa direktnom formulom (težine 7..2, dva puta; ostatak 10 ili 11 daje cifru 0)
+    for osnova in ('010199071000', '311299950001', '150570980123'):
+        zbir = sum(int(c) * t for c, t in zip(osnova, [7, 6, 5, 4, 3, 2] * 2))
+        m = 11 - zbir % 11
+        kontrolna = 0 if m > 9 else m
+        for cifra in range(10):
+            greska = proveri_jmbg(f"{osnova}{cifra}", kontrolna_cifra=True)
+            assert (greska is None) == (cifra == kontrolna)
@@ -0,0 +1,91 @@
+"""Spajanje istovremenih istih poziva ka centrali (SingleFlight u gradskom servisu)"""
+import threading
+import time
+
+import pytest
+import requests
+
+import bike_shop_novi_sad_app as grad
+
+
+def pokreni_pratioce(sf, broj, kljuc, funkcija, ishodi):
+    def pozovi(i):
+        try:
+            ishodi[i] = ('rezultat', sf.do('provera', kljuc, funkcija))
+        except Exception as e:
+            ishodi[i] = ('izuzetak', e)
+    niti = [threading.Thread(target=pozovi, args=(i,)) for i in range(broj)]
+    for nit in niti:
+        nit.start()
+    return niti
+
+
+def sacekaj(uslov, rok=2.0):
+    kraj = time.monotonic() + rok
+    while not uslov():
+        assert time.monotonic() < kraj, "uslov nije ispunjen na vreme"
+        time.sleep(0.005)
+
+
+def sacekaj_spojene(sf, broj):
+    sacekaj(lambda: sf.metrike().get('provera', {}).get('spojeni') == broj)
+
+
+def test_istovremeni_pozivi_se_spajaju_u_jedan():
+    sf = grad.SingleFlight()
+    pusti = threading.Event()
+    pozivi = []
+
+    def funkcija():
+        pozivi.append(1)
+        pusti.wait(2)
+        return {'can_rent': True}
+
+    ishodi = {}
+    niti = pokreni_pratioce(sf, 8, 'jmbg', funkcija, ishodi)
+    sacekaj_spojene(sf, 7)
+    pusti.set()
+    for nit in niti:
+        nit.join(2)
+
+    assert len(pozivi) == 1
+    rezultati = [rezultat for vrsta, rezultat in ishodi.values()]
+    assert all(vrsta == 'rezultat' for vrsta, _ in ishodi.values())
+    assert all(rezultat is rezultati[0] for rezultat in rezultati)
+    assert sf.metrike()['provera'] == {'pozivi': 8, 'spojeni': 7, 'udeo_spojenih': 0.875}
+    # Završen poziv se ne kešira
+    assert sf.do('provera', 'jmbg', lambda: 'nov') == 'nov'
+
+
+def test_izuzetak_vodeceg_poziva_dobijaju_svi():
+    sf = grad.SingleFlight()
+    pusti = threading.Event()
+    greska = requests.exceptions.ConnectionError("centrala nije dostupna")
+
+    def funkcija():
+        pusti.wait(2)
+        raise greska
+
+    ishodi = {}
+    niti = pokreni_pratioce(sf, 4, 'jmbg', funkcija, ishodi)
+    sacekaj_spojene(sf, 3)
+    pusti.set()
+    for nit in niti:
+        nit.join(2)
+
+    assert [vrsta for vrsta, _ in ishodi.values()] == ['izuzetak'] * 4
+    assert all(e is greska for _, e in ishodi.values())
+    assert sf.calls == {}
+
+
+def test_pratilac_odustaje_posle_roka():
+    sf = grad.SingleFlight()
+    pusti = threading.Event()
+    vodeci = threading.Thread(target=sf.do, args=('provera', 'jmbg', lambda: pusti.wait(2)))
+    vodeci.start()
+    sacekaj(lambda: 'jmbg' in sf.calls)
+
+    with pytest.raises(requests.exceptions.Timeout):
+        sf.do('provera', 'jmbg', lambda: None, timeout=0.05)
+    pusti.set()
+    vodeci.join(2)
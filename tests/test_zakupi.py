@@ -0,0 +1,41 @@
+"""Aritmetika limita zakupa kvote (limit_zakupa) - korisnik nikada nema više od 2 odobrena zaduženja"""
+import pytest
+
+import central_bike_shop_app as central
+
+# (broj_aktivnih, u_gradu, rezervisano, opozvan) -> (limit, u_drugim_gradovima, opozvan)
+SLUCAJEVI = [
+    ((0, 0, 0, False), (2, 0, False)),
+    ((1, 1, 0, False), (2, 0, False)),  # sopstvena zaduženja grada ne umanjuju limit
+    ((1, 0, 0, False), (1, 1, False)),
+    ((2, 0, 0, False), (0, 2, False)),
+    ((0, 0, 2, False), (0, 0, False)),  # ceo limit drži zakup drugog grada
+    ((0, 0, 1, False), (1, 0, False)),
+    ((1, 0, 1, False), (0, 1, False)),
+    ((2, 2, 0, False), (2, 0, False)),
+    ((0, 0, 0, True), (2, 0, False)),   # opozvan zakup bez aktivnih zaduženja se vraća
+    ((1, 1, 0, True), (1, 0, True)),    # opozvan zakup drži samo zaduženja koja grad već ima
+    ((1, 0, 0, True), (0, 1, True)),
+    ((0, 1, 0, False), (2, 0, False)),  # indeks ispred brojača (događaj još nije primenjen)
+    ((3, 0, 0, False), (0, 3, False)),  # brojač iznad limita (npr. degradirani režim) ne daje negativan limit
+]
+
+
+@pytest.mark.parametrize('ulaz, ocekivano', SLUCAJEVI)
+def test_limit_zakupa(ulaz, ocekivano):
+    assert central.limit_zakupa(*ulaz) == ocekivano
+
+
+@pytest.mark.parametrize('opozvan', [False, True])
+def test_limit_ne_prelazi_slobodan_deo(opozvan):
+    # Limit zakupa zajedno sa zaduženjima u drugim gradovima i rezervama drugih zakupa nikad ne prelazi 2,
+    # a opozvan zakup ne dozvoljava nova zaduženja
+    for broj_aktivnih in range(4):
+        for u_gradu in range(broj_aktivnih + 1):
+            for rezervisano in range(3):
+                limit, u_drugim_gradovima, i_dalje_opozvan = central.limit_zakupa(
+                    broj_aktivnih, u_gradu, rezervisano, opozvan)
+                assert 0 <= limit <= 2
+                assert limit == 0 or limit + u_drugim_gradovima + rezervisano <= 2
+                if i_dalje_opozvan:
+                    assert limit <= u_gradu